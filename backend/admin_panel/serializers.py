@@ -190,7 +190,7 @@ class VendorProfileSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = VendorProfile
-        fields = '__all__'
+        exclude = ['search_document']
         read_only_fields = ['user', 'created_at', 'updated_at']
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -858,8 +858,9 @@ class VendorProfileViewSet(viewsets.ModelViewSet):
         completed_appointments = Appointment.objects.filter(vendor=vendor, status='completed').count()
         cancelled_appointments = Appointment.objects.filter(vendor=vendor, status__in=['cancelled', 'rejected']).count()
         
-        total_reviews = Review.objects.filter(vendor=vendor).count()
-        average_rating = Review.objects.filter(vendor=vendor).aggregate(avg=Avg('rating'))['avg'] or 0
+        # Denormalize puan istatistikleri (VendorProfile kolonları)
+        total_reviews = vendor.review_count
+        average_rating = vendor.avg_rating or 0
         
         # Talepler
         service_requests = ServiceRequest.objects.filter(vendor=vendor).order_by('-created_at')
@@ -0,0 +1,123 @@
+"""
+Temizlenen mesaj bildirimleri (kullanıcı + konuşma başına Redis)
+- chat_cleared:<kullanıcı>:wm  (sorted set) üye = konuşma ID, skor = watermark; konuşmada bu ID'ye
+  kadar gelen tüm mesajların bildirimi temizlenmiştir
+- chat_cleared:<kullanıcı>:<konuşma>  (sorted set) watermark'ın üstünde tek tek temizlenen mesaj ID'leri
+
+Kontrol tek round-trip'te iki ZSCORE'dur; kullanıcının geçmişi ne kadar büyük olursa olsun sabit süre.
+Temizleme sırasında watermark, arada temizlenmemiş gelen mesaj kalmayana kadar ilerletilir ve
+altında kalan ID'ler setten atılır (sıkıştırma); böylece set sadece "boşluklu" temizlemeleri tutar.
+Watermark ZADD GT ile yazılır, eşzamanlı temizlemeler onu geri alamaz.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List
+
+from django.db.models import Q
+
+from core.utils.redis_client import get_redis
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_KEY = 'chat_cleared:{user_id}:wm'
+IDS_KEY = 'chat_cleared:{user_id}:{conversation_id}'
+TTL = 60 * 60 * 24 * 30
+# Tek istekte kabul edilen ID sayısı ve konuşma başına tutulan en fazla boşluklu ID
+MAX_IDS_PER_REQUEST = 500
+MAX_PENDING_IDS = 1000
+
+
+def is_cleared(user_id: int, conversation_id: int, message_id: int) -> bool:
+    """Mesajın bildirimi kullanıcı tarafından temizlenmiş mi; Redis erişilemezse False"""
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.zscore(WATERMARK_KEY.format(user_id=user_id), conversation_id)
+        pipe.zscore(IDS_KEY.format(user_id=user_id, conversation_id=conversation_id), message_id)
+        watermark, member = pipe.execute()
+    except Exception as e:
+        # Hata durumunda yine de mesajı iletmeye çalış
+        logger.warning(f"Cleared notification check failed for user {user_id}: {e}")
+        return False
+    return member is not None or (watermark is not None and int(message_id) <= watermark)
+
+
+def clear(user_id: int, message_ids: Iterable) -> int:
+    """Kullanıcıya gelen mesajların bildirimlerini temizle; kaydedilen ID sayısı döner"""
+    from .models import Message
+
+    ids = set()
+    for mid in message_ids:
+        try:
+            ids.add(int(mid))
+        except (TypeError, ValueError):
+            continue
+        if len(ids) >= MAX_IDS_PER_REQUEST:
+            break
+    if not ids:
+        return 0
+
+    # Sadece kullanıcının konuşmalarındaki, karşı taraftan gelen mesajlar
+    by_conversation: Dict[int, List[int]] = {}
+    for message_id, conversation_id in (
+        Message.objects.filter(id__in=ids)
+        .filter(Q(conversation__user1_id=user_id) | Q(conversation__user2_id=user_id))
+        .exclude(sender_user_id=user_id)
+        .values_list('id', 'conversation_id')
+    ):
+        by_conversation.setdefault(conversation_id, []).append(message_id)
+    if not by_conversation:
+        return 0
+
+    redis = get_redis()
+    watermark_key = WATERMARK_KEY.format(user_id=user_id)
+    pipe = redis.pipeline(transaction=False)
+    for conversation_id, conversation_ids in by_conversation.items():
+        key = IDS_KEY.format(user_id=user_id, conversation_id=conversation_id)
+        pipe.zadd(key, {message_id: message_id for message_id in conversation_ids})
+        pipe.expire(key, TTL)
+    pipe.execute()
+
+    for conversation_id in by_conversation:
+        _compact(redis, user_id, conversation_id)
+    redis.expire(watermark_key, TTL)
+    return sum(len(v) for v in by_conversation.values())
+
+
+def _compact(redis, user_id: int, conversation_id: int) -> None:
+    """Watermark'ı ardışık temizlenmiş gelen mesajlar boyunca ilerlet, altındaki ID'leri sil"""
+    from .models import Message
+
+    watermark_key = WATERMARK_KEY.format(user_id=user_id)
+    key = IDS_KEY.format(user_id=user_id, conversation_id=conversation_id)
+    pipe = redis.pipeline(transaction=False)
+    pipe.zscore(watermark_key, conversation_id)
+    pipe.zrange(key, 0, -1)
+    current, members = pipe.execute()
+    watermark = int(current or 0)
+    pending = sorted(int(member) for member in members if int(member) > watermark)
+    if not pending:
+        return
+
+    # Ardışık temizlenen mesaj sayısı pending'den fazla olamaz; sorgu bununla sınırlı
+    incoming = (
+        Message.objects.filter(conversation_id=conversation_id, id__gt=watermark, id__lte=pending[-1])
+        .exclude(sender_user_id=user_id)
+        .order_by('id')
+        .values_list('id', flat=True)[:len(pending) + 1]
+    )
+    cleared = set(pending)
+    new_watermark = watermark
+    for message_id in incoming:
+        if message_id not in cleared:
+            break
+        new_watermark = message_id
+
+    pipe = redis.pipeline(transaction=False)
+    if new_watermark > watermark:
+        pipe.zadd(watermark_key, {conversation_id: new_watermark}, gt=True)
+        pipe.zremrangebyscore(key, '-inf', new_watermark)
+    # Boşluklar kapanmazsa set sınırsız büyümesin; en eski ID'ler düşer
+    pipe.zremrangebyrank(key, 0, -(MAX_PENDING_IDS + 1))
+    pipe.execute()
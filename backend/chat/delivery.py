@@ -0,0 +1,107 @@
+"""
+Sohbet mesajı teslimatı (REST ve WebSocket gönderimleri için tek yol)
+Alıcılar mesaj başına bir kez hesaplanır ve her hedef gruba tek olay yayınlanır:
+- conv_<id>: açık sohbet soketleri (her iki taraf) için message.new
+- user_<alıcı>: karşı tarafın global soketleri için message.delivered; GlobalChatConsumer
+  bunu istemciye message.new ve conversation.update çerçeveleri olarak iletir
+  (çerçeveler soket üzerinden gider, channel layer'a ikinci yayın yapılmaz).
+Alıcı mesajın bildirimini temizlediyse global olay atlanır.
+E-posta bildirimi commit sonrası kuyruğa alınır; görev alıcı çevrimiçiyse (presence) göndermez.
+"""
+from typing import List, Tuple
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+from . import cleared
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def conversation_group(conversation_id) -> str:
+    return f"conv_{conversation_id}"
+
+
+def user_group(user_id) -> str:
+    return f"user_{user_id}"
+
+
+def recipient_of(message, participants: Tuple[int, int]) -> int:
+    return participants[1] if participants[0] == message.sender_user_id else participants[0]
+
+
+def build_events(message, participants: Tuple[int, int], recipient_cleared: bool = False) -> List[Tuple[str, dict]]:
+    """Mesaj için (grup, olay) listesi; her grup en fazla bir kez yer alır"""
+    sender_id = message.sender_user_id
+    recipient_id = recipient_of(message, participants)
+    payload = {
+        'id': message.id,
+        'conversation': message.conversation_id,
+        'content': message.content,
+        'sender_user': sender_id,
+        'other_user_id': recipient_id,
+        'created_at': message.created_at.isoformat(),
+    }
+    events = [(conversation_group(message.conversation_id), {'type': 'message.new', 'payload': payload})]
+    if not recipient_cleared:
+        events.append((user_group(recipient_id), {
+            'type': 'message.delivered',
+            'message': payload,
+            # unread_count gönderilmez: istemci message.new ile kendi sayacını artırır
+            'conversation': {
+                'conversation_id': message.conversation_id,
+                'last_message_text': message.content[:500],
+                'last_message_at': payload['created_at'],
+                'sender_user': sender_id,
+            },
+        }))
+    return events
+
+
+async def deliver_message(message, participants: Tuple[int, int], channel_layer=None) -> int:
+    """Mesajı hedef gruplara yayınla (WebSocket yolu); yayın sayısı döner"""
+    channel_layer = channel_layer or get_channel_layer()
+    if channel_layer is None:
+        return 0
+    # Redis kontrolü bloklayıcıdır; consumer'ın event loop'unu bekletmesin diye thread'de
+    recipient_cleared = await sync_to_async(cleared.is_cleared)(
+        recipient_of(message, participants), message.conversation_id, message.id
+    )
+    events = build_events(message, participants, recipient_cleared)
+    for group, event in events:
+        await channel_layer.group_send(group, event)
+    return len(events)
+
+
+def deliver_message_sync(message, participants: Tuple[int, int]) -> int:
+    """REST yolu; yayın hatası isteği başarısız kılmaz"""
+    try:
+        return async_to_sync(deliver_message)(message, participants)
+    except Exception as e:
+        logger.warning(f"Chat message delivery failed for message {message.id}: {e}")
+        return 0
+
+
+def notify_recipient(message, participants: Tuple[int, int]) -> None:
+    """Alıcıya e-posta bildirimini commit sonrası kuyruğa al (senkron bağlamda çağrılır)"""
+    if not getattr(settings, 'CHAT_EMAIL_NOTIFICATIONS', True):
+        return
+    recipient_id = recipient_of(message, participants)
+
+    def _queue():
+        from core.models import CustomUser
+        from core.utils.email_service import EmailService
+
+        users = CustomUser.objects.only('id', 'email', 'username', 'first_name', 'last_name').in_bulk(
+            [recipient_id, message.sender_user_id]
+        )
+        recipient, sender = users.get(recipient_id), users.get(message.sender_user_id)
+        if recipient is None or sender is None or not recipient.email:
+            return
+        EmailService.send_message_notification(recipient.email, sender.full_name, message.content[:200], recipient_id)
+
+    transaction.on_commit(_queue)
@@ -0,0 +1,133 @@
+import asyncio
+import time
+import uuid
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from channels.layers import InMemoryChannelLayer, channel_layers
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import re_path
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from chat.models import Conversation
+from chat.views import ConversationMessagesView
+from chat.ws_consumers import ChatConsumer, GlobalChatConsumer
+from core.models import CustomUser
+
+
+class _CountingLayer:
+    """Channel layer yayınlarını hedef grup türüne göre sayar (conv / user)"""
+
+    def __init__(self, layer):
+        self.layer = layer
+        self.publishes = Counter()
+
+    async def group_send(self, group, message):
+        self.publishes[group.split('_', 1)[0]] += 1
+        return await self.layer.group_send(group, message)
+
+    def __getattr__(self, name):
+        return getattr(self.layer, name)
+
+
+class _WithUser:
+    """Soket bağlantısına kimliği doğrulanmış kullanıcıyı ekle (JWT middleware yerine)"""
+
+    def __init__(self, app, user):
+        self.app = app
+        self.user = user
+
+    async def __call__(self, scope, receive, send):
+        return await self.app(dict(scope, user=self.user), receive, send)
+
+
+class Command(BaseCommand):
+    help = (
+        'Sohbet mesajı başına channel layer yayın sayısını ve istemci çerçevelerini ölçer '
+        '(WebSocket ve REST gönderimi, iki taraf da bağlı); oluşturulan kayıtlar silinir'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200, help='Yol başına mesaj sayısı (varsayılan: 200)')
+
+    def handle(self, *args, **options):
+        count = max(1, options['messages'])
+        run_id = uuid.uuid4().hex[:8]
+        sender, recipient = [
+            CustomUser.objects.create_user(
+                username=f'bench-chat-{run_id}-{i}', email=f'bench-chat-{run_id}-{i}@example.com',
+                password=None, role='client', is_verified=True, is_active=True,
+            )
+            for i in range(2)
+        ]
+        conv = Conversation.objects.create(user1_id=sender.id, user2_id=recipient.id)
+        previous = channel_layers.backends.get('default')
+        layer = channel_layers.backends['default'] = _CountingLayer(InMemoryChannelLayer(capacity=count * 10))
+        # Benchmark kullanıcılarına e-posta bildirimi kuyruğa alınmasın
+        notifications_off = override_settings(CHAT_EMAIL_NOTIFICATIONS=False)
+        notifications_off.enable()
+        try:
+            self.stdout.write(f"messages={count} (her iki kullanıcının sohbet ve global soketi bağlı)")
+            self.stdout.write(f"{'path':>5} {'publishes/msg':>14} {'conv':>6} {'user':>6} {'frames/msg':>11} {'ms/msg':>8}")
+            for path in ('ws', 'rest'):
+                layer.publishes.clear()
+                frames, elapsed = asyncio.run(self._run(path, conv, sender, recipient, count))
+                self.stdout.write(
+                    f"{path:>5} {sum(layer.publishes.values()) / count:>14.2f} "
+                    f"{layer.publishes['conv'] / count:>6.2f} {layer.publishes['user'] / count:>6.2f} "
+                    f"{frames / count:>11.2f} {elapsed / count * 1000:>8.2f}"
+                )
+        finally:
+            notifications_off.disable()
+            if previous is not None:
+                channel_layers.backends['default'] = previous
+            else:
+                channel_layers.backends.pop('default', None)
+            CustomUser.objects.filter(id__in=[sender.id, recipient.id]).delete()
+
+    async def _run(self, path, conv, sender, recipient, count):
+        sockets = {}
+        for name, user, url in (
+            ('sender_chat', sender, f'/ws/chat/{conv.id}/'),
+            ('sender_global', sender, '/ws/chat/global/'),
+            ('recipient_chat', recipient, f'/ws/chat/{conv.id}/'),
+            ('recipient_global', recipient, '/ws/chat/global/'),
+        ):
+            app = _WithUser(URLRouter([
+                re_path(r"ws/chat/(?P<conversation_id>\d+)/$", ChatConsumer.as_asgi()),
+                re_path(r"ws/chat/global/$", GlobalChatConsumer.as_asgi()),
+            ]), user)
+            sockets[name] = WebsocketCommunicator(app, url)
+            connected, _ = await sockets[name].connect()
+            if not connected:
+                raise RuntimeError(f'{name} bağlanamadı')
+
+        view = ConversationMessagesView.as_view()
+        factory = APIRequestFactory()
+
+        def post_rest(text):
+            request = factory.post(f'/api/v1/chat/conversations/{conv.id}/messages', {'content': text}, format='json')
+            force_authenticate(request, user=sender)
+            view(request, conversation_id=conv.id)
+
+        started = time.perf_counter()
+        for i in range(count):
+            if path == 'ws':
+                await sockets['sender_chat'].send_json_to({'event': 'message.send', 'data': {'content': f'bench {i}'}})
+                # Gönderim işlenene kadar bekle (gönderen kendi sohbet soketinden mesajı alır)
+                await sockets['sender_chat'].receive_json_from(timeout=5)
+            else:
+                await sync_to_async(post_rest)(f'bench {i}')
+                await sockets['sender_chat'].receive_json_from(timeout=5)
+        elapsed = time.perf_counter() - started
+
+        frames = count  # gönderenin sohbet soketi yukarıda okundu
+        for socket in sockets.values():
+            while not await socket.receive_nothing(timeout=0.05):
+                await socket.receive_output()
+                frames += 1
+            await socket.disconnect()
+        return frames, elapsed
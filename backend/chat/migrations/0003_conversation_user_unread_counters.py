@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:23
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.utils import timezone
+
+BATCH_SIZE = 2000
+
+
+def backfill_unread(apps, schema_editor):
+    """Sayaçları eski hesaplamayla doldur: karşı tarafın son okumadan sonraki mesajları (okunmamışsa son 1 yıl)"""
+    Conversation = apps.get_model('chat', 'Conversation')
+    Message = apps.get_model('chat', 'Message')
+    fallback = timezone.now() - timedelta(days=365)
+
+    pending = []
+    for conv in Conversation.objects.only('id', 'user1_id', 'user2_id', 'user1_last_read_at', 'user2_last_read_at').iterator(chunk_size=BATCH_SIZE):
+        counts = Message.objects.filter(conversation_id=conv.id).aggregate(
+            user1=Count('id', filter=Q(sender_user_id=conv.user2_id, created_at__gt=conv.user1_last_read_at or fallback)),
+            user2=Count('id', filter=Q(sender_user_id=conv.user1_id, created_at__gt=conv.user2_last_read_at or fallback)),
+        )
+        if not counts['user1'] and not counts['user2']:
+            continue
+        conv.user1_unread = counts['user1']
+        conv.user2_unread = counts['user2']
+        pending.append(conv)
+        if len(pending) >= BATCH_SIZE:
+            Conversation.objects.bulk_update(pending, ['user1_unread', 'user2_unread'])
+            pending = []
+    if pending:
+        Conversation.objects.bulk_update(pending, ['user1_unread', 'user2_unread'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='user1_unread',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='user2_unread',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unread, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='conversation',
+            name='unread_count',
+        ),
+    ]
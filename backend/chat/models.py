@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+from typing import Optional
+
 from django.db import models
-from django.db.models import Q
+from django.db.models import F, Q
 from django.utils import timezone
 
 from core.models import CustomUser
@@ -33,8 +35,10 @@ class Conversation(models.Model):
     user1_last_read_at = models.DateTimeField(null=True, blank=True)
     user2_last_read_at = models.DateTimeField(null=True, blank=True)
     
-    # Tek unread count - karşı tarafın okumadığı mesaj sayısı
-    unread_count = models.PositiveIntegerField(default=0)
+    # Okunmamış mesaj sayaçları - her kullanıcı için ayrı.
+    # Mesaj gönderiminde alıcının sayacı F() ile artırılır, okununca sıfırlanır.
+    user1_unread = models.PositiveIntegerField(default=0)
+    user2_unread = models.PositiveIntegerField(default=0)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -49,6 +53,11 @@ class Conversation(models.Model):
                 name='uniq_user1_user2_conversation',
             ),
         ]
+        indexes = [
+            # Konuşma listesi delta senkronu: kullanıcının son değişen konuşmaları
+            models.Index(fields=['user1', 'updated_at']),
+            models.Index(fields=['user2', 'updated_at']),
+        ]
         ordering = ['-updated_at']
 
     def __str__(self) -> str:
@@ -62,33 +71,55 @@ class Conversation(models.Model):
             return self.user1
         return None
     
+    def get_position(self, user) -> Optional[str]:
+        """Kullanıcının konuşmadaki yeri ('user1' / 'user2'); katılımcı değilse None"""
+        user_id = getattr(user, 'id', user)
+        if user_id == self.user1_id:
+            return 'user1'
+        if user_id == self.user2_id:
+            return 'user2'
+        return None
+
     def get_unread_count_for_user(self, user):
-        """Verilen kullanıcı için unread count döndür"""
-        if user == self.user1:
-            # user1 için user2'nin gönderdiği okunmamış mesajlar
-            if self.user1_last_read_at:
-                last_read = self.user1_last_read_at
-            else:
-                # Eğer hiç okunmamışsa, 1 yıl öncesinden itibaren say
-                last_read = timezone.now() - timezone.timedelta(days=365)
-            
-            return self.messages.filter(
-                sender_user=self.user2,
-                created_at__gt=last_read
-            ).count()
-        elif user == self.user2:
-            # user2 için user1'in gönderdiği okunmamış mesajlar
-            if self.user2_last_read_at:
-                last_read = self.user2_last_read_at
-            else:
-                # Eğer hiç okunmamışsa, 1 yıl öncesinden itibaren say
-                last_read = timezone.now() - timezone.timedelta(days=365)
-            
-            return self.messages.filter(
-                sender_user=self.user1,
-                created_at__gt=last_read
-            ).count()
-        return 0
+        """Verilen kullanıcı için unread count döndür (denormalize sayaçtan, sorgusuz)"""
+        position = self.get_position(user)
+        if position is None:
+            return 0
+        return getattr(self, f'{position}_unread')
+
+    def record_message(self, sender_id: int, text: str, created_at) -> None:
+        """
+        Yeni mesaj için denormalize alanları tek UPDATE ile güncelle: son mesaj, zaman ve
+        alıcının okunmamış sayacı (F() ile; eşzamanlı gönderimlerde artış kaybolmaz).
+        """
+        recipient = 'user2' if sender_id == self.user1_id else 'user1'
+        now = timezone.now()
+        Conversation.objects.filter(pk=self.pk).update(**{
+            'last_message_text': text[:500],
+            'last_message_at': created_at,
+            f'{recipient}_unread': F(f'{recipient}_unread') + 1,
+            # Konuşma listesi delta senkronu updated_at'e bakar
+            'updated_at': now,
+        })
+        self.last_message_text = text[:500]
+        self.last_message_at = created_at
+        self.updated_at = now
+
+    def mark_read(self, user) -> bool:
+        """Kullanıcının okuma zamanını güncelle ve okunmamış sayacını sıfırla"""
+        position = self.get_position(user)
+        if position is None:
+            return False
+        now = timezone.now()
+        Conversation.objects.filter(pk=self.pk).update(**{
+            f'{position}_last_read_at': now,
+            f'{position}_unread': 0,
+            'updated_at': now,
+        })
+        setattr(self, f'{position}_last_read_at', now)
+        setattr(self, f'{position}_unread', 0)
+        self.updated_at = now
+        return True
 
 
 class Message(models.Model):
@@ -129,5 +160,27 @@ class Message(models.Model):
         return f"Msg:{self.id} conv:{self.conversation_id}"
 
 
+class ConversationTombstone(models.Model):
+    """
+    Silinen konuşma kaydı - konuşma listesi delta senkronu silinenleri buradan bildirir.
+    Her katılımcı için ayrı satır; TOMBSTONE_RETENTION_DAYS'ten eski kayıtlar silinir
+    (daha eski bir senkron noktası tam yenileme gerektirir).
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    conversation_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        db_table = 'ConversationTombstone'
+        indexes = [
+            models.Index(fields=['user', 'deleted_at']),
+        ]
 
+    def __str__(self) -> str:
+        return f"Tombstone conv:{self.conversation_id} user:{self.user_id}"
@@ -0,0 +1,82 @@
+"""
+Çevrimiçi durumu ve son görülme (Redis)
+- presence:<kullanıcı>:conns  (sorted set) üye = global soketin channel adı, skor = geçerlilik sonu (epoch sn)
+- presence:<kullanıcı>:seen   son görülme (epoch sn)
+
+GlobalChatConsumer bağlanınca ve istemcinin her ping'inde (~30 sn) soketini CONNECTION_TTL kadar
+uzatır, kapanınca siler. Bağlantı sayısı süresi dolmamış üyelerdir; disconnect çağrılmadan ölen
+sunucuların soketleri ayrıca temizlenmeden kendiliğinden düşer. Toplu sorgu tek round-trip'tir.
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Iterable, Optional
+
+from core.utils.redis_client import get_redis
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+CONNECTIONS_KEY = 'presence:{user_id}:conns'
+LAST_SEEN_KEY = 'presence:{user_id}:seen'
+# İstemci 30 sn'de bir ping atar; iki ping kaçırılırsa soket düşmüş sayılır
+CONNECTION_TTL = 90
+LAST_SEEN_TTL = 60 * 60 * 24 * 30
+
+
+def touch(user_id: int, channel_name: str) -> None:
+    """Soketi bağlı say ve süresini uzat (connect ve heartbeat)"""
+    now = int(time.time())
+    key = CONNECTIONS_KEY.format(user_id=user_id)
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.zadd(key, {channel_name: now + CONNECTION_TTL})
+    pipe.zremrangebyscore(key, '-inf', now)
+    pipe.expire(key, CONNECTION_TTL)
+    pipe.set(LAST_SEEN_KEY.format(user_id=user_id), now, ex=LAST_SEEN_TTL)
+    pipe.execute()
+
+
+def leave(user_id: int, channel_name: str) -> None:
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.zrem(CONNECTIONS_KEY.format(user_id=user_id), channel_name)
+    pipe.set(LAST_SEEN_KEY.format(user_id=user_id), int(time.time()), ex=LAST_SEEN_TTL)
+    pipe.execute()
+
+
+def lookup(user_ids: Iterable[int]) -> Dict[int, dict]:
+    """{kullanıcı: {online, connections, last_seen}}; Redis erişilemezse boş sözlük"""
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return {}
+    now = int(time.time())
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.zcount(CONNECTIONS_KEY.format(user_id=user_id), f'({now}', '+inf')
+            pipe.get(LAST_SEEN_KEY.format(user_id=user_id))
+        replies = pipe.execute()
+    except Exception as e:
+        logger.warning(f"Presence lookup failed: {e}")
+        return {}
+    result = {}
+    for index, user_id in enumerate(user_ids):
+        connections, seen = replies[2 * index], replies[2 * index + 1]
+        result[user_id] = {
+            'online': connections > 0,
+            'connections': connections,
+            'last_seen': _isoformat(seen),
+        }
+    return result
+
+
+def is_online(user_id: int) -> bool:
+    """Bildirim görevleri için; Redis erişilemezse False (bildirim yine gönderilir)"""
+    return lookup([user_id]).get(user_id, {}).get('online', False)
+
+
+def _isoformat(seen) -> Optional[str]:
+    if seen is None:
+        return None
+    return datetime.fromtimestamp(int(seen), tz=dt_timezone.utc).isoformat()
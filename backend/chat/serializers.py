@@ -1,3 +1,4 @@
+from django.db.models import OuterRef, Subquery
 from rest_framework import serializers
 from .models import Conversation, Message
 from core.serializers import CustomUserSerializer
@@ -19,22 +20,30 @@ class ConversationSerializer(serializers.ModelSerializer):
     user2 = CustomUserSerializer(read_only=True)
     other_user = serializers.SerializerMethodField()  # Karşı tarafı göster
     unread_count_for_current_user = serializers.SerializerMethodField()  # Mevcut kullanıcı için unread count
+    # Geriye uyumluluk: eskiden iki tarafın paylaştığı alan, artık mevcut kullanıcının sayacı
+    unread_count = serializers.SerializerMethodField()
+    other_user_presence = serializers.SerializerMethodField()
 
     class Meta:
         model = Conversation
         fields = [
             'id', 'user1', 'user2', 'other_user', 'unread_count_for_current_user',
             'last_message_text', 'last_message_at', 'unread_count',
-            'created_at', 'updated_at', 'last_message',
+            'created_at', 'updated_at', 'last_message', 'other_user_presence',
         ]
         read_only_fields = [
             'id', 'user1', 'user2', 'other_user', 'unread_count_for_current_user',
             'last_message_text', 'last_message_at', 'unread_count',
-            'created_at', 'updated_at'
+            'created_at', 'updated_at', 'other_user_presence'
         ]
 
     def get_last_message(self, obj: Conversation):
-        last_msg = obj.messages.order_by('-created_at').first()
+        # Liste görünümü son mesajları tek sorguda context'e koyar (bkz. last_messages_for)
+        last_messages = self.context.get('last_messages')
+        if last_messages is not None:
+            last_msg = last_messages.get(getattr(obj, 'last_message_id', None))
+        else:
+            last_msg = obj.messages.order_by('-created_at').first()
         if not last_msg:
             return None
         return MessageSerializer(last_msg).data
@@ -63,4 +72,29 @@ class ConversationSerializer(serializers.ModelSerializer):
             return obj.get_unread_count_for_user(request.user)
         return 0
 
+    def get_unread_count(self, obj: Conversation):
+        return self.get_unread_count_for_current_user(obj)
 
+    def get_other_user_presence(self, obj: Conversation):
+        """Karşı tarafın çevrimiçi durumu; liste görünümü toplu sorguyu context'e koyar (bkz. chat.presence)"""
+        presence = self.context.get('presence')
+        request = self.context.get('request')
+        if presence is None or not request or not request.user.is_authenticated:
+            return None
+        other_user_id = obj.user2_id if obj.user1_id == request.user.id else obj.user1_id
+        return presence.get(other_user_id)
+
+
+def with_last_message_id(queryset):
+    """Konuşma listesi için son mesaj ID'sini alt sorguyla ekle (bkz. last_messages_for)"""
+    return queryset.annotate(
+        last_message_id=Subquery(
+            Message.objects.filter(conversation=OuterRef('pk')).order_by('-created_at', '-id').values('id')[:1]
+        )
+    )
+
+
+def last_messages_for(conversations) -> dict:
+    """with_last_message_id ile yüklenmiş konuşmaların son mesajları tek sorguda; serializer context'i için"""
+    ids = [conv.last_message_id for conv in conversations if conv.last_message_id]
+    return Message.objects.in_bulk(ids) if ids else {}
@@ -0,0 +1,97 @@
+"""
+Konuşma listesi delta senkronu ve keyset sayfalaması
+İstemci ilk yüklemede listeyi sayfalar halinde (cursor) alır ve cevaptaki sync_token'ı saklar.
+Sonraki isteklerde since=<sync_token> ile sadece o andan beri değişen (yeni mesaj, okuma)
+konuşmalar ve silinen konuşma ID'leri döner.
+
+sync_token milisaniye cinsinden sunucu zamanıdır. Commit'i gecikmiş yazmalar kaçmasın diye
+sorgu SYNC_OVERLAP kadar geriden başlar; istemci aynı konuşmayı iki kez alabilir (upsert eder).
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Iterable, List, Optional, Tuple
+
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ConversationTombstone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+SYNC_OVERLAP = timedelta(seconds=5)
+# Silinen konuşma kayıtları bu süre tutulur; daha eski since tam yenileme ister
+TOMBSTONE_RETENTION_DAYS = 30
+
+
+def make_token(moment=None) -> str:
+    moment = moment or timezone.now()
+    return str(int(moment.timestamp() * 1000))
+
+
+def parse_token(value) -> Optional[datetime]:
+    """sync_token -> zaman; geçersizse ValueError"""
+    millis = int(value)
+    if millis < 0:
+        raise ValueError('negative sync token')
+    try:
+        return datetime.fromtimestamp(millis / 1000, tz=dt_timezone.utc)
+    except (OverflowError, OSError):
+        raise ValueError('sync token out of range')
+
+
+def needs_reset(since: datetime) -> bool:
+    """
+    İstemci listeyi baştan yüklemeli: silinen konuşma kayıtları since'i kapsamıyor ya da token
+    gelecekte (sunucu saati geri alındı); ikincisinde aradaki değişiklikler hiç dönmezdi
+    """
+    now = timezone.now()
+    return since < now - timedelta(days=TOMBSTONE_RETENTION_DAYS) or since > now + SYNC_OVERLAP
+
+
+def changed_since(queryset, since: datetime):
+    return queryset.filter(updated_at__gte=since - SYNC_OVERLAP)
+
+
+def deleted_since(user, since: datetime) -> List[int]:
+    return list(
+        ConversationTombstone.objects.filter(user=user, deleted_at__gte=since - SYNC_OVERLAP)
+        .values_list('conversation_id', flat=True)
+        .distinct()
+    )
+
+
+def record_deletion(conversation_id: int, user_ids: Iterable[int]) -> None:
+    """Silinen konuşmayı katılımcıların sonraki senkronu için kaydet; süresi geçmiş kayıtları temizle"""
+    user_ids = list(user_ids)
+    ConversationTombstone.objects.bulk_create([
+        ConversationTombstone(user_id=user_id, conversation_id=conversation_id) for user_id in user_ids
+    ])
+    ConversationTombstone.objects.filter(
+        user_id__in=user_ids,
+        deleted_at__lt=timezone.now() - timedelta(days=TOMBSTONE_RETENTION_DAYS),
+    ).delete()
+
+
+# --- Keyset sayfalaması ---
+def order_by_activity(queryset):
+    """Son aktiviteye göre (mesajı olmayan konuşmada oluşturulma zamanı), yeniden eskiye"""
+    return queryset.annotate(
+        activity_at=Coalesce(F('last_message_at'), F('created_at'))
+    ).order_by('-activity_at', '-id')
+
+
+def encode_cursor(conversation) -> str:
+    # Mikrosaniye hassasiyetinde; aynı anlı kayıtlar id ile ayrılır
+    micros = (conversation.activity_at - EPOCH) // timedelta(microseconds=1)
+    return f'{micros}_{conversation.id}'
+
+
+def decode_cursor(value) -> Tuple[datetime, int]:
+    """cursor -> (aktivite zamanı, id); geçersizse ValueError"""
+    micros, _, conversation_id = str(value).partition('_')
+    return EPOCH + timedelta(microseconds=int(micros)), int(conversation_id)
+
+
+def after_cursor(queryset, cursor: Tuple[datetime, int]):
+    """order_by_activity sırasında cursor'dan sonraki konuşmalar"""
+    activity_at, conversation_id = cursor
+    return queryset.filter(Q(activity_at__lt=activity_at) | Q(activity_at=activity_at, id__lt=conversation_id))
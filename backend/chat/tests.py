@@ -0,0 +1,481 @@
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from channels.layers import InMemoryChannelLayer, channel_layers
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import re_path
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import CustomUser
+from core.testing import RedisTestMixin
+from core.tasks import send_message_notification_email
+
+from . import cleared, sync, typing_state
+from .models import Conversation, Message
+from .typing_state import TypingThrottle
+from .ws_consumers import ChatConsumer, GlobalChatConsumer
+
+
+class CountingChannelLayer:
+    """Channel layer yayınlarını (grup, olay tipi) olarak kaydeder"""
+
+    def __init__(self):
+        self.layer = InMemoryChannelLayer()
+        self.publishes = []
+
+    async def group_send(self, group, message):
+        self.publishes.append((group, message['type']))
+        return await self.layer.group_send(group, message)
+
+    def __getattr__(self, name):
+        return getattr(self.layer, name)
+
+
+class WithUser:
+    """JWT middleware yerine kimliği doğrulanmış kullanıcıyı scope'a ekler"""
+
+    def __init__(self, user):
+        self.user = user
+        self.app = URLRouter([
+            re_path(r"ws/chat/(?P<conversation_id>\d+)/$", ChatConsumer.as_asgi()),
+            re_path(r"ws/chat/global/$", GlobalChatConsumer.as_asgi()),
+        ])
+
+    async def __call__(self, scope, receive, send):
+        return await self.app(dict(scope, user=self.user), receive, send)
+
+
+def use_channel_layer(test, layer):
+    """Test süresince varsayılan channel layer'ı değiştir"""
+    previous = channel_layers.backends.get('default')
+    channel_layers.backends['default'] = layer
+
+    def restore():
+        if previous is not None:
+            channel_layers.backends['default'] = previous
+        else:
+            channel_layers.backends.pop('default', None)
+
+    test.addCleanup(restore)
+
+
+# Redis gerektiren yan yollar (temizlenen bildirimler, presence) testte devre dışı
+@mock.patch('chat.cleared.is_cleared', return_value=False)
+@mock.patch('chat.presence.touch')
+@mock.patch('chat.presence.leave')
+class MessageDeliveryTests(TestCase):
+    def setUp(self):
+        self.sender, self.recipient = [
+            CustomUser.objects.create_user(
+                username=f'chat-{i}@example.com', email=f'chat-{i}@example.com', password='x',
+                role='client', is_verified=True, is_active=True,
+            )
+            for i in range(2)
+        ]
+        self.conv = Conversation.objects.create(
+            user1_id=min(self.sender.id, self.recipient.id), user2_id=max(self.sender.id, self.recipient.id)
+        )
+        self.layer = CountingChannelLayer()
+        use_channel_layer(self, self.layer)
+
+    async def _connect_all(self):
+        sockets = {}
+        for name, user, path in (
+            ('sender_chat', self.sender, f'/ws/chat/{self.conv.id}/'),
+            ('sender_global', self.sender, '/ws/chat/global/'),
+            ('recipient_chat', self.recipient, f'/ws/chat/{self.conv.id}/'),
+            ('recipient_global', self.recipient, '/ws/chat/global/'),
+        ):
+            sockets[name] = WebsocketCommunicator(WithUser(user), path)
+            connected, _ = await sockets[name].connect()
+            self.assertTrue(connected, name)
+        return sockets
+
+    async def _frames(self, sockets):
+        frames = {}
+        for name, socket in sockets.items():
+            frames[name] = []
+            while not await socket.receive_nothing(timeout=0.1):
+                frames[name].append((await socket.receive_json_from())['event'])
+            await socket.disconnect()
+        return frames
+
+    def _assert_single_fan_out(self, frames):
+        self.assertEqual(self.layer.publishes, [
+            (f'conv_{self.conv.id}', 'message.new'),
+            (f'user_{self.recipient.id}', 'message.delivered'),
+        ])
+        self.assertEqual(frames, {
+            'sender_chat': ['message.new'],
+            'sender_global': [],
+            'recipient_chat': ['message.new'],
+            'recipient_global': ['message.new', 'conversation.update'],
+        })
+
+    async def test_websocket_send_publishes_once_per_group(self, *mocks):
+        sockets = await self._connect_all()
+        await sockets['sender_chat'].send_json_to({'event': 'message.send', 'data': {'content': 'merhaba'}})
+        self._assert_single_fan_out(await self._frames(sockets))
+
+    async def test_rest_send_publishes_once_per_group(self, *mocks):
+        sockets = await self._connect_all()
+
+        def post():
+            client = APIClient()
+            client.force_authenticate(user=self.sender)
+            return client.post(f'/api/v1/chat/conversations/{self.conv.id}/messages', {'content': 'merhaba'}, format='json')
+
+        response = await sync_to_async(post)()
+        self.assertEqual(response.status_code, 201)
+        self._assert_single_fan_out(await self._frames(sockets))
+
+
+@mock.patch('core.utils.email_service.EmailService.send_message_notification')
+class MessageNotificationTests(TestCase):
+    def setUp(self):
+        self.sender, self.recipient = [
+            CustomUser.objects.create_user(
+                username=f'notify-{i}@example.com', email=f'notify-{i}@example.com', password='x',
+                role='client', is_verified=True, is_active=True,
+            )
+            for i in range(2)
+        ]
+        self.conv = Conversation.objects.create(
+            user1_id=min(self.sender.id, self.recipient.id), user2_id=max(self.sender.id, self.recipient.id)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.sender)
+
+    @mock.patch('chat.cleared.is_cleared', return_value=False)
+    def test_rest_send_queues_email_for_recipient_after_commit(self, _cleared, send):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.post(
+                f'/api/v1/chat/conversations/{self.conv.id}/messages', {'content': 'merhaba'}, format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        send.assert_not_called()
+        for callback in callbacks:
+            callback()
+        send.assert_called_once_with(self.recipient.email, self.sender.full_name, 'merhaba', self.recipient.id)
+
+    @override_settings(CHAT_EMAIL_NOTIFICATIONS=False)
+    @mock.patch('chat.cleared.is_cleared', return_value=False)
+    def test_notifications_can_be_disabled(self, _cleared, send):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/v1/chat/conversations/{self.conv.id}/messages', {'content': 'merhaba'}, format='json')
+        send.assert_not_called()
+
+
+@mock.patch('core.utils.email_service.EmailService.send_email', return_value=True)
+class MessageNotificationTaskTests(TestCase):
+    @mock.patch('chat.presence.is_online', return_value=True)
+    def test_online_recipient_is_skipped(self, is_online, send_email):
+        self.assertFalse(send_message_notification_email('a@example.com', 'Ali', 'merhaba', 7))
+        is_online.assert_called_once_with(7)
+        send_email.assert_not_called()
+
+    @mock.patch('chat.presence.is_online', return_value=False)
+    def test_offline_recipient_is_emailed(self, is_online, send_email):
+        self.assertTrue(send_message_notification_email('a@example.com', 'Ali', 'merhaba', 7))
+        send_email.assert_called_once()
+
+    @mock.patch('chat.presence.is_online')
+    def test_task_queued_with_old_signature_still_sends(self, is_online, send_email):
+        self.assertTrue(send_message_notification_email('a@example.com', 'Ali', 'merhaba'))
+        is_online.assert_not_called()
+        send_email.assert_called_once()
+
+
+class MessageHistoryPaginationTests(TestCase):
+    def setUp(self):
+        self.sender, self.recipient = [
+            CustomUser.objects.create_user(
+                username=f'history-{i}@example.com', email=f'history-{i}@example.com', password='x',
+                role='client', is_verified=True, is_active=True,
+            )
+            for i in range(2)
+        ]
+        self.conv = Conversation.objects.create(user1_id=self.sender.id, user2_id=self.recipient.id)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.sender)
+        self.url = f'/api/v1/chat/conversations/{self.conv.id}/messages'
+
+    def _create_messages(self, count):
+        # Aynı created_at'e düşen mesajlar id ile sıralanır
+        return [
+            Message.objects.create(conversation=self.conv, sender_user=self.sender, content=f'm{i}').id
+            for i in range(count)
+        ]
+
+    def _get(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_before_id_walks_history_newest_first(self):
+        ids = self._create_messages(7)
+        seen, params = [], {'limit': 3}
+        while True:
+            body = self._get(**params)
+            self.assertNotIn('count', body)
+            seen.extend(item['id'] for item in body['results'])
+            if not body['has_more']:
+                self.assertIsNone(body['next_before_id'])
+                break
+            params = {'limit': 3, 'before_id': body['next_before_id']}
+        self.assertEqual(seen, ids[::-1])
+
+    def test_after_id_returns_newer_messages_oldest_first(self):
+        ids = self._create_messages(7)
+        seen, after_id = [], ids[0]
+        while True:
+            body = self._get(limit=3, after_id=after_id)
+            seen.extend(item['id'] for item in body['results'])
+            after_id = body['next_after_id']
+            if not body['has_more']:
+                break
+        self.assertEqual(seen, ids[1:])
+        # İmleç en yeni mesajdaysa boş sayfa, imleç yerinde kalır
+        self.assertEqual(self._get(after_id=ids[-1]), {'results': [], 'has_more': False, 'next_after_id': ids[-1]})
+
+    def test_page_exactly_at_limit_has_no_more(self):
+        ids = self._create_messages(3)
+        body = self._get(limit=3)
+        self.assertEqual([item['id'] for item in body['results']], ids[::-1])
+        self.assertFalse(body['has_more'])
+        self.assertIsNone(body['next_before_id'])
+        self.assertEqual(self._get(limit=3, before_id=ids[0])['results'], [])
+
+    def test_empty_conversation(self):
+        self.assertEqual(self._get(), {'results': [], 'has_more': False, 'next_before_id': None, 'next_offset': None})
+        for params in ({'before_id': 1}, {'after_id': 1}):
+            with self.subTest(**params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+    def test_invalid_cursor_parameters(self):
+        ids = self._create_messages(2)
+        for params in ({'before_id': ids[0], 'after_id': ids[1]}, {'before_id': 'x'}, {'limit': 'x'}):
+            with self.subTest(**params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+@mock.patch('chat.presence.lookup', return_value={})
+class ConversationDeltaSyncTests(TestCase):
+    def setUp(self):
+        self.user, self.peer, self.third = [
+            CustomUser.objects.create_user(
+                username=f'sync-{i}@example.com', email=f'sync-{i}@example.com', password='x',
+                role='client', is_verified=True, is_active=True,
+            )
+            for i in range(3)
+        ]
+        self.stale = Conversation.objects.create(user1_id=self.user.id, user2_id=self.peer.id)
+        self.active = Conversation.objects.create(user1_id=self.user.id, user2_id=self.third.id)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        # Senkron noktası örtüşme penceresinin ötesinde; sonrasında sadece active değişir
+        past = timezone.now() - timedelta(minutes=5)
+        Conversation.objects.filter(pk__in=[self.stale.pk, self.active.pk]).update(updated_at=past)
+        self.since = sync.make_token(past + timedelta(minutes=1))
+
+    def _sync(self, since):
+        return self.client.get('/api/v1/chat/conversations/', {'since': since})
+
+    def test_returns_conversations_updated_after_since(self, _lookup):
+        self.active.record_message(self.third.id, 'merhaba', timezone.now())
+        body = self._sync(self.since).json()
+        self.assertFalse(body['reset'])
+        self.assertEqual([item['id'] for item in body['results']], [self.active.id])
+        self.assertEqual(body['deleted'], [])
+        self.assertGreaterEqual(int(body['sync_token']), int(self.since))
+
+    def test_returns_tombstones_for_deleted_conversations(self, _lookup):
+        conversation_id = self.stale.id
+        response = self.client.delete(f'/api/v1/chat/conversations/{conversation_id}/messages')
+        self.assertEqual(response.status_code, 204)
+        body = self._sync(self.since).json()
+        self.assertEqual(body['results'], [])
+        self.assertEqual(body['deleted'], [conversation_id])
+        # Karşı taraf da silindiğini öğrenir, diğer kullanıcılar öğrenmez
+        self.assertEqual(sync.deleted_since(self.peer, sync.parse_token(self.since)), [conversation_id])
+        self.assertEqual(sync.deleted_since(self.third, sync.parse_token(self.since)), [])
+
+    def test_invalid_since_is_rejected(self, _lookup):
+        for since in ('abc', '-1', '1.5', str(10 ** 30)):
+            with self.subTest(since=since):
+                self.assertEqual(self._sync(since).status_code, 400)
+
+    def test_future_or_expired_since_requests_reset(self, _lookup):
+        future = sync.make_token(timezone.now() + timedelta(hours=1))
+        expired = sync.make_token(timezone.now() - timedelta(days=sync.TOMBSTONE_RETENTION_DAYS + 1))
+        for since in (future, expired):
+            with self.subTest(since=since):
+                body = self._sync(since).json()
+                self.assertEqual((body['reset'], body['results'], body['deleted']), (True, [], []))
+
+
+class ClearedNotificationTests(RedisTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.sender, self.recipient = [
+            CustomUser.objects.create_user(
+                username=f'cleared-{i}@example.com', email=f'cleared-{i}@example.com', password='x',
+                role='client', is_verified=True, is_active=True,
+            )
+            for i in range(2)
+        ]
+        self.conv = Conversation.objects.create(user1_id=self.sender.id, user2_id=self.recipient.id)
+
+    def _send(self, user, count=1):
+        return [Message.objects.create(conversation=self.conv, sender_user=user, content='m').id for _ in range(count)]
+
+    def _cleared(self, message_ids):
+        return [cleared.is_cleared(self.recipient.id, self.conv.id, message_id) for message_id in message_ids]
+
+    def _state(self):
+        watermark = self.redis.zscore(cleared.WATERMARK_KEY.format(user_id=self.recipient.id), self.conv.id)
+        pending = self.redis.zrange(cleared.IDS_KEY.format(user_id=self.recipient.id, conversation_id=self.conv.id), 0, -1)
+        return watermark, [int(member) for member in pending]
+
+    def test_contiguous_clears_advance_watermark(self):
+        first, second, third = self._send(self.sender, 3)
+        self.assertEqual(cleared.clear(self.recipient.id, [first, second]), 2)
+        self.assertEqual(self._state(), (second, []))
+        self.assertEqual(self._cleared([first, second, third]), [True, True, False])
+
+    def test_gap_is_kept_until_closed_then_compacted(self):
+        ids = self._send(self.sender, 4)
+        cleared.clear(self.recipient.id, [ids[0], ids[2]])
+        self.assertEqual(self._state(), (ids[0], [ids[2]]))
+        self.assertEqual(self._cleared(ids), [True, False, True, False])
+
+        cleared.clear(self.recipient.id, [ids[1]])
+        self.assertEqual(self._state(), (ids[2], []))
+        self.assertEqual(self._cleared(ids), [True, True, True, False])
+
+        # Watermark'tan sonra gelen mesajlar görünmeye devam eder
+        newer = self._send(self.sender, 1)[0]
+        self.assertEqual(self._cleared([newer]), [False])
+
+    def test_own_messages_do_not_block_compaction(self):
+        incoming = self._send(self.sender)[0]
+        self._send(self.recipient)
+        later = self._send(self.sender)[0]
+        cleared.clear(self.recipient.id, [incoming, later])
+        self.assertEqual(self._state(), (later, []))
+
+    def test_only_incoming_messages_in_own_conversations_are_recorded(self):
+        own = self._send(self.recipient)[0]
+        outsider = CustomUser.objects.create_user(
+            username='cleared-x@example.com', email='cleared-x@example.com', password='x', role='client',
+        )
+        other_conv = Conversation.objects.create(user1_id=self.sender.id, user2_id=outsider.id)
+        foreign = Message.objects.create(conversation=other_conv, sender_user=self.sender, content='m').id
+        self.assertEqual(cleared.clear(self.recipient.id, [own, foreign, 'x']), 0)
+        self.assertEqual(self._state(), (None, []))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TypingThrottleTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.throttle = TypingThrottle(clock=self.clock)
+
+    def test_repeated_start_is_refreshed_only_after_interval(self):
+        self.assertTrue(self.throttle.start())
+        self.clock.now += typing_state.REFRESH_INTERVAL - 0.1
+        self.assertFalse(self.throttle.start())
+        self.clock.now += 0.1
+        self.assertTrue(self.throttle.start())
+        self.assertEqual(self.throttle.take_counters(), {'received': 3, 'published': 2, 'suppressed_debounce': 1})
+
+    def test_publishes_are_limited_per_minute_window(self):
+        for _ in range(typing_state.MAX_PUBLISHES_PER_MINUTE):
+            self.assertTrue(self.throttle.start())
+            self.assertTrue(self.throttle.stop())
+        self.assertFalse(self.throttle.start())
+        self.assertEqual(self.throttle.counters['suppressed_rate'], 1)
+        self.clock.now += 60
+        self.assertTrue(self.throttle.start())
+
+    def test_stop_passes_through_when_rate_limited(self):
+        for _ in range(typing_state.MAX_PUBLISHES_PER_MINUTE - 1):
+            self.throttle.start()
+            self.throttle.stop()
+        self.assertTrue(self.throttle.start())
+        # Pencere doldu; yayınlanmış "yazıyor" durumu yine de kapatılabilmeli
+        self.assertTrue(self.throttle.stop(expired=True))
+        self.assertFalse(self.throttle.start())
+        self.assertFalse(self.throttle.stop())
+        self.assertEqual(self.throttle.counters['expired'], 1)
+
+    def test_stop_request_alone_publishes_nothing(self):
+        self.throttle.stop_requested()
+        self.assertFalse(self.throttle.stop())
+        self.assertEqual(self.throttle.take_counters(), {'received': 1, 'suppressed_debounce': 1})
+
+    def test_throttles_are_independent(self):
+        other = TypingThrottle(clock=self.clock)
+        for _ in range(typing_state.MAX_PUBLISHES_PER_MINUTE):
+            self.throttle.start()
+            self.throttle.stop()
+        self.assertFalse(self.throttle.start())
+        self.assertTrue(other.start())
+
+
+@mock.patch('chat.typing_state.flush_metrics')
+@mock.patch('chat.presence.touch')
+@mock.patch('chat.presence.leave')
+class TypingEventTests(TestCase):
+    def setUp(self):
+        self.first, self.second, self.third = [
+            CustomUser.objects.create_user(
+                username=f'typing-{i}@example.com', email=f'typing-{i}@example.com', password='x',
+                role='client', is_verified=True, is_active=True,
+            )
+            for i in range(3)
+        ]
+        self.conv = Conversation.objects.create(user1_id=self.first.id, user2_id=self.second.id)
+        self.other_conv = Conversation.objects.create(user1_id=self.first.id, user2_id=self.third.id)
+        use_channel_layer(self, InMemoryChannelLayer())
+
+    async def _connect(self, user, conv):
+        socket = WebsocketCommunicator(WithUser(user), f'/ws/chat/{conv.id}/')
+        connected, _ = await socket.connect()
+        self.assertTrue(connected)
+        return socket
+
+    async def _typing_frames(self, socket):
+        frames = []
+        while not await socket.receive_nothing(timeout=0.1):
+            frame = await socket.receive_json_from()
+            if frame['event'] == 'typing':
+                frames.append((frame['data']['typing_user_id'], frame['data']['conversation'], frame['data']['is_typing']))
+        return frames
+
+    async def test_typing_is_keyed_by_user_and_conversation(self, *mocks):
+        first, second = await self._connect(self.first, self.conv), await self._connect(self.second, self.conv)
+        other = await self._connect(self.first, self.other_conv)
+        for _ in range(3):
+            await first.send_json_to({'event': 'typing.start'})
+        await second.send_json_to({'event': 'typing.start'})
+
+        frames = await self._typing_frames(second)
+        self.assertEqual(frames, [(self.first.id, self.conv.id, True), (self.second.id, self.conv.id, True)])
+        # Aynı kullanıcının diğer konuşmasına ve sınırına yansımaz
+        self.assertEqual(await self._typing_frames(other), [])
+        await other.send_json_to({'event': 'typing.start'})
+        self.assertEqual(await self._typing_frames(other), [(self.first.id, self.other_conv.id, True)])
+        for socket in (first, second, other):
+            await socket.disconnect()
@@ -0,0 +1,99 @@
+"""
+"Yazıyor" göstergesi birleştirme ve hız sınırı (soket başına)
+İstemci her tuşta typing.start, 1 sn duraklamada typing.stop gönderir. Sunucu bunları tek bir
+"yazıyor" durumuna indirger ve conv_<id> grubuna sadece durum değişince yayınlar:
+- start: durum zaten yayınlandıysa REFRESH_INTERVAL dolmadan tekrar yayınlanmaz; yayınlanan durum
+  expires_in (TYPING_TTL) taşır ve istemci stop göndermezse sunucu TYPING_TTL sonunda düşürür
+- stop: STOP_DEBOUNCE kadar bekletilir; bu sürede yeniden yazmaya başlanırsa stop/start hiç yayınlanmaz
+- dakikada en fazla MAX_PUBLISHES_PER_MINUTE "yazıyor" yayını (stop sınırlanmaz, göstergede takılı kalmasın)
+
+Bastırılan olay sayıları soket üzerinde biriktirilir ve Redis'e toplu yazılır (her olayda değil).
+"""
+from __future__ import annotations
+
+import time
+from collections import Counter
+
+from core.utils.redis_client import get_redis
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+TYPING_TTL = 5.0
+REFRESH_INTERVAL = 3.0
+STOP_DEBOUNCE = 1.0
+MAX_PUBLISHES_PER_MINUTE = 30
+METRICS_KEY = 'chat_typing:metrics'
+# Bu kadar olaydan sonra (ve soket kapanınca) sayaçlar Redis'e yazılır
+FLUSH_EVERY = 100
+
+
+class TypingThrottle:
+    """Tek soketin yayınlanmış "yazıyor" durumu, hız sınırı penceresi ve sayaçları"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.typing = False
+        self.published_at = 0.0
+        self.window_start = 0.0
+        self.window_count = 0
+        self.counters = Counter()
+
+    def start(self) -> bool:
+        """typing.start geldi; "yazıyor" yayınlanmalı mı"""
+        self.counters['received'] += 1
+        now = self.clock()
+        if self.typing and now - self.published_at < REFRESH_INTERVAL:
+            self.counters['suppressed_debounce'] += 1
+            return False
+        if now - self.window_start >= 60:
+            self.window_start, self.window_count = now, 0
+        if self.window_count >= MAX_PUBLISHES_PER_MINUTE:
+            self.counters['suppressed_rate'] += 1
+            return False
+        self.window_count += 1
+        self.typing = True
+        self.published_at = now
+        self.counters['published'] += 1
+        return True
+
+    def stop_requested(self) -> None:
+        """typing.stop geldi; kendisi yayınlanmaz, gecikmeli stop ile birleştirilir"""
+        self.counters['received'] += 1
+        self.counters['suppressed_debounce'] += 1
+
+    def stop(self, expired: bool = False) -> bool:
+        """Gecikmeli stop veya soket kapanışı; "yazmıyor" yayınlanmalı mı"""
+        if not self.typing:
+            return False
+        self.typing = False
+        self.counters['published'] += 1
+        if expired:
+            self.counters['expired'] += 1
+        return True
+
+    def should_flush(self) -> bool:
+        return self.counters['received'] >= FLUSH_EVERY
+
+    def take_counters(self) -> dict:
+        counters, self.counters = dict(self.counters), Counter()
+        return counters
+
+
+def flush_metrics(counters: dict) -> None:
+    if not counters:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for field, value in counters.items():
+            pipe.hincrby(METRICS_KEY, field, value)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Typing metrics flush failed: {e}")
+
+
+def typing_stats() -> dict:
+    """Birikmiş sayaçlar (izleme için): received, published, suppressed_debounce, suppressed_rate, expired"""
+    metrics = get_redis().hgetall(METRICS_KEY)
+    return {key.decode(): int(value) for key, value in metrics.items()}
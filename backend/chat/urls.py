@@ -3,6 +3,7 @@ from .views import (
     ConversationListCreateView,
     ConversationMessagesView,
     ConversationReadView,
+    PresenceView,
 )
 
 
@@ -10,6 +11,7 @@ urlpatterns = [
     path('conversations/', ConversationListCreateView.as_view()),
     path('conversations/<int:conversation_id>/messages', ConversationMessagesView.as_view()),
     path('conversations/<int:conversation_id>/read', ConversationReadView.as_view()),
+    path('presence', PresenceView.as_view()),
 ]
 
 
@@ -1,6 +1,6 @@
 from typing import Optional
 
-from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
@@ -12,14 +12,31 @@ from asgiref.sync import async_to_sync
 
 from core.models import CustomUser
 
+from . import presence, sync
+from .delivery import deliver_message_sync, notify_recipient
 from .models import Conversation, Message
-from .serializers import ConversationSerializer, MessageSerializer
+from .serializers import ConversationSerializer, MessageSerializer, last_messages_for, with_last_message_id
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_PRESENCE_USERS = 100
+
+
+def _optional_int(value) -> Optional[int]:
+    return int(value) if value not in (None, '') else None
 
 
 class ConversationListCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        """
+        Konuşma listesi
+        - Parametresiz: tüm liste (dizi, eski istemciler için)
+        - limit / cursor: son aktiviteye göre keyset sayfalaması; next_cursor ve sync_token döner
+        - since=<sync_token>: sadece o andan beri değişen konuşmalar ve silinenlerin ID'leri (deleted)
+        """
         user = request.user
         
         # Chat permission kontrolü
@@ -32,9 +49,63 @@ class ConversationListCreateView(APIView):
         )
         
         # User bilgilerini de çek
-        qs = qs.select_related('user1', 'user2').order_by('-last_message_at', '-updated_at')
-        data = ConversationSerializer(qs, many=True, context={'request': request}).data
-        return Response(data)
+        qs = with_last_message_id(qs.select_related('user1', 'user2'))
+        params = request.query_params
+        # Token sorgudan önce alınır; sorgu sırasında yapılan değişiklikler bir sonraki senkrona kalır
+        sync_token = sync.make_token()
+
+        if params.get('since'):
+            try:
+                since = sync.parse_token(params['since'])
+            except (TypeError, ValueError, OverflowError):
+                return Response({'detail': 'Invalid since token'}, status=400)
+            if sync.needs_reset(since):
+                return Response({'reset': True, 'results': [], 'deleted': [], 'sync_token': sync_token})
+            changed = sync.changed_since(qs, since).order_by('-updated_at')
+            return Response({
+                'reset': False,
+                'results': self._serialize(request, changed),
+                'deleted': sync.deleted_since(user, since),
+                'sync_token': sync_token,
+            })
+
+        if params.get('limit') or params.get('cursor'):
+            try:
+                limit = min(max(int(params.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+                cursor = sync.decode_cursor(params['cursor']) if params.get('cursor') else None
+            except (TypeError, ValueError, OverflowError):
+                return Response({'detail': 'Invalid pagination parameters'}, status=400)
+            page_qs = sync.order_by_activity(qs)
+            if cursor is not None:
+                page_qs = sync.after_cursor(page_qs, cursor)
+            page = list(page_qs[:limit + 1])
+            has_more = len(page) > limit
+            page = page[:limit]
+            return Response({
+                'results': self._serialize(request, page),
+                'has_more': has_more,
+                'next_cursor': sync.encode_cursor(page[-1]) if has_more else None,
+                'sync_token': sync_token,
+            })
+
+        qs = qs.order_by('-last_message_at', '-updated_at')
+        return Response(self._serialize(request, qs))
+
+    def _serialize(self, request, conversations):
+        # Son mesajlar tek sorguda; okunmamış sayılar denormalize alanlardan (satır başı sorgu yok)
+        conversations = list(conversations)
+        last_messages = last_messages_for(conversations)
+        # Karşı tarafların çevrimiçi durumu tek Redis round-trip'i
+        other_user_ids = [
+            conv.user2_id if conv.user1_id == request.user.id else conv.user1_id for conv in conversations
+        ]
+        return ConversationSerializer(
+            conversations, many=True, context={
+                'request': request,
+                'last_messages': last_messages,
+                'presence': presence.lookup(other_user_ids),
+            }
+        ).data
 
     def post(self, request):
         user = request.user
@@ -80,6 +151,12 @@ class ConversationMessagesView(APIView):
         return conv.user1_id == user.id or conv.user2_id == user.id
 
     def get(self, request, conversation_id: int):
+        """
+        Mesaj geçmişi (imleç sayfalaması)
+        - Varsayılan / before_id: imleçten eski mesajlar, yeniden eskiye; next_before_id ile devam edilir
+        - after_id: imleçten yeni mesajlar, eskiden yeniye (yeniden bağlanan istemci kaçırdıklarını alır)
+        - offset: eski istemciler için korunur
+        """
         user = request.user
         
         # Chat permission kontrolü
@@ -87,30 +164,60 @@ class ConversationMessagesView(APIView):
             return Response({'detail': 'Chat yapmak için doğrulanmış hesap gerekli.'}, status=403)
 
         try:
-            conv = Conversation.objects.select_related('user1', 'user2').get(id=conversation_id)
+            conv = Conversation.objects.get(id=conversation_id)
         except Conversation.DoesNotExist:
             return Response({'detail': 'Conversation not found'}, status=404)
 
         if not self.has_access(conv, user):
             return Response({'detail': 'Forbidden'}, status=403)
 
-        limit = int(request.query_params.get('limit', 20))  # Default 20 mesaj
-        offset = int(request.query_params.get('offset', 0))
-        
-        # Performans için sadece gerekli field'ları çek
-        msgs = conv.messages.select_related('sender_user').only(
-            'id', 'content', 'sender_user', 'created_at'
-        ).order_by('-created_at')[offset:offset + limit]
-        
-        # Toplam mesaj sayısını cache'le
-        total_count = conv.messages.count()
-        
-        data = MessageSerializer(msgs, many=True).data
+        try:
+            limit = min(max(int(request.query_params.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+            before_id = _optional_int(request.query_params.get('before_id'))
+            after_id = _optional_int(request.query_params.get('after_id'))
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except (TypeError, ValueError):
+            return Response({'detail': 'Invalid pagination parameters'}, status=400)
+        if before_id is not None and after_id is not None:
+            return Response({'detail': 'before_id and after_id cannot be combined'}, status=400)
+
+        # Serializer'ın kullandığı alanlar; ertelenmiş alan satır başına sorgu demektir
+        msgs = conv.messages.only(
+            'id', 'conversation_id', 'sender_user_id', 'content', 'message_type', 'status', 'created_at', 'updated_at'
+        )
+        cursor_id = before_id if before_id is not None else after_id
+        if cursor_id is not None:
+            # Keyset: (created_at, id) imlecin öncesi/sonrası, (conversation, created_at) indeksinde
+            cursor_at = msgs.filter(id=cursor_id).values_list('created_at', flat=True).first()
+            if cursor_at is None:
+                return Response({'detail': 'Invalid cursor'}, status=400)
+            if after_id is not None:
+                msgs = msgs.filter(Q(created_at__gt=cursor_at) | Q(created_at=cursor_at, id__gt=cursor_id))
+            else:
+                msgs = msgs.filter(Q(created_at__lt=cursor_at) | Q(created_at=cursor_at, id__lt=cursor_id))
+
+        # COUNT yerine limit+1 kayıt çekilir; fazladan kayıt varsa devamı var demektir
+        if after_id is not None:
+            page = list(msgs.order_by('created_at', 'id')[:limit + 1])
+        else:
+            start = offset if before_id is None else 0
+            page = list(msgs.order_by('-created_at', '-id')[start:start + limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+
+        data = MessageSerializer(page, many=True).data
+        if after_id is not None:
+            return Response({
+                'results': data,
+                'has_more': has_more,
+                'next_after_id': page[-1].id if page else after_id,
+            })
         return Response({
-            'results': data, 
-            'count': total_count,
-            'has_more': (offset + limit) < total_count,
-            'next_offset': offset + limit if (offset + limit) < total_count else None
+            'results': data,
+            'has_more': has_more,
+            'next_before_id': page[-1].id if has_more else None,
+            # Eski istemciler için offset sayfalaması (before_id tercih edilmeli)
+            'next_offset': offset + limit if has_more and before_id is None else None,
         })
 
     def post(self, request, conversation_id: int):
@@ -139,30 +246,12 @@ class ConversationMessagesView(APIView):
             content=content,
         )
 
-        # Update conversation denorm fields
-        conv.last_message_text = content[:500]
-        conv.last_message_at = msg.created_at
-        
-        # Unread count'u güncelle - karşı tarafın okumadığı mesaj sayısı
-        conv.unread_count = (conv.unread_count or 0) + 1
-            
-        conv.save(update_fields=['last_message_text', 'last_message_at', 'unread_count'])
+        # Update conversation denorm fields - karşı tarafın okunmamış sayacı F() ile artar
+        conv.record_message(user.id, content, msg.created_at)
 
-        # Realtime broadcast to WS group so other participant sees instantly (even if sender used REST)
-        try:
-            channel_layer = get_channel_layer()
-            payload = {
-                'id': msg.id,
-                'conversation': conv.id,
-                'content': msg.content,
-                'sender_user': user.id,
-                'created_at': msg.created_at.isoformat(),
-            }
-            if channel_layer is not None:
-                async_to_sync(channel_layer.group_send)(f"conv_{conv.id}", { 'type': 'message.new', 'payload': payload })
-        except Exception:
-            # Realtime yayın başarısız olsa da REST cevabı dön
-            pass
+        # Realtime: sohbet grubu ve karşı tarafın global soketleri (WS gönderimiyle aynı yol)
+        deliver_message_sync(msg, (conv.user1_id, conv.user2_id))
+        notify_recipient(msg, (conv.user1_id, conv.user2_id))
 
         return Response(MessageSerializer(msg).data, status=201)
 
@@ -182,7 +271,10 @@ class ConversationMessagesView(APIView):
             return Response({'detail': 'Forbidden'}, status=403)
 
         other_user_id = conv.user2_id if conv.user1_id == user.id else conv.user1_id
-        conv.delete()
+        with transaction.atomic():
+            conv.delete()
+            # Diğer cihazlar ve karşı taraf bir sonraki delta senkronunda silindiğini öğrenir
+            sync.record_deletion(conversation_id, [user.id, other_user_id])
 
         # İsteğe bağlı bildirim
         try:
@@ -193,6 +285,8 @@ class ConversationMessagesView(APIView):
                     'deleted': True,
                 }
                 async_to_sync(channel_layer.group_send)(f"user_{other_user_id}", { 'type': 'conversation.update', 'payload': payload })
+                # Açık sohbet soketleri cache'lenmiş üyeliği bırakıp kapanır
+                async_to_sync(channel_layer.group_send)(f"conv_{conversation_id}", { 'type': 'conversation.deleted' })
         except Exception:
             pass
 
@@ -214,22 +308,40 @@ class ConversationReadView(APIView):
         except Conversation.DoesNotExist:
             return Response({'detail': 'Conversation not found'}, status=404)
 
-        # Kullanıcı conversation'da var mı?
-        if user and (conv.user1_id == user.id or conv.user2_id == user.id):
-            # Hangi user olduğunu belirle ve last_read_at güncelle
-            if conv.user1_id == user.id:
-                conv.user1_last_read_at = timezone.now()
-            else:
-                conv.user2_last_read_at = timezone.now()
-            
-            # Unread count'u sıfırla
-            conv.unread_count = 0
-            conv.save(update_fields=['user1_last_read_at', 'user2_last_read_at', 'unread_count'])
+        # Kullanıcı conversation'da ise last_read_at güncellenir ve kendi sayacı sıfırlanır
+        if conv.mark_read(user):
             return Response({'detail': 'ok'})
 
         return Response({'detail': 'Forbidden'}, status=403)
 
 
+class PresenceView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Toplu çevrimiçi durumu: ?user_ids=1,2,3 (en fazla MAX_PRESENCE_USERS)
+        Sadece kullanıcının konuşma yaptığı kişiler döner; konuşma listesinin periyodik yenilemesi için.
+        """
+        user = request.user
 
- 
+        # Chat permission kontrolü
+        if not user.can_chat():
+            return Response({'detail': 'Chat yapmak için doğrulanmış hesap gerekli.'}, status=403)
 
+        try:
+            user_ids = {int(value) for value in request.query_params.get('user_ids', '').split(',') if value.strip()}
+        except ValueError:
+            return Response({'detail': 'Invalid user_ids'}, status=400)
+        if len(user_ids) > MAX_PRESENCE_USERS:
+            return Response({'detail': f'At most {MAX_PRESENCE_USERS} user_ids'}, status=400)
+        if not user_ids:
+            return Response({'results': {}})
+
+        partner_ids = set()
+        for user1_id, user2_id in Conversation.objects.filter(
+            Q(user1=user, user2_id__in=user_ids) | Q(user2=user, user1_id__in=user_ids)
+        ).values_list('user1_id', 'user2_id'):
+            partner_ids.add(user2_id if user1_id == user.id else user1_id)
+
+        return Response({'results': presence.lookup(sorted(partner_ids))})
@@ -1,17 +1,24 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import logging
 from typing import Optional
 
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from django.contrib.auth.models import AnonymousUser
 from django.conf import settings
 from channels.db import database_sync_to_async
 import jwt
-from django.core.cache import cache
+from django.db import IntegrityError
 
+from . import presence, typing_state
+from .delivery import deliver_message, notify_recipient
 from .models import Conversation, Message
 
+logger = logging.getLogger(__name__)
+
 
 class GlobalChatConsumer(AsyncJsonWebsocketConsumer):
     """Global chat consumer - tüm kullanıcılar için mesaj dinleme"""
@@ -32,16 +39,28 @@ class GlobalChatConsumer(AsyncJsonWebsocketConsumer):
         self.group_name = f"user_{user.id}"
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
+        await self._update_presence(presence.touch)
         
         print(f"DEBUG Global WS: User {user.id} connected to global chat")
 
     async def disconnect(self, close_code):
         if hasattr(self, 'group_name'):
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            await self._update_presence(presence.leave)
 
     async def receive_json(self, content, **kwargs):
-        # Global consumer sadece mesaj alır, göndermez
-        pass
+        # Global consumer mesaj göndermez; istemcinin ping'i çevrimiçi durumunu uzatır
+        if content.get('event') == 'ping':
+            await self._update_presence(presence.touch)
+            # İstemci watchdog'u sessiz soketi yeniden bağlamasın
+            await self.send_json({'event': 'pong', 't': content.get('t')})
+
+    async def _update_presence(self, update):
+        try:
+            await sync_to_async(update)(self.scope['user'].id, self.channel_name)
+        except Exception as e:
+            # Presence hatası soketi etkilemez
+            logger.warning(f"Presence update failed for user {self.scope['user'].id}: {e}")
 
     async def message_new(self, event):
         """Yeni mesaj geldiğinde kullanıcıya bildir"""
@@ -50,6 +69,17 @@ class GlobalChatConsumer(AsyncJsonWebsocketConsumer):
             'data': event['payload']
         })
 
+    async def message_delivered(self, event):
+        """Karşı taraftan yeni mesaj: tek grup olayı, istemciye iki çerçeve (bkz. chat.delivery)"""
+        await self.send_json({
+            'event': 'message.new',
+            'data': event['message']
+        })
+        await self.send_json({
+            'event': 'conversation.update',
+            'data': event['conversation']
+        })
+
     async def conversation_update(self, event):
         """Conversation güncellendiğinde kullanıcıya bildir"""
         await self.send_json({
@@ -80,24 +110,19 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
             await self.close(code=4403)  # forbidden - cannot chat
             return
 
-        # Permission check
-        has_access = await self._has_access(user)
-        if not has_access:
+        # Permission check - üyelik soket boyunca cache'lenir (tek sorgu);
+        # konuşma silinirse conversation.deleted grup olayıyla geçersiz kılınır
+        participants = await self._get_participants()
+        if participants is None or user.id not in participants:
             await self.close(code=4403)  # forbidden
             return
+        self.participants = participants
+        # Kullanıcı conversation'da user1 mi user2 mi?
+        self.user_position = 'user1' if participants[0] == user.id else 'user2'
+        self.other_user_id = participants[1] if participants[0] == user.id else participants[0]
 
-        # Kullanıcının conversation'daki pozisyonunu belirle
-        try:
-            conv = await self._get_conversation()
-            # Kullanıcı conversation'da user1 mi user2 mi?
-            if conv.user1_id == user.id:
-                self.user_position = 'user1'
-            elif conv.user2_id == user.id:
-                self.user_position = 'user2'
-            else:
-                self.user_position = None
-        except Exception:
-            self.user_position = None
+        self.typing_throttle = typing_state.TypingThrottle()
+        self.typing_stop_task = None
 
         self.group_name = f"conv_{self.conversation_id}"
         await self.channel_layer.group_add(self.group_name, self.channel_name)
@@ -105,84 +130,78 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
 
     async def disconnect(self, close_code):
         if hasattr(self, 'group_name'):
+            # Yazarken kapanan soketin göstergesi karşı tarafta takılı kalmasın
+            if self.typing_stop_task:
+                self.typing_stop_task.cancel()
+                self.typing_stop_task = None
+            if self.typing_throttle.stop():
+                await self._publish_typing(False)
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            await sync_to_async(typing_state.flush_metrics)(self.typing_throttle.take_counters())
 
     async def receive_json(self, content, **kwargs):
         event = content.get('event')
         if event == 'message.send':
             await self._handle_send_message(content)
         elif event == 'typing.start' or event == 'typing.stop':
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    'type': 'typing.event',
-                    'payload': {
-                        'user_id': getattr(self.scope.get('user'), 'id', None),
-                        'is_typing': event == 'typing.start',
-                        'conversation': int(self.conversation_id),
-                        # Typing event'ini gönderen kullanıcının ID'si
-                        'typing_user_id': getattr(self.scope.get('user'), 'id', None),
-                    },
-                },
-            )
+            await self._handle_typing(event == 'typing.start')
+
+    async def _handle_typing(self, is_typing: bool):
+        """Start/stop akışını tek "yazıyor" durumuna indirger (bkz. chat.typing_state)"""
+        throttle = self.typing_throttle
+        if is_typing:
+            if throttle.start():
+                await self._publish_typing(True)
+            self._schedule_typing_stop(typing_state.TYPING_TTL, expired=True)
+        else:
+            throttle.stop_requested()
+            if throttle.typing:
+                self._schedule_typing_stop(typing_state.STOP_DEBOUNCE)
+        if throttle.should_flush():
+            await sync_to_async(typing_state.flush_metrics)(throttle.take_counters())
+
+    def _schedule_typing_stop(self, delay: float, expired: bool = False):
+        if self.typing_stop_task:
+            self.typing_stop_task.cancel()
+        self.typing_stop_task = asyncio.ensure_future(self._typing_stop_later(delay, expired))
+
+    async def _typing_stop_later(self, delay: float, expired: bool):
+        await asyncio.sleep(delay)
+        # Yayın sırasında yeni bir start bu görevi iptal etmesin
+        self.typing_stop_task = None
+        if self.typing_throttle.stop(expired=expired):
+            await self._publish_typing(False)
+
+    async def _publish_typing(self, is_typing: bool):
+        user_id = getattr(self.scope.get('user'), 'id', None)
+        payload = {
+            'user_id': user_id,
+            'is_typing': is_typing,
+            'conversation': int(self.conversation_id),
+            # Typing event'ini gönderen kullanıcının ID'si
+            'typing_user_id': user_id,
+        }
+        if is_typing:
+            # İstemci stop almazsa göstergeyi bu süre sonunda kapatabilir
+            payload['expires_in'] = typing_state.TYPING_TTL
+        await self.channel_layer.group_send(self.group_name, {'type': 'typing.event', 'payload': payload})
 
     async def typing_event(self, event):
         await self.send_json({'event': 'typing', 'data': event['payload']})
 
     async def message_new(self, event):
+        # Karşı tarafın global bildirimi chat.delivery tarafından ayrıca yayınlanır
         await self.send_json({'event': 'message.new', 'data': event['payload']})
-        
-        # Global consumer'lara da bildir
-        user = self.scope.get('user')
-        if user:
-            # Karşı tarafa bildir
-            other_user_id = event['payload'].get('other_user_id')
-            if other_user_id:
-                # Eğer karşı kullanıcı bu mesaj ID'sini cleared olarak işaretlediyse global bildirimi atla
-                try:
-                    cleared = set(cache.get(f"notifications_cleared:{other_user_id}", []))
-                    if int(event['payload'].get('id')) not in cleared:
-                        await self.channel_layer.group_send(
-                            f"user_{other_user_id}",
-                            {
-                                'type': 'message_new',
-                                'payload': event['payload']
-                            }
-                        )
-                except Exception:
-                    # Hata durumunda yine de mesajı iletmeye çalış
-                    await self.channel_layer.group_send(
-                        f"user_{other_user_id}",
-                        {
-                            'type': 'message_new',
-                            'payload': event['payload']
-                        }
-                    )
-                
-                # Conversation update'i de gönder
-                await self.channel_layer.group_send(
-                    f"user_{other_user_id}",
-                    {
-                        'type': 'conversation_update',
-                        'payload': {
-                            'conversation_id': self.conversation_id,
-                            'last_message_text': event['payload'].get('content', ''),
-                            'unread_count': 1
-                        }
-                    }
-                )
 
-    @database_sync_to_async
-    def _get_conversation(self):
-        return Conversation.objects.select_related('user1', 'user2').get(id=self.conversation_id)
+    async def conversation_deleted(self, event):
+        """Konuşma silindi: cache'lenmiş üyelik geçersiz, soket kapatılır"""
+        self.participants = None
+        await self.close(code=4404)
 
-    async def _has_access(self, user) -> bool:
-        try:
-            conv = await self._get_conversation()
-        except Conversation.DoesNotExist:
-            return False
-        # Kullanıcı conversation'da var mı?
-        return conv.user1_id == user.id or conv.user2_id == user.id
+    @database_sync_to_async
+    def _get_participants(self):
+        """(user1_id, user2_id); konuşma yoksa None"""
+        return Conversation.objects.filter(id=self.conversation_id).values_list('user1_id', 'user2_id').first()
 
     async def _handle_send_message(self, content):
         payload = content.get('data') or {}
@@ -191,53 +210,32 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
             return
         user = self.scope.get('user')
 
-        conv = await self._get_conversation()
-        
-        # Kullanıcı conversation'da var mı?
-        if not (conv.user1_id == user.id or conv.user2_id == user.id):
+        # Üyelik connect'te doğrulandı; silinen konuşmada participants None olur
+        if not getattr(self, 'participants', None):
             return
-            
-        # Debug için log ekle
-        print(f"DEBUG WS: User ID: {user.id}, Role: {user.role}")
-        print(f"DEBUG WS: Conv user1 ID: {conv.user1_id}, Conv user2 ID: {conv.user2_id}")
-
-        msg = await self._create_message(conv, user, text)
-        await self._update_conversation(conv, text)
-
-        # Karşı tarafın ID'sini bul
-        other_user_id = conv.user2_id if conv.user1_id == user.id else conv.user1_id
-
-        await self.channel_layer.group_send(
-            self.group_name,
-            {
-                'type': 'message.new',
-                'payload': {
-                    'id': msg.id,
-                    'conversation': conv.id,
-                    'content': msg.content,
-                    'sender_user': user.id,
-                    'other_user_id': other_user_id,
-                    'created_at': msg.created_at.isoformat(),
-                },
-            },
-        )
+
+        conv = Conversation(id=int(self.conversation_id), user1_id=self.participants[0], user2_id=self.participants[1])
+        try:
+            msg = await self._create_message(conv, user, text)
+        except IntegrityError:
+            # Konuşma silindi ama olay henüz gelmedi
+            await self.conversation_deleted({})
+            return
+        await self._update_conversation(conv, user, msg)
+        await deliver_message(msg, self.participants, self.channel_layer)
 
     @database_sync_to_async
     def _create_message(self, conv, user, text):
         return Message.objects.create(
-            conversation=conv,
-            sender_user=user,
+            conversation_id=conv.id,
+            sender_user_id=user.id,
             content=text,
         )
 
     @database_sync_to_async
-    def _update_conversation(self, conv, text):
-        conv.last_message_text = text[:500]
-        conv.last_message_at = conv.messages.last().created_at
-        
-        # Unread count'u güncelle - karşı tarafın okumadığı mesaj sayısı
-        conv.unread_count = (conv.unread_count or 0) + 1
-            
-        conv.save(update_fields=['last_message_text', 'last_message_at', 'unread_count'])
+    def _update_conversation(self, conv, user, msg):
+        # Karşı tarafın okunmamış sayacı F() ile artar
+        conv.record_message(user.id, msg.content, msg.created_at)
+        notify_recipient(msg, self.participants)
 
 
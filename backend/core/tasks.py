@@ -172,10 +172,17 @@ def send_password_reset_email(email: str, user_name: str, reset_url: str) -> boo
         return False
 
 @shared_task
-def send_message_notification_email(recipient_email: str, sender_name: str, message_preview: str) -> bool:
-    """Yeni mesaj bildirimi emaili gönder"""
+def send_message_notification_email(recipient_email: str, sender_name: str, message_preview: str,
+                                    recipient_user_id: Optional[int] = None) -> bool:
+    """Yeni mesaj bildirimi emaili gönder (alıcı global sokete bağlıysa mesajı zaten gördü, atlanır)"""
     try:
         from core.utils.email_service import EmailService
+        from chat import presence
+
+        # Eski imzayla kuyruğa alınmış görevlerde alıcı ID'si yok; presence kontrolü atlanır
+        if recipient_user_id is not None and presence.is_online(recipient_user_id):
+            logger.info(f"Message notification email skipped, user {recipient_user_id} is online")
+            return False
         
         subject = f"Yeni Mesaj: {sender_name}"
         html_content = f"""
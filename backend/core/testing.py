@@ -0,0 +1,34 @@
+"""
+Ham Redis kullanan modüllerin testleri için yardımcılar
+Testler REDIS_URL sunucusunun ayrı bir veritabanında (REDIS_TEST_DB) çalışır ve her testten önce/sonra
+o veritabanı boşaltılır; geliştirme verisine dokunulmaz. Redis erişilemiyorsa test atlanır.
+"""
+from unittest import mock
+
+import redis
+from django.conf import settings
+
+from core.utils import redis_client
+
+REDIS_TEST_DB = 15
+
+
+class RedisTestMixin:
+    """get_redis() test süresince REDIS_TEST_DB'ye bağlı istemciyi döndürür (self.redis)"""
+
+    def setUp(self):
+        super().setUp()
+        pool = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=redis_client.SOCKET_TIMEOUT).connection_pool
+        self.redis = redis.Redis(connection_pool=redis.ConnectionPool(
+            connection_class=pool.connection_class,
+            **dict(pool.connection_kwargs, db=REDIS_TEST_DB),
+        ))
+        try:
+            self.redis.ping()
+        except redis.RedisError as e:
+            self.skipTest(f'Redis erişilemiyor: {e}')
+        self.redis.flushdb()
+        self.addCleanup(self.redis.flushdb)
+        patcher = mock.patch.object(redis_client, '_client', self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
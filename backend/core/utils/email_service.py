@@ -3,7 +3,7 @@ import ssl
 from django.conf import settings
 from django.core.mail import EmailMessage, get_connection
 from django.template.loader import render_to_string
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 from core.tasks import (
     send_appointment_email,
@@ -153,10 +153,11 @@ class EmailService:
             logger.error(f"Async password reset email task failed: {str(e)}")
     
     @staticmethod
-    def send_message_notification(recipient_email: str, sender_name: str, message_preview: str) -> None:
-        """Asenkron yeni mesaj bildirimi gönder"""
+    def send_message_notification(recipient_email: str, sender_name: str, message_preview: str,
+                                  recipient_user_id: Optional[int] = None) -> None:
+        """Asenkron yeni mesaj bildirimi gönder; recipient_user_id verilirse çevrimiçi alıcı görevde atlanır"""
         try:
-            send_message_notification_email.delay(recipient_email, sender_name, message_preview)
+            send_message_notification_email.delay(recipient_email, sender_name, message_preview, recipient_user_id)
         except Exception as e:
             logger.error(f"Async message notification email task failed: {str(e)}")
 
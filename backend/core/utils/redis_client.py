@@ -0,0 +1,28 @@
+"""
+Ham Redis bağlantısı
+Django cache API'sinin sunmadığı veri yapıları (liste, set, HyperLogLog) için kullanılır;
+cache ile aynı REDIS_URL'e bağlanır. İstemci thread-safe'tir ve bağlantı havuzu process başına tektir.
+"""
+import threading
+
+import redis
+from django.conf import settings
+
+_client = None
+_lock = threading.Lock()
+
+# Redis yavaşsa istek yolunu bekletmemek için kısa zaman aşımı (saniye)
+SOCKET_TIMEOUT = 1.0
+
+
+def get_redis() -> redis.Redis:
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = redis.Redis.from_url(
+                    settings.REDIS_URL,
+                    socket_timeout=SOCKET_TIMEOUT,
+                    socket_connect_timeout=SOCKET_TIMEOUT,
+                )
+    return _client
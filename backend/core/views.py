@@ -24,6 +24,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.settings import api_settings as sj_settings
 from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
 from vendors.models import VendorProfile
+from chat import cleared as chat_cleared
 from admin_panel.models import BlogCategory
 from admin_panel.activity_logger import log_support_activity, log_user_activity
 import logging
@@ -545,16 +546,8 @@ def clear_notifications(request):
         if not isinstance(message_ids, list):
             message_ids = []
 
-        cache_key = f"notifications_cleared:{user.id}"
-        cleared: set[int] = set(cache.get(cache_key, []))
-        # Sadece int değerleri al
-        for mid in message_ids:
-            try:
-                cleared.add(int(mid))
-            except Exception:
-                continue
-        # 30 gün sakla
-        cache.set(cache_key, list(cleared), 60 * 60 * 24 * 30)
+        # Kullanıcı + konuşma başına watermark ve seyrek ID seti (chat.cleared)
+        chat_cleared.clear(user.id, message_ids)
 
         return Response({"status": "ok", "cleared_count": len(message_ids)})
     except Exception as e:
@@ -14,6 +14,10 @@ django_asgi_app = get_asgi_application()
 # Django başlatıldıktan sonra import et (app registry hazır)
 from chat.ws_consumers import ChatConsumer, GlobalChatConsumer  # noqa: E402
 from chat.middleware import JWTAuthMiddleware  # noqa: E402
+from vendors.autocomplete import warm_autocomplete_index  # noqa: E402
+
+# Arama önerileri indeksini worker açılırken arka planda yükle
+warm_autocomplete_index()
 
 websocket_urlpatterns = [
     re_path(r"ws/chat/(?P<conversation_id>\d+)/$", ChatConsumer.as_asgi()),
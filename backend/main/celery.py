@@ -69,6 +69,56 @@ app.conf.beat_schedule = {
             'queue': 'default',
         },
     },
+    # Aylık yorum sayacı pencereyi UTC ay başına göre tutar; 03:05 TR = 00:05 UTC.
+    # Yeniden hesaplama idempotent: her gün çalışır, kaçan bir çalışma sayacı en fazla bir gün bozuk bırakır
+    'roll-monthly-review-counts': {
+        'task': 'vendors.roll_monthly_review_counts',
+        'schedule': crontab(minute=5, hour=3),
+        'options': {
+            'queue': 'default',
+        },
+    },
+    # Tamponlanmış profil görüntüleme/arama olaylarını veritabanına yaz
+    'drain-vendor-events': {
+        'task': 'vendors.drain_vendor_events',
+        'schedule': 10.0,
+        'options': {
+            'queue': 'default',
+            'expires': 10,
+        },
+    },
+    # Dashboard günlük özetleri: mesajlar dakikada bir su seviyesinden işlenir
+    'roll-vendor-message-stats': {
+        'task': 'vendors.roll_message_stats',
+        'schedule': crontab(),
+        'options': {
+            'queue': 'default',
+        },
+    },
+    # Günlük tekil ziyaretçi (HyperLogLog) kardinalitelerini veritabanına yaz
+    'persist-vendor-unique-visitors': {
+        'task': 'vendors.persist_unique_visitors',
+        'schedule': crontab(minute=20, hour=0),
+        'options': {
+            'queue': 'default',
+        },
+    },
+    # Tamamlanmış günleri kaynak tablolardan düzelt
+    'reconcile-vendor-daily-stats': {
+        'task': 'vendors.reconcile_daily_stats',
+        'schedule': crontab(minute=30, hour=3),
+        'options': {
+            'queue': 'default',
+        },
+    },
+    # Saklama süresi dolmuş ham görüntüleme/arama kayıtlarını özete katla ve sil
+    'compact-vendor-events': {
+        'task': 'vendors.compact_vendor_events',
+        'schedule': crontab(minute=10, hour=4),
+        'options': {
+            'queue': 'default',
+        },
+    },
 }
 
 @app.task(bind=True)
@@ -152,6 +152,21 @@ CACHES = {
     }
 }
 
+# Yakındaki vendor araması: 'orm' (grid hücre ön filtresi + SQL haversine) veya
+# 'numpy' (worker başına bellekte vektörel motor, bkz. vendors/nearest.py)
+NEARBY_VENDORS_BACKEND = os.environ.get('NEARBY_VENDORS_BACKEND', 'orm')
+
+# Profil görüntüleme/arama olayları Redis kuyruğuna yazılıp Celery ile toplu işlenir
+# (bkz. vendors/events.py). Kapalıysa veya Redis erişilemezse olaylar senkron yazılır.
+VENDOR_EVENTS_BUFFERED = os.environ.get('VENDOR_EVENTS_BUFFERED', 'False').lower() == 'true'
+# Kapatılırsa ziyaretçi başına VendorView satırı yazılmaz; görüntüleme sayıları
+# HyperLogLog tekil ziyaretçilerinden gelir (bkz. vendors/uniques.py)
+VENDOR_VIEW_ROWS_STORED = os.environ.get('VENDOR_VIEW_ROWS_STORED', 'True').lower() == 'true'
+# Ham görüntüleme/arama kayıtlarının saklanacağı gün sayısı (0: süresiz). Daha eski kayıtlar
+# günlük özete katlanıp silinir (bkz. vendors/compaction.py)
+VENDOR_EVENT_RETENTION_DAYS = int(os.environ.get('VENDOR_EVENT_RETENTION_DAYS', '0'))
+VENDOR_EVENT_COMPACTION_CHUNK_SIZE = int(os.environ.get('VENDOR_EVENT_COMPACTION_CHUNK_SIZE', '5000'))
+
 # Channels config - Development (InMemory)
 ASGI_APPLICATION = 'main.asgi.application'
 CHANNEL_LAYERS = {
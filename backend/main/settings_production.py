@@ -186,6 +186,17 @@ CACHES = {
     }
 }
 
+# Profil görüntüleme/arama olayları Redis kuyruğuna yazılıp Celery ile toplu işlenir
+# (bkz. vendors/events.py). Kapalıysa veya Redis erişilemezse olaylar senkron yazılır.
+VENDOR_EVENTS_BUFFERED = os.environ.get('VENDOR_EVENTS_BUFFERED', 'True').lower() == 'true'
+# Kapatılırsa ziyaretçi başına VendorView satırı yazılmaz; görüntüleme sayıları
+# HyperLogLog tekil ziyaretçilerinden gelir (bkz. vendors/uniques.py)
+VENDOR_VIEW_ROWS_STORED = os.environ.get('VENDOR_VIEW_ROWS_STORED', 'True').lower() == 'true'
+# Ham görüntüleme/arama kayıtlarının saklanacağı gün sayısı (0: süresiz). Daha eski kayıtlar
+# günlük özete katlanıp silinir (bkz. vendors/compaction.py)
+VENDOR_EVENT_RETENTION_DAYS = int(os.environ.get('VENDOR_EVENT_RETENTION_DAYS', '400'))
+VENDOR_EVENT_COMPACTION_CHUNK_SIZE = int(os.environ.get('VENDOR_EVENT_COMPACTION_CHUNK_SIZE', '5000'))
+
 # Channels config - Production (Redis)
 ASGI_APPLICATION = 'main.asgi.application'
 CHANNEL_LAYERS = {
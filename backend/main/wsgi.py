@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
 
 application = get_wsgi_application()
+
+from vendors.autocomplete import warm_autocomplete_index  # noqa: E402
+
+warm_autocomplete_index()
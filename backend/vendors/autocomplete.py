@@ -0,0 +1,240 @@
+"""
+Arama kutusu için typeahead önerileri
+Listelenen vendor adları ile kategori, hizmet alanı ve araba markası adları Türkçe katlanmış
+halde sıralı bir dizide tutulur; önek araması bisect ile yapılır, istek sırasında veritabanına gidilmez.
+Kısa önekler (en çok PRECOMPUTED_PREFIX_LENGTH karakter) için popülerliğe göre ilk sonuçlar
+kurulumda hesaplanır, böylece tek harflik aramalar da geniş aralık taramaz.
+İndeks worker başlarken yüklenir; cache'teki versiyon belirli aralıklarla kontrol edilir ve
+değişmişse (veya popülerlik bilgisi eskidiyse) arka planda yeniden kurulur.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+from django.core.cache import cache
+from django.db import connections, transaction
+
+from .search import tokenize
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+AUTOCOMPLETE_VERSION_KEY = 'vendor_autocomplete:version'
+# Cache versiyonu en fazla bu aralıkla okunur; aradaki istekler cache'e de gitmez
+POLL_INTERVAL = 10
+# Versiyon değişmese de popülerlik sıralaması bu süreden sonra tazelenir
+MAX_INDEX_AGE = 60 * 15
+PRECOMPUTED_PREFIX_LENGTH = 3
+MAX_LIMIT = 10
+DEFAULT_LIMIT = 5
+
+KINDS = ('vendors', 'categories', 'services', 'carBrands')
+
+
+def mark_autocomplete_stale() -> None:
+    """
+    Worker'lardaki öneri indekslerini bir sonraki kontrolde yeniden kurdur
+    Versiyon commit sonrasında artar; aksi halde başka bir worker commit öncesi satırlardan
+    kurduğu indeksi yeni versiyonla saklayabilir.
+    """
+    def _bump():
+        try:
+            cache.incr(AUTOCOMPLETE_VERSION_KEY)
+        except ValueError:
+            cache.set(AUTOCOMPLETE_VERSION_KEY, 1, timeout=None)
+        except Exception as e:
+            logger.warning(f"Autocomplete version bump failed: {e}")
+
+    transaction.on_commit(_bump)
+
+
+def _current_version():
+    try:
+        return cache.get(AUTOCOMPLETE_VERSION_KEY, 0)
+    except Exception:
+        return None
+
+
+def _phrase_keys(name) -> List[str]:
+    """Her kelimeden başlayan katlanmış ifade ('oto egzoz' -> 'oto egzoz', 'egzoz')"""
+    tokens = tokenize(name)
+    return [' '.join(tokens[i:]) for i in range(len(tokens))]
+
+
+class _Snapshot:
+    """Değişmez indeks kopyası; yeniden kurulum yeni bir snapshot ile atomik olarak değiştirilir"""
+
+    def __init__(self, keys, entries, top_by_prefix, version):
+        self.keys = keys
+        self.entries = entries
+        self.top_by_prefix = top_by_prefix
+        self.version = version
+        self.built_at = time.monotonic()
+
+
+def _rank(entry):
+    return entry['_score'], entry['label']
+
+
+def _public(entry) -> dict:
+    return {key: value for key, value in entry.items() if not key.startswith('_')}
+
+
+class AutocompleteIndex:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+        self._last_poll = 0.0
+        self._rebuilding = False
+
+    # --- Kurulum ---
+    def _load_entries(self) -> List[dict]:
+        from django.db.models import Count, Q
+        from core.models import ServiceArea, Category, CarBrand
+        from .models import VendorProfile
+
+        entries = []
+        vendors = VendorProfile.objects.filter(
+            user__is_verified=True, user__is_active=True
+        ).order_by().values_list(
+            'id', 'slug', 'display_name', 'city', 'district',
+            'monthly_review_count', 'avg_rating', 'review_count',
+        )
+        for vendor_id, slug, name, city, district, monthly, rating, reviews in vendors.iterator():
+            entries.append({
+                'kind': 'vendors', 'id': vendor_id, 'label': name, 'slug': slug,
+                'city': city, 'district': district,
+                '_score': (monthly, rating, reviews),
+            })
+
+        listed = Q(vendorprofile__user__is_verified=True, vendorprofile__user__is_active=True)
+        relations = (
+            ('categories', Category.objects.all()),
+            ('services', ServiceArea.objects.all()),
+            ('carBrands', CarBrand.objects.filter(is_active=True)),
+        )
+        for kind, queryset in relations:
+            rows = queryset.annotate(vendor_count=Count('vendorprofile', filter=listed)).values_list('id', 'name', 'vendor_count')
+            for related_id, name, vendor_count in rows:
+                entries.append({
+                    'kind': kind, 'id': related_id, 'label': name, 'vendor_count': vendor_count,
+                    '_score': (vendor_count,),
+                })
+        return entries
+
+    def _build(self, version) -> _Snapshot:
+        pairs = []
+        prefix_buckets: Dict[str, Dict[str, Dict[int, dict]]] = {}
+        for entry in self._load_entries():
+            for key in _phrase_keys(entry['label']):
+                pairs.append((key, entry))
+                for length in range(1, min(len(key), PRECOMPUTED_PREFIX_LENGTH) + 1):
+                    bucket = prefix_buckets.setdefault(key[:length], {})
+                    bucket.setdefault(entry['kind'], {})[entry['id']] = entry
+
+        pairs.sort(key=lambda pair: pair[0])
+        top_by_prefix = {
+            prefix: {
+                kind: heapq.nlargest(MAX_LIMIT, by_id.values(), key=_rank)
+                for kind, by_id in kinds.items()
+            }
+            for prefix, kinds in prefix_buckets.items()
+        }
+        return _Snapshot(
+            keys=[key for key, _ in pairs],
+            entries=[entry for _, entry in pairs],
+            top_by_prefix=top_by_prefix,
+            version=version,
+        )
+
+    def _rebuild(self, version):
+        try:
+            snapshot = self._build(version)
+            self._snapshot = snapshot
+            logger.info(f"Autocomplete index built: {len(snapshot.keys)} keys")
+        except Exception as e:
+            logger.error(f"Autocomplete index build failed: {e}")
+        finally:
+            self._rebuilding = False
+
+    def _rebuild_in_background(self, version):
+        try:
+            self._rebuild(version)
+        finally:
+            # Thread'in açtığı veritabanı bağlantısı açık kalmasın
+            connections.close_all()
+
+    def warm(self) -> None:
+        """Worker başlangıcında indeksi arka planda yükle"""
+        with self._lock:
+            if self._snapshot is not None or self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_in_background, args=(_current_version(),), daemon=True).start()
+
+    def _ensure_fresh(self) -> _Snapshot:
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._last_poll < POLL_INTERVAL:
+            return snapshot
+
+        with self._lock:
+            self._last_poll = now
+            version = _current_version()
+            if self._snapshot is None:
+                # İlk istek: hazır indeks yoksa senkron kur
+                self._rebuilding = True
+                self._rebuild(version)
+                return self._snapshot
+            stale = (
+                (version is not None and version != self._snapshot.version)
+                or now - self._snapshot.built_at > MAX_INDEX_AGE
+            )
+            if stale and not self._rebuilding:
+                # Yeniden kurulum sürerken eski snapshot'tan cevap verilir
+                self._rebuilding = True
+                threading.Thread(target=self._rebuild_in_background, args=(version,), daemon=True).start()
+            return self._snapshot
+
+    # --- Sorgu ---
+    def suggest(self, query: str, limit: int = DEFAULT_LIMIT) -> Dict[str, List[dict]]:
+        """Her tür için öneki eşleşen, popülerliğe göre sıralı en fazla limit öneri"""
+        results = {kind: [] for kind in KINDS}
+        prefix = ' '.join(tokenize(query))
+        if not prefix:
+            return results
+        limit = max(1, min(limit, MAX_LIMIT))
+
+        snapshot = self._ensure_fresh()
+        if snapshot is None:
+            return results
+
+        if len(prefix) <= PRECOMPUTED_PREFIX_LENGTH:
+            top = snapshot.top_by_prefix.get(prefix, {})
+            for kind in KINDS:
+                results[kind] = [_public(entry) for entry in top.get(kind, [])[:limit]]
+            return results
+
+        start = bisect_left(snapshot.keys, prefix)
+        end = bisect_left(snapshot.keys, prefix + '\uffff', lo=start)
+        matches: Dict[str, Dict[int, dict]] = {}
+        for entry in snapshot.entries[start:end]:
+            matches.setdefault(entry['kind'], {})[entry['id']] = entry
+        for kind, by_id in matches.items():
+            results[kind] = [_public(entry) for entry in heapq.nlargest(limit, by_id.values(), key=_rank)]
+        return results
+
+
+autocomplete_index = AutocompleteIndex()
+
+
+def warm_autocomplete_index() -> None:
+    """ASGI/WSGI uygulaması yüklenirken çağrılır; hata worker'ın açılmasını engellemez"""
+    try:
+        autocomplete_index.warm()
+    except Exception as e:
+        logger.warning(f"Autocomplete warm-up skipped: {e}")
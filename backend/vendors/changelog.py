@@ -0,0 +1,70 @@
+"""
+Process içi vendor indeksleri (facet, en yakın vendor motoru) için değişiklik günlüğü
+Her değişiklik cache'te (Redis) artan bir versiyon numarası ve o versiyona ait vendor ID'si
+olarak yayınlanır. Worker'lar kendi versiyonlarından bu yana değişen vendor'ları okuyup
+sadece onları yeniden yükler; günlük eksikse veya çok gerideyse indeks baştan kurulur.
+"""
+from typing import Optional, Set
+
+from django.core.cache import cache
+from django.db import transaction
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'vendor_changes:version'
+CHANGE_KEY = 'vendor_changes:change:{version}'
+# Değişiklik kayıtları bu süre tutulur; daha eski bir indeks tamamen yeniden kurulur
+CHANGE_TTL = 60 * 60
+# Bundan fazla değişiklik birikmişse tek tek yüklemek yerine baştan kur
+MAX_INCREMENTAL_CHANGES = 500
+# Tüm indekslerin yeniden kurulması gerektiğini belirten kayıt (örn. kategori silindi)
+FULL_REBUILD = 'all'
+
+
+def publish_vendor_change(vendor_id=None) -> None:
+    """
+    Vendor'ın listelenme durumu, konumu veya ilişkileri değişti (commit sonrası yayınlanır)
+    vendor_id verilmezse tüm worker'lar indekslerini baştan kurar.
+    """
+    def _publish():
+        try:
+            try:
+                version = cache.incr(VERSION_KEY)
+            except ValueError:
+                cache.add(VERSION_KEY, 0, timeout=None)
+                version = cache.incr(VERSION_KEY)
+            cache.set(CHANGE_KEY.format(version=version), vendor_id or FULL_REBUILD, timeout=CHANGE_TTL)
+        except Exception as e:
+            logger.warning(f"Vendor change publish failed: {e}")
+
+    transaction.on_commit(_publish)
+
+
+def current_version() -> Optional[int]:
+    """Güncel versiyon; cache erişilemiyorsa None"""
+    try:
+        return cache.get(VERSION_KEY, 0)
+    except Exception:
+        return None
+
+
+def changes_since(version, current) -> Optional[Set[int]]:
+    """
+    version'dan current'a kadar değişen vendor ID'leri
+    Artımlı güncelleme mümkün değilse (kayıt eksik, çok fazla değişiklik, tam yeniden kurulum) None.
+    """
+    if not isinstance(version, int) or not isinstance(current, int) or current < version:
+        return None
+    if current - version > MAX_INCREMENTAL_CHANGES:
+        return None
+    keys = [CHANGE_KEY.format(version=v) for v in range(version + 1, current + 1)]
+    try:
+        changes = cache.get_many(keys)
+    except Exception as e:
+        logger.warning(f"Vendor change log unavailable: {e}")
+        return None
+    if len(changes) != len(keys) or FULL_REBUILD in changes.values():
+        return None
+    return set(changes.values())
@@ -0,0 +1,202 @@
+"""
+Vendor haritaları için sunucu tarafı marker kümeleme
+Listelenen ve koordinatı olan vendor'lar her zoom seviyesi için ayrı bir grid'e önceden yerleştirilir
+(çok çözünürlüklü grid). Her hücre vendor sayısını, koordinat toplamlarını (ağırlık merkezi için)
+ve en popüler vendor'ı (temsilci slug) tutar. Bir bbox + zoom sorgusu sadece o seviyedeki
+görünür hücreleri döndürür; cevap boyutu yoğunluktan bağımsız olarak MAX_CLUSTERS ile sınırlıdır.
+İndeks vendors.changelog versiyonunu izler ve sadece değişen vendor'ları günceller.
+"""
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from . import changelog
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+MIN_ZOOM = 3
+# Bu zoom'dan sonra grid inceltilmez; hücreler birkaç sokak boyutundadır
+MAX_ZOOM = 17
+# 256px karo başına hücre sayısı (kenar); 4 -> yaklaşık 64px'lik kümeler
+CELLS_PER_TILE = 4
+MAX_CLUSTERS = 500
+# Popülerlik (temsilci seçimi) review sinyallerinden yayınlanmaz; bu süreden sonra baştan kurulur
+MAX_INDEX_AGE = 60 * 15
+
+
+def cell_degrees(zoom: int) -> float:
+    """Zoom seviyesindeki hücre kenarı (derece)"""
+    return 360.0 / (2 ** zoom) / CELLS_PER_TILE
+
+
+def _cell_of(latitude: float, longitude: float, size: float) -> Tuple[int, int]:
+    return int(math.floor((latitude + 90) / size)), int(math.floor((longitude + 180) / size))
+
+
+class _Cell:
+    __slots__ = ('count', 'lat_sum', 'lng_sum', 'members', 'representative')
+
+    def __init__(self):
+        self.count = 0
+        self.lat_sum = 0.0
+        self.lng_sum = 0.0
+        self.members = set()
+        self.representative = None
+
+
+class ClusterIndex:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built = False
+        self._version = None
+        self._built_at = 0.0
+        self._reset()
+
+    def _reset(self):
+        # vendor_id -> (lat, lng, score, slug)
+        self._vendors: Dict[int, tuple] = {}
+        # zoom -> (satır, sütun) -> hücre
+        self._levels: Dict[int, Dict[Tuple[int, int], _Cell]] = {zoom: {} for zoom in range(MIN_ZOOM, MAX_ZOOM + 1)}
+
+    # --- Yükleme ---
+    def _load(self, vendor_ids=None) -> Dict[int, tuple]:
+        from .models import VendorProfile
+
+        queryset = VendorProfile.objects.filter(
+            user__is_verified=True,
+            user__is_active=True,
+            latitude__isnull=False,
+            longitude__isnull=False,
+        )
+        if vendor_ids is not None:
+            queryset = queryset.filter(pk__in=list(vendor_ids))
+        rows = queryset.order_by().values_list(
+            'id', 'latitude', 'longitude', 'slug', 'monthly_review_count', 'avg_rating', 'review_count'
+        )
+        return {
+            vendor_id: (float(lat), float(lng), (monthly, rating, reviews, vendor_id), slug)
+            for vendor_id, lat, lng, slug, monthly, rating, reviews in rows.iterator()
+        }
+
+    def _add(self, vendor_id: int, data: tuple):
+        lat, lng, score, _ = data
+        self._vendors[vendor_id] = data
+        for zoom, cells in self._levels.items():
+            key = _cell_of(lat, lng, cell_degrees(zoom))
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = _Cell()
+            cell.count += 1
+            cell.lat_sum += lat
+            cell.lng_sum += lng
+            cell.members.add(vendor_id)
+            current = cell.representative
+            if current is not None and self._vendors[current][2] < score:
+                cell.representative = vendor_id
+            elif current is None and cell.count == 1:
+                cell.representative = vendor_id
+
+    def _remove(self, vendor_id: int):
+        data = self._vendors.pop(vendor_id, None)
+        if data is None:
+            return
+        lat, lng, _, _ = data
+        for zoom, cells in self._levels.items():
+            key = _cell_of(lat, lng, cell_degrees(zoom))
+            cell = cells.get(key)
+            if cell is None:
+                continue
+            cell.count -= 1
+            cell.lat_sum -= lat
+            cell.lng_sum -= lng
+            cell.members.discard(vendor_id)
+            if not cell.count:
+                del cells[key]
+            elif cell.representative == vendor_id:
+                # Sorguda gerekirse üyeler arasından yeniden seçilir
+                cell.representative = None
+
+    def _build(self, version):
+        self._reset()
+        for vendor_id, data in self._load().items():
+            self._add(vendor_id, data)
+        self._version = version
+        self._built = True
+        self._built_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        current = changelog.current_version()
+        expired = time.monotonic() - self._built_at > MAX_INDEX_AGE
+        if self._built and not expired and (current is None or current == self._version):
+            return
+        pending = changelog.changes_since(self._version, current) if self._built and not expired else None
+        if pending is None:
+            self._build(current)
+            return
+        loaded = self._load(pending)
+        for vendor_id in pending:
+            self._remove(vendor_id)
+            if vendor_id in loaded:
+                self._add(vendor_id, loaded[vendor_id])
+        self._version = current
+
+    def _representative(self, cell: _Cell) -> Optional[str]:
+        if cell.representative is None and cell.members:
+            cell.representative = max(cell.members, key=lambda vendor_id: self._vendors[vendor_id][2])
+        return self._vendors[cell.representative][3] if cell.representative is not None else None
+
+    # --- Sorgu ---
+    def _visible_cells(self, zoom: int, bbox) -> List[Tuple[Tuple[int, int], _Cell]]:
+        min_lng, min_lat, max_lng, max_lat = bbox
+        size = cell_degrees(zoom)
+        min_row, min_col = _cell_of(min_lat, min_lng, size)
+        max_row, max_col = _cell_of(max_lat, max_lng, size)
+        cells = self._levels[zoom]
+        span = (max_row - min_row + 1) * (max_col - min_col + 1)
+        if span < len(cells):
+            return [
+                ((row, col), cells[(row, col)])
+                for row in range(min_row, max_row + 1)
+                for col in range(min_col, max_col + 1)
+                if (row, col) in cells
+            ]
+        return [
+            (key, cell) for key, cell in cells.items()
+            if min_row <= key[0] <= max_row and min_col <= key[1] <= max_col
+        ]
+
+    def clusters(self, bbox: Tuple[float, float, float, float], zoom: int) -> dict:
+        """
+        bbox (batı, güney, doğu, kuzey) içindeki kümeler
+        Görünür hücre sayısı MAX_CLUSTERS'ı aşarsa daha kaba bir seviyeye çıkılır.
+        """
+        zoom = max(MIN_ZOOM, min(int(zoom), MAX_ZOOM))
+        with self._lock:
+            self._ensure_fresh()
+            visible = self._visible_cells(zoom, bbox)
+            while len(visible) > MAX_CLUSTERS and zoom > MIN_ZOOM:
+                zoom -= 1
+                visible = self._visible_cells(zoom, bbox)
+            visible.sort(key=lambda item: -item[1].count)
+            visible = visible[:MAX_CLUSTERS]
+            return {
+                'zoom': zoom,
+                'total': sum(cell.count for _, cell in visible),
+                'clusters': [
+                    {
+                        'id': f'{zoom}:{row}:{col}',
+                        'count': cell.count,
+                        'latitude': round(cell.lat_sum / cell.count, 6),
+                        'longitude': round(cell.lng_sum / cell.count, 6),
+                        'slug': self._representative(cell),
+                    }
+                    for (row, col), cell in visible
+                ],
+            }
+
+
+cluster_index = ClusterIndex()
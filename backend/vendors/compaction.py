@@ -0,0 +1,103 @@
+"""
+Ham görüntüleme/arama kayıtları (VendorView, VendorCall) için sıkıştırma ve saklama süresi
+Saklama süresinden (VENDOR_EVENT_RETENTION_DAYS) eski günler önce günlük özet tablosuna
+katlanır, ardından ham kayıtlar birincil anahtar aralıkları halinde küçük parçalarla silinir
+(tek dev DELETE yok; kilitler ve replikasyon gecikmesi kısa kalır).
+
+Katlama sadece eksik sayıyı yükseltir, özeti asla azaltmaz: yarıda kalmış bir önceki
+çalıştırmanın kısmen sildiği günün sayısı korunur. Saklama süresinden eski günler
+vendors.stats.rebuild_daily_stats tarafından da yeniden hesaplanmaz.
+"""
+from datetime import timedelta
+from typing import Tuple
+
+from django.conf import settings
+from django.db.models import Min
+
+from . import stats
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tek seferde katlanan gün aralığı
+FOLD_DAYS = 31
+DEFAULT_CHUNK_SIZE = 5000
+# Tek çalıştırmada en fazla silinecek kayıt; kalanı bir sonraki çalıştırmaya kalır
+MAX_DELETES_PER_RUN = 2_000_000
+
+
+def chunk_size() -> int:
+    return max(1, getattr(settings, 'VENDOR_EVENT_COMPACTION_CHUNK_SIZE', DEFAULT_CHUNK_SIZE))
+
+
+def _fold(metric: str, start_day, end_day) -> Tuple[int, int]:
+    """
+    [start_day, end_day) ham sayılarını özete yaz (sadece özetten büyük olanlar)
+    (katlanan ham kayıt, düzeltilen özet satırı) döner.
+    """
+    from .models import VendorDailyStats
+
+    counts = stats.count_metric(metric, start_day, end_day, None)
+    if not counts:
+        return 0, 0
+    existing = dict(
+        ((vendor_id, day), value)
+        for vendor_id, day, value in VendorDailyStats.objects.filter(
+            day__gte=start_day, day__lt=end_day
+        ).values_list('vendor_id', 'day', metric).iterator()
+    )
+    rows = [
+        VendorDailyStats(vendor_id=vendor_id, day=day, **{metric: total})
+        for (vendor_id, day), total in counts.items()
+        if total > existing.get((vendor_id, day), 0)
+    ]
+    VendorDailyStats.objects.bulk_create(
+        rows,
+        batch_size=stats.WRITE_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['vendor', 'day'],
+        update_fields=[metric],
+    )
+    return sum(counts.values()), len(rows)
+
+
+def _delete_before(model, end_day, limit: int) -> int:
+    """end_day'den eski kayıtları birincil anahtar aralıkları halinde sil"""
+    size = chunk_size()
+    deleted = 0
+    while deleted < limit:
+        ids = list(
+            model.objects.filter(day__lt=end_day).order_by('pk').values_list('pk', flat=True)[:min(size, limit - deleted)]
+        )
+        if not ids:
+            break
+        # Aralıkta sonradan eklenmiş yeni günlerin kayıtları (geç gelen olaylar) korunur
+        count, _ = model.objects.filter(pk__gte=ids[0], pk__lte=ids[-1], day__lt=end_day).delete()
+        deleted += count
+    return deleted
+
+
+def compact(max_deletes: int = MAX_DELETES_PER_RUN) -> dict:
+    """Saklama süresi dolmuş ham kayıtları özete katla ve sil; kapalıysa hiçbir şey yapmaz"""
+    from .models import VendorView, VendorCall
+
+    boundary = stats.raw_retention_start()
+    if boundary is None:
+        return {'enabled': False}
+    summary = {'before': str(boundary)}
+    remaining = max_deletes
+    for model, metric in ((VendorView, 'views'), (VendorCall, 'calls')):
+        compacted = corrected = deleted = 0
+        start = model.objects.aggregate(first=Min('day'))['first']
+        while start is not None and start < boundary and remaining > 0:
+            end = min(start + timedelta(days=FOLD_DAYS), boundary)
+            rows, fixed = _fold(metric, start, end)
+            compacted += rows
+            corrected += fixed
+            count = _delete_before(model, end, remaining)
+            deleted += count
+            remaining -= count
+            start = end
+        summary[metric] = {'compacted': compacted, 'corrected': corrected, 'deleted': deleted}
+    return summary
@@ -0,0 +1,328 @@
+"""
+Vendor profil görüntüleme ve telefon arama olayları için tamponlu yazma hattı
+İstek yolu olayı Redis listesine ekleyip hemen döner (slug çözümleme, kullanıcı sorgusu ve
+get_or_create yok). Celery görevi listeyi partiler halinde boşaltır: slug'ları tek sorguda çözer,
+kayıtları bulk_create(ignore_conflicts=True) ile yazar ve günlük özetleri (VendorDailyStats)
+dokunulan (vendor, gün) çiftleri için yeniden sayar.
+
+Boşaltma en az bir kez (at-least-once) çalışır: parti LMOVE ile boşaltıcıya ait işleme listesine
+atomik olarak taşınır (iki boşaltıcı aynı olayı alamaz), yazıldıktan sonra işleme listesi silinir.
+Yarıda ölen boşaltıcının işleme listesi sonraki çalıştırmada kuyruğun başına geri konur; aynı
+partinin tekrar işlenmesi benzersizlik kısıtları sayesinde etkisizdir. Boşaltma kilidi
+token'lıdır, her partiden sonra uzatılır ve sadece sahibi tarafından bırakılır.
+Kuyruk MAX_QUEUE_LENGTH'i aşarsa yeni olaylar atılır (geri basınç) ve 'dropped' metriği artar.
+Galeri açma ve paylaşım olaylarının ham kaydı yoktur; sadece günlük özet sayaçlarına eklenir
+(bu sayaçlar tekrar işlenen partide iki kez artabilir, yaklaşık kabul edilir).
+"""
+import json
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Iterable, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from redis.exceptions import WatchError
+
+from core.utils.redis_client import get_redis
+
+from . import uniques
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = 'vendor_events:queue'
+METRICS_KEY = 'vendor_events:metrics'
+DRAIN_LOCK_KEY = 'vendor_events:drain_lock'
+DRAIN_SCHEDULED_KEY = 'vendor_events:drain_scheduled'
+PROCESSING_KEY = 'vendor_events:processing:{token}'
+# İşleme listesi -> alınma zamanı (sahibi ölen listeleri bulmak için)
+PROCESSING_REGISTRY_KEY = 'vendor_events:processing'
+
+EVENT_VIEW = 'view'
+EVENT_CALL = 'call'
+EVENT_GALLERY_OPEN = 'gallery_open'
+EVENT_SHARE = 'share'
+# Ham kaydı tutulmayan, sadece günlük özette sayılan olaylar: olay tipi -> VendorDailyStats alanı
+COUNTER_EVENTS = {
+    EVENT_GALLERY_OPEN: 'gallery_opens',
+    EVENT_SHARE: 'shares',
+}
+EVENT_TYPES = (EVENT_VIEW, EVENT_CALL) + tuple(COUNTER_EVENTS)
+
+BATCH_SIZE = 1000
+# Tek çalıştırmada en fazla bu kadar parti; kalan bir sonraki çalıştırmaya kalır
+MAX_BATCHES_PER_RUN = 50
+# Bu uzunlukta kuyruk beat'i beklemeden boşaltma görevi tetikler
+DRAIN_TRIGGER_LENGTH = 5000
+MAX_QUEUE_LENGTH = 200000
+# Kilit her partiden sonra bu süreye uzatılır; tek parti bundan uzun sürmemeli
+DRAIN_LOCK_TIMEOUT = 300
+
+
+def is_enabled() -> bool:
+    return getattr(settings, 'VENDOR_EVENTS_BUFFERED', False)
+
+
+def _schedule_drain() -> None:
+    # Yoğun trafikte her olay için görev kuyruğa atılmasın
+    if not cache.add(DRAIN_SCHEDULED_KEY, 1, timeout=5):
+        return
+    try:
+        from .tasks import drain_vendor_events
+
+        drain_vendor_events.delay()
+    except Exception as e:
+        # Olay zaten kuyrukta; beat bir sonraki turda boşaltır
+        logger.warning(f"Vendor event drain trigger failed: {e}")
+
+
+def build_event(event_type: str, slug: str, **fields) -> str:
+    """Kuyruğa yazılacak olay (gün istek anında yerel saatle belirlenir)"""
+    payload = {'type': event_type, 'slug': slug, 'day': timezone.localdate().isoformat(), **fields}
+    return json.dumps(payload, separators=(',', ':'))
+
+
+def enqueue_many(payloads: List[str]) -> int:
+    """
+    Olayları tek RPUSH ile kuyruğa ekle; kabul edilen olay sayısı döner.
+    Kuyruk doluysa sınırı aşan olaylar atılır. Redis erişilemezse hata yükselir
+    (çağıran senkron yazmaya dönebilir).
+    """
+    if not payloads:
+        return 0
+    redis = get_redis()
+    length = redis.rpush(QUEUE_KEY, *payloads)
+    overflow = min(len(payloads), length - MAX_QUEUE_LENGTH)
+    if overflow > 0:
+        pipe = redis.pipeline()
+        # Listenin başı (en eski olaylar) korunur, sınırı aşan en yeniler atılır
+        pipe.ltrim(QUEUE_KEY, 0, MAX_QUEUE_LENGTH - 1)
+        pipe.hincrby(METRICS_KEY, 'dropped', overflow)
+        pipe.execute()
+        _schedule_drain()
+        return len(payloads) - overflow
+    if length >= DRAIN_TRIGGER_LENGTH:
+        _schedule_drain()
+    return len(payloads)
+
+
+def enqueue(event_type: str, slug: str, **fields) -> bool:
+    """Tek olayı kuyruğa ekle; kuyruk doluysa olay atılır ve False döner"""
+    return enqueue_many([build_event(event_type, slug, **fields)]) == 1
+
+
+# --- Boşaltma ---
+def _decode(raw_events: Iterable[bytes]) -> Tuple[List[dict], int]:
+    events, invalid = [], 0
+    for raw in raw_events:
+        try:
+            event = json.loads(raw)
+            event['day'] = date.fromisoformat(event['day'])
+            if event.get('type') in EVENT_TYPES and event.get('slug'):
+                events.append(event)
+                continue
+        except (ValueError, TypeError, KeyError):
+            pass
+        invalid += 1
+    return events, invalid
+
+
+def process_batch(raw_events: List[bytes]) -> dict:
+    """Bir partiyi veritabanına yaz; parti özeti döner"""
+    from core.models import CustomUser
+    from .models import VendorProfile, VendorView, VendorCall
+    from .stats import apply_daily_delta, rebuild_daily_stats
+
+    events, invalid = _decode(raw_events)
+    vendors = {
+        slug: (vendor_id, owner_id)
+        for slug, vendor_id, owner_id in VendorProfile.objects.filter(
+            slug__in={event['slug'] for event in events}, user__is_active=True
+        ).values_list('slug', 'id', 'user_id')
+    }
+    viewer_ids = {event.get('viewer') for event in events if event.get('viewer')}
+    known_viewers = set(CustomUser.objects.filter(id__in=viewer_ids).values_list('id', flat=True)) if viewer_ids else set()
+
+    views, calls, counters, skipped = {}, {}, {}, 0
+    for event in events:
+        vendor = vendors.get(event['slug'])
+        if vendor is None:
+            skipped += 1
+            continue
+        vendor_id, owner_id = vendor
+        viewer_id = event.get('viewer') if event.get('viewer') in known_viewers else None
+        if event['type'] != EVENT_CALL and viewer_id is not None and viewer_id == owner_id:
+            skipped += 1  # vendor kendi profilinde geziniyor
+            continue
+        if event['type'] in COUNTER_EVENTS:
+            key = (vendor_id, event['day'], COUNTER_EVENTS[event['type']])
+            counters[key] = counters.get(key, 0) + 1
+        elif event['type'] == EVENT_VIEW:
+            key = (vendor_id, event.get('ip', ''), event.get('ua', ''), event['day'])
+            row = views.get(key)
+            if row is None:
+                views[key] = VendorView(vendor_id=vendor_id, viewer_id=viewer_id, ip_hash=key[1], ua_hash=key[2], day=key[3])
+            elif row.viewer_id is None:
+                row.viewer_id = viewer_id
+        else:
+            key = (vendor_id, event.get('ip', ''), event['day'])
+            row = calls.get(key)
+            if row is None:
+                calls[key] = VendorCall(
+                    vendor_id=vendor_id, viewer_id=viewer_id, ip_hash=key[1], day=key[2],
+                    phone=(event.get('phone') or '')[:32],
+                )
+            elif row.viewer_id is None:
+                row.viewer_id = viewer_id
+
+    # PFADD idempotent; parti tekrar işlense de sayı değişmez
+    rows_stored = uniques.view_rows_stored()
+    try:
+        uniques.record_visits(
+            (vendor_id, day, uniques.visitor_id(ip_hash, ua_hash)) for vendor_id, ip_hash, ua_hash, day in views
+        )
+    except Exception as e:
+        # Senkron yoldan Redis'siz çağrı: görüntülemeler satır olarak saklanır
+        logger.warning(f"Unique visitor record failed: {e}")
+        rows_stored = True
+    if not rows_stored:
+        uniques.refresh_views_from_uniques({(vendor_id, day) for vendor_id, _, _, day in views})
+        views = {}
+
+    touched = {key[0] for key in views} | {key[0] for key in calls}
+    days = {key[-1] for key in views} | {key[-1] for key in calls}
+    with transaction.atomic():
+        VendorView.objects.bulk_create(views.values(), ignore_conflicts=True, batch_size=BATCH_SIZE)
+        VendorCall.objects.bulk_create(calls.values(), ignore_conflicts=True, batch_size=BATCH_SIZE)
+        # Daha önce anonim kaydedilmiş olaya sonradan giriş yapmış kullanıcıyı işle (eski davranış)
+        for model, rows in ((VendorView, views), (VendorCall, calls)):
+            for row in rows.values():
+                if row.viewer_id is not None:
+                    lookup = {'vendor_id': row.vendor_id, 'ip_hash': row.ip_hash, 'day': row.day}
+                    if model is VendorView:
+                        lookup['ua_hash'] = row.ua_hash
+                    model.objects.filter(viewer__isnull=True, **lookup).update(viewer_id=row.viewer_id)
+        if touched:
+            # bulk_create sinyal göndermez; dokunulan günlerin sayıları kaynaktan yeniden hesaplanır
+            rebuild_daily_stats(min(days), max(days) + timedelta(days=1), vendor_ids=touched, metrics=('views', 'calls'))
+        for (vendor_id, day, metric), total in counters.items():
+            apply_daily_delta(vendor_id, day, metric, total)
+    return {
+        'events': len(raw_events),
+        'views': len(views) if rows_stored else 0,
+        'calls': len(calls),
+        'counters': sum(counters.values()),
+        'invalid': invalid,
+        'skipped': skipped,
+    }
+
+
+def _record_metrics(batch: dict, elapsed_ms: float) -> None:
+    try:
+        pipe = get_redis().pipeline()
+        pipe.hincrby(METRICS_KEY, 'batches', 1)
+        for field in ('events', 'invalid', 'skipped'):
+            pipe.hincrby(METRICS_KEY, field, batch[field])
+        pipe.hset(METRICS_KEY, mapping={
+            'last_batch_size': batch['events'],
+            'last_batch_ms': round(elapsed_ms, 1),
+            'last_drain_at': int(time.time()),
+        })
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Vendor event metrics update failed: {e}")
+
+
+def _acquire_lock(redis) -> str:
+    token = uuid.uuid4().hex
+    return token if redis.set(DRAIN_LOCK_KEY, token, nx=True, ex=DRAIN_LOCK_TIMEOUT) else ''
+
+
+def _if_lock_owned(redis, token: str, action) -> bool:
+    """Kilit hâlâ token'a aitse action(pipe) işlemini atomik uygula"""
+    with redis.pipeline() as pipe:
+        try:
+            pipe.watch(DRAIN_LOCK_KEY)
+            if (pipe.get(DRAIN_LOCK_KEY) or b'').decode() != token:
+                return False
+            pipe.multi()
+            action(pipe)
+            pipe.execute()
+            return True
+        except WatchError:
+            return False
+
+
+def _requeue_orphans(redis) -> int:
+    """Sahibi ölmüş (kilit süresinden eski) işleme listelerini kuyruğun başına geri koy"""
+    stale_before = time.time() - DRAIN_LOCK_TIMEOUT
+    requeued = 0
+    for key, claimed_at in redis.hgetall(PROCESSING_REGISTRY_KEY).items():
+        if float(claimed_at) > stale_before:
+            continue
+        # Sondan başa taşınır; kuyruktaki sıra korunur
+        while redis.lmove(key, QUEUE_KEY, 'RIGHT', 'LEFT') is not None:
+            requeued += 1
+        redis.hdel(PROCESSING_REGISTRY_KEY, key)
+    return requeued
+
+
+def _claim(redis, processing_key: str, batch_size: int) -> List[bytes]:
+    """Kuyruğun başından en fazla batch_size olayı işleme listesine taşı"""
+    redis.hset(PROCESSING_REGISTRY_KEY, processing_key, time.time())
+    pipe = redis.pipeline(transaction=False)
+    for _ in range(batch_size):
+        pipe.lmove(QUEUE_KEY, processing_key, 'LEFT', 'RIGHT')
+    return [raw for raw in pipe.execute() if raw is not None]
+
+
+def drain(max_batches: int = MAX_BATCHES_PER_RUN, batch_size: int = BATCH_SIZE) -> dict:
+    """Kuyruğu partiler halinde boşalt (aynı anda tek boşaltıcı çalışır)"""
+    redis = get_redis()
+    token = _acquire_lock(redis)
+    if not token:
+        return {'skipped': 'locked'}
+    processing_key = PROCESSING_KEY.format(token=token)
+    summary = {'batches': 0, 'events': 0, 'requeued': _requeue_orphans(redis)}
+    try:
+        for _ in range(max_batches):
+            raw_events = _claim(redis, processing_key, batch_size)
+            if not raw_events:
+                break
+            started = time.monotonic()
+            batch = process_batch(raw_events)
+            # Yazma başarılıysa işleme listesi silinir
+            redis.delete(processing_key)
+            elapsed_ms = (time.monotonic() - started) * 1000
+            _record_metrics(batch, elapsed_ms)
+            logger.info("[vendors] event batch written: %s in %.1f ms", batch, elapsed_ms)
+            summary['batches'] += 1
+            summary['events'] += batch['events']
+            if not _if_lock_owned(redis, token, lambda pipe: pipe.expire(DRAIN_LOCK_KEY, DRAIN_LOCK_TIMEOUT)):
+                logger.warning("[vendors] event drain lock lost, stopping run")
+                break
+    finally:
+        # Hata durumunda işleme listesi kayıtlı kalır, sonraki çalıştırma geri koyar
+        if not redis.exists(processing_key):
+            redis.hdel(PROCESSING_REGISTRY_KEY, processing_key)
+        _if_lock_owned(redis, token, lambda pipe: pipe.delete(DRAIN_LOCK_KEY))
+        cache.delete(DRAIN_SCHEDULED_KEY)
+    summary['remaining'] = redis.llen(QUEUE_KEY)
+    return summary
+
+
+def queue_stats() -> dict:
+    """Kuyruk uzunluğu ve birikmiş metrikler (izleme için)"""
+    redis = get_redis()
+    pipe = redis.pipeline()
+    pipe.llen(QUEUE_KEY)
+    pipe.hgetall(METRICS_KEY)
+    length, metrics = pipe.execute()
+    stats = {key.decode(): value.decode() for key, value in metrics.items()}
+    stats['length'] = length
+    return stats
@@ -0,0 +1,208 @@
+"""
+Vendor arama sayfası için facet sayıları
+Listelenen (doğrulanmış ve aktif) vendor'lar için her facet değerine (şehir, ilçe, kategori,
+hizmet alanı, araba markası) ait vendor ID kümeleri process içinde tutulur.
+Sayımlar sadece küme kesişimleriyle hesaplanır; veritabanına gidilmez.
+Profil değişiklikleri vendors.changelog üzerinden yayınlanır; her worker sadece değişen
+vendor'ları yeniden yükleyerek indeksini günceller.
+"""
+import threading
+from typing import Dict, Iterable, Optional, Set
+
+from . import changelog
+from .search import search_index, tokenize, turkish_fold
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+LOCATION_FACETS = ('city', 'district')
+RELATION_FACETS = {
+    # facet adı: (M2M alanı, through tablosundaki hedef kolon)
+    'category': ('categories', 'category_id'),
+    'service': ('service_areas', 'servicearea_id'),
+    'carBrand': ('car_brands', 'carbrand_id'),
+}
+FACETS = LOCATION_FACETS + tuple(RELATION_FACETS)
+
+
+def _fold(value) -> str:
+    return ' '.join(turkish_fold(value).split())
+
+
+class FacetIndex:
+    """Facet değeri -> listelenen vendor ID kümesi eşlemesi"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._listed: Set[int] = set()
+        # facet -> değer -> vendor ID kümesi
+        self._postings: Dict[str, Dict] = {facet: {} for facet in FACETS}
+        # vendor ID -> facet -> değerler (güncellemede eski değerleri çıkarmak için)
+        self._vendor_values: Dict[int, Dict[str, Set]] = {}
+        # facet -> değer -> görünen ad
+        self._labels: Dict[str, Dict] = {facet: {} for facet in FACETS}
+        self._version = None
+        self._built = False
+
+    # --- Yükleme ---
+    def _load_vendors(self, vendor_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, Set]]:
+        """Listelenen vendor'ların facet değerlerini oku (vendor_ids verilirse sadece onlar)"""
+        from .models import VendorProfile
+
+        queryset = VendorProfile.objects.filter(user__is_verified=True, user__is_active=True)
+        if vendor_ids is not None:
+            queryset = queryset.filter(pk__in=list(vendor_ids))
+
+        values = {}
+        for vendor_id, city, district in queryset.order_by().values_list('id', 'city', 'district').iterator():
+            values[vendor_id] = {facet: set() for facet in FACETS}
+            for facet, raw in (('city', city), ('district', district)):
+                folded = _fold(raw)
+                if folded:
+                    values[vendor_id][facet].add(folded)
+                    self._labels[facet].setdefault(folded, raw.strip())
+
+        for facet, (field, column) in RELATION_FACETS.items():
+            through = getattr(VendorProfile, field).through
+            rows = through.objects.filter(vendorprofile__in=queryset).values_list('vendorprofile_id', column)
+            for vendor_id, related_id in rows.iterator():
+                if vendor_id in values:
+                    values[vendor_id][facet].add(related_id)
+        return values
+
+    def _load_labels(self):
+        from core.models import ServiceArea, Category, CarBrand
+
+        self._labels['category'] = dict(Category.objects.values_list('id', 'name'))
+        self._labels['service'] = dict(ServiceArea.objects.values_list('id', 'name'))
+        self._labels['carBrand'] = dict(CarBrand.objects.values_list('id', 'name'))
+
+    def _remove(self, vendor_id: int):
+        self._listed.discard(vendor_id)
+        for facet, facet_values in self._vendor_values.pop(vendor_id, {}).items():
+            for value in facet_values:
+                ids = self._postings[facet].get(value)
+                if ids is not None:
+                    ids.discard(vendor_id)
+                    if not ids:
+                        del self._postings[facet][value]
+
+    def _add(self, vendor_id: int, facet_values: Dict[str, Set]):
+        self._listed.add(vendor_id)
+        self._vendor_values[vendor_id] = facet_values
+        for facet, values in facet_values.items():
+            for value in values:
+                self._postings[facet].setdefault(value, set()).add(vendor_id)
+
+    def _build(self, version):
+        self._reset()
+        self._load_labels()
+        for vendor_id, facet_values in self._load_vendors().items():
+            self._add(vendor_id, facet_values)
+        self._version = version
+        self._built = True
+
+    def _apply_changes(self, vendor_ids: Set[int], version):
+        loaded = self._load_vendors(vendor_ids)
+        unknown_labels = any(
+            value not in self._labels[facet]
+            for facet_values in loaded.values()
+            for facet in RELATION_FACETS
+            for value in facet_values[facet]
+        )
+        if unknown_labels:
+            self._load_labels()
+        for vendor_id in vendor_ids:
+            self._remove(vendor_id)
+            if vendor_id in loaded:
+                self._add(vendor_id, loaded[vendor_id])
+        self._version = version
+
+    def _ensure_fresh(self):
+        current = changelog.current_version()
+        if self._built and (current is None or current == self._version):
+            return
+        pending = changelog.changes_since(self._version, current) if self._built else None
+        if pending is None:
+            self._build(current)
+        else:
+            self._apply_changes(pending, current)
+
+    # --- Sorgu ---
+    def _match_values(self, facet: str, raw: str) -> Optional[Set]:
+        """
+        Filtre değerine uyan facet değerleri; filtre uygulanmayacaksa None
+        Eşleştirme VendorSearchView ile aynıdır: şehir/ilçe katlanmış alt dize,
+        hizmet alanı ID veya ad, kategori/marka ID (geçersiz ID filtreyi yok sayar).
+        """
+        raw = (raw or '').strip()
+        if not raw:
+            return None
+        if facet in LOCATION_FACETS:
+            needle = _fold(raw)
+            return {value for value in self._postings[facet] if needle in value}
+        if raw.isdigit():
+            value = int(raw)
+            return {value} if value in self._labels[facet] else None
+        if facet == 'service':
+            needle = _fold(raw)
+            matches = {value for value, label in self._labels[facet].items() if needle in _fold(label)}
+            return matches or None
+        return None
+
+    def _ids_for(self, facet: str, values: Set) -> Set[int]:
+        postings = self._postings[facet]
+        result = set()
+        for value in values:
+            result |= postings.get(value, set())
+        return result
+
+    def counts(self, filters: Dict[str, str], query: str = '') -> dict:
+        """
+        Verilen filtreler için tüm facet sayıları
+        Her facet kendi filtresi hariç diğer filtrelerle sayılır; böylece seçili şehirde de
+        diğer şehirlerin sayıları görünür.
+        """
+        with self._lock:
+            self._ensure_fresh()
+
+            constraints = {}
+            for facet in FACETS:
+                values = self._match_values(facet, filters.get(facet, ''))
+                if values is not None:
+                    constraints[facet] = self._ids_for(facet, values)
+
+            text_ids = None
+            tokens = tokenize(query)
+            if tokens:
+                text_ids = search_index.search(tokens)
+
+            def base_excluding(excluded: Optional[str]) -> Set[int]:
+                ids = self._listed if text_ids is None else (self._listed & text_ids)
+                for facet, facet_ids in constraints.items():
+                    if facet != excluded:
+                        ids = ids & facet_ids
+                return ids
+
+            result = {'total': len(base_excluding(None)), 'facets': {}}
+            for facet in FACETS:
+                base = base_excluding(facet)
+                buckets = []
+                for value, ids in self._postings[facet].items():
+                    count = len(base & ids) if len(base) < len(ids) else len(ids & base)
+                    if count:
+                        buckets.append({
+                            'value': value,
+                            'label': self._labels[facet].get(value, value),
+                            'count': count,
+                        })
+                buckets.sort(key=lambda bucket: (-bucket['count'], str(bucket['label'])))
+                result['facets'][facet] = buckets
+            return result
+
+
+facet_index = FacetIndex()
@@ -0,0 +1,122 @@
+"""
+Vendor konumları için grid hücre indeksi ve mesafe hesapları
+Her VendorProfile'ın koordinatı sabit boyutlu bir enlem/boylam hücresine (grid_cell) düşürülür.
+Yakındaki vendor sorguları önce yarıçapı kapsayan hücrelerle (indeksli IN) ve sınır kutusuyla
+daraltılır, kesin haversine mesafesi sadece bu yerel satırlar için hesaplanır.
+"""
+import math
+from typing import List, Optional, Tuple
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0
+# Sınır kutusu kenarlarına eklenen pay (derece, ≈ 10 cm); yuvarlama sınırdaki noktayı düşürmesin
+BOX_MARGIN_DEGREES = 1e-6
+
+# Hücre boyutu (derece). 0.1° ≈ 11 km enlem, Türkiye enlemlerinde ≈ 8.5 km boylam
+GRID_CELL_DEGREES = 0.1
+GRID_COLUMNS = int(round(360 / GRID_CELL_DEGREES))
+# Bundan fazla hücre gerekiyorsa (çok büyük yarıçap) sadece sınır kutusu filtresi kullanılır
+MAX_COVERING_CELLS = 400
+
+
+def _row_col(latitude: float, longitude: float) -> Tuple[int, int]:
+    row = int(math.floor((latitude + 90) / GRID_CELL_DEGREES))
+    col = int(math.floor((longitude + 180) / GRID_CELL_DEGREES)) % GRID_COLUMNS
+    return row, col
+
+
+def grid_cell_for(latitude, longitude) -> Optional[int]:
+    """Koordinatın düştüğü hücre numarası (koordinat yoksa None)"""
+    if latitude is None or longitude is None:
+        return None
+    row, col = _row_col(float(latitude), float(longitude))
+    return row * GRID_COLUMNS + col
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """Yarıçapı kapsayan (min_lat, max_lat, min_lng, max_lng) kutusu
+
+    Deltalar haversine ile aynı küreden (EARTH_RADIUS_KM) hesaplanır; daire içindeki hiçbir nokta
+    kutunun dışında kalmaz.
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    lat_delta = math.degrees(angular) + BOX_MARGIN_DEGREES
+    min_lat = latitude - lat_delta
+    max_lat = latitude + lat_delta
+    cos_lat = math.cos(math.radians(latitude))
+    ratio = math.sin(angular) / cos_lat if cos_lat > 1e-12 else math.inf
+    # Daire kutbu içeriyorsa ya da yarım küreden büyükse tüm boylamları kapsa
+    if min_lat <= -90.0 or max_lat >= 90.0 or angular >= math.pi / 2 or ratio >= 1.0:
+        lng_delta = 180.0
+    else:
+        lng_delta = min(180.0, math.degrees(math.asin(ratio)) + BOX_MARGIN_DEGREES)
+    return (
+        max(-90.0, min_lat),
+        min(90.0, max_lat),
+        longitude - lng_delta,
+        longitude + lng_delta,
+    )
+
+
+def covering_cells(latitude: float, longitude: float, radius_km: float) -> Optional[List[int]]:
+    """Yarıçap dairesini kapsayan hücreler; çok fazlaysa None"""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    min_row, min_col = _row_col(min_lat, min_lng)
+    max_row, _ = _row_col(max_lat, max_lng)
+    col_span = int(math.floor((max_lng + 180) / GRID_CELL_DEGREES)) - int(math.floor((min_lng + 180) / GRID_CELL_DEGREES))
+    row_span = max_row - min_row
+    if (row_span + 1) * (col_span + 1) > MAX_COVERING_CELLS:
+        return None
+    cells = []
+    for row in range(min_row, max_row + 1):
+        for offset in range(col_span + 1):
+            cells.append(row * GRID_COLUMNS + (min_col + offset) % GRID_COLUMNS)
+    return cells
+
+
+def within_radius_prefilter(queryset, latitude: float, longitude: float, radius_km: float):
+    """Kapsayan hücreler + sınır kutusu ile adayları daralt (kesin mesafe sonra hesaplanır)"""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    cells = covering_cells(latitude, longitude, radius_km)
+    if cells is not None:
+        queryset = queryset.filter(grid_cell__in=cells)
+    queryset = queryset.filter(latitude__gte=min_lat, latitude__lte=max_lat)
+    if -180 <= min_lng and max_lng <= 180:
+        queryset = queryset.filter(longitude__gte=min_lng, longitude__lte=max_lng)
+    return queryset
+
+
+def haversine_distance_km(latitude: float, longitude: float):
+    """Verilen noktaya haversine mesafesi (km) için ORM ifadesi"""
+    lat = Cast(F('latitude'), FloatField())
+    lng = Cast(F('longitude'), FloatField())
+    a = (
+        Power(Sin(Radians(lat - latitude) / 2), 2)
+        + Cos(Radians(latitude)) * Cos(Radians(lat)) * Power(Sin(Radians(lng - longitude) / 2), 2)
+    )
+    # Yuvarlama hatasıyla 1'i aşan değer ASin'i NaN yapmasın
+    return 2 * EARTH_RADIUS_KM * ASin(Least(Sqrt(a), Value(1.0)))
+
+
+def rebuild_grid_cells(batch_size: int = 1000) -> int:
+    """Koordinatı olan tüm vendor'ların hücre numarasını yeniden hesapla"""
+    from .models import VendorProfile
+
+    updated = 0
+    pending = []
+    queryset = VendorProfile.objects.only('id', 'latitude', 'longitude', 'grid_cell').order_by('id')
+    for vendor in queryset.iterator(chunk_size=batch_size):
+        cell = grid_cell_for(vendor.latitude, vendor.longitude)
+        if cell != vendor.grid_cell:
+            vendor.grid_cell = cell
+            pending.append(vendor)
+        if len(pending) >= batch_size:
+            VendorProfile.objects.bulk_update(pending, ['grid_cell'])
+            updated += len(pending)
+            pending = []
+    if pending:
+        VendorProfile.objects.bulk_update(pending, ['grid_cell'])
+        updated += len(pending)
+    return updated
@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from vendors.stats import earliest_source_day, rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Esnaf dashboard günlük özet tablosunu (VendorDailyStats) kaynak tablolardan doldurur'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Sadece son N günü hesapla (varsayılan: tüm geçmiş)'
+        )
+        parser.add_argument(
+            '--vendor',
+            type=int,
+            action='append',
+            dest='vendor_ids',
+            help='Sadece verilen esnaf ID\'lerini hesapla (birden fazla verilebilir)'
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=31,
+            help='Tek seferde hesaplanacak gün sayısı (varsayılan: 31)'
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        if options['days']:
+            start = today - timedelta(days=options['days'] - 1)
+        else:
+            start = earliest_source_day()
+        if start is None:
+            self.stdout.write(self.style.SUCCESS('Hesaplanacak kayıt bulunamadı'))
+            return
+
+        chunk = timedelta(days=max(1, options['chunk_days']))
+        written = 0
+        while True:
+            end = start + chunk
+            # Son parça bugünü ve ileri tarihli randevuları kapsar
+            if end > today:
+                end = None
+            written += rebuild_daily_stats(start, end, vendor_ids=options.get('vendor_ids'))
+            self.stdout.write(f'{start} → {end or "sonrası"} tamamlandı')
+            if end is None:
+                break
+            start = end
+        self.stdout.write(
+            self.style.SUCCESS(f'{written} adet günlük özet satırı yazıldı')
+        )
@@ -0,0 +1,149 @@
+import time
+import uuid
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from vendors import nearest
+from vendors.geo import grid_cell_for, haversine_distance_km, within_radius_prefilter
+
+# Sentetik vendor'lar bu şehir merkezleri etrafında (enlem, boylam, yayılım derecesi) dağıtılır
+CITY_CENTERS = [
+    (41.015, 28.979, 0.25),  # İstanbul
+    (39.925, 32.866, 0.15),  # Ankara
+    (38.423, 27.142, 0.15),  # İzmir
+    (40.188, 29.061, 0.10),  # Bursa
+    (36.896, 30.713, 0.10),  # Antalya
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Yakındaki vendor araması için NumPy motorunu, grid hücre ön filtreli ORM sorgusunu ve '
+        'ön filtresiz (tüm tabloda haversine) taban sorguyu sentetik verilerle karşılaştırır; '
+        'ORM ölçümü için eklenen kayıtlar geri alınır'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                            help='Vendor sayıları (varsayılan: 10000 100000 1000000)')
+        parser.add_argument('--queries', type=int, default=50, help='Boyut başına sorgu sayısı (varsayılan: 50)')
+        parser.add_argument('--radius', type=float, default=10.0, help='Yarıçap km (varsayılan: 10)')
+        parser.add_argument('--k', type=int, default=20, help='En yakın k (varsayılan: 20)')
+        parser.add_argument('--orm-max', type=int, default=100000,
+                            help='ORM ölçümü yapılacak en büyük boyut; üstü sadece NumPy ile ölçülür (varsayılan: 100000)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not nearest.is_available():
+            self.stderr.write(self.style.ERROR('NumPy yüklü değil'))
+            return
+        import numpy as np
+
+        rng = np.random.default_rng(options['seed'])
+        radius, k, queries = options['radius'], options['k'], options['queries']
+        self.stdout.write(f"radius={radius}km k={k} queries={queries}")
+        self.stdout.write(
+            f"{'size':>9} {'numpy radius ms':>16} {'numpy k-nn ms':>14} {'orm radius ms':>14} {'orm k-nn ms':>12} "
+            f"{'full radius ms':>15} {'full k-nn ms':>13}"
+        )
+
+        for size in options['sizes']:
+            latitudes, longitudes = self._points(rng, size)
+            centers = list(zip(*self._points(rng, queries)))
+            category_ids = rng.integers(1, 40, size=size)
+
+            engine = nearest.NearestVendorEngine()
+            engine.load_snapshot(
+                np.arange(1, size + 1), latitudes, longitudes,
+                {'category': {i + 1: [int(c)] for i, c in enumerate(category_ids)}},
+                {'category': range(1, 40), 'carBrand': []},
+            )
+            # Snapshot versiyon kontrolünü ölçüme katma
+            engine._ensure_fresh = lambda: None
+            numpy_radius = self._time(lambda lat, lng: engine.nearest(lat, lng, radius_km=radius), centers)
+            numpy_knn = self._time(lambda lat, lng: engine.nearest(lat, lng, radius_km=radius, k=k), centers)
+
+            orm = {}
+            if size <= options['orm_max']:
+                orm = self._orm_timings(size, latitudes, longitudes, centers, radius, k)
+
+            self.stdout.write(
+                f"{size:>9} {numpy_radius:>16.2f} {numpy_knn:>14.2f} "
+                f"{self._fmt(orm.get('radius')):>14} {self._fmt(orm.get('knn')):>12} "
+                f"{self._fmt(orm.get('full_radius')):>15} {self._fmt(orm.get('full_knn')):>13}"
+            )
+
+    def _points(self, rng, count):
+        import numpy as np
+
+        picks = rng.integers(0, len(CITY_CENTERS), size=count)
+        centers = np.array(CITY_CENTERS)[picks]
+        latitudes = centers[:, 0] + rng.normal(0, 1, count) * centers[:, 2]
+        longitudes = centers[:, 1] + rng.normal(0, 1, count) * centers[:, 2]
+        return np.round(latitudes, 6), np.round(longitudes, 6)
+
+    def _time(self, run, centers):
+        start = time.perf_counter()
+        for lat, lng in centers:
+            run(float(lat), float(lng))
+        return (time.perf_counter() - start) / len(centers) * 1000
+
+    def _fmt(self, value):
+        return '-' if value is None else f'{value:.2f}'
+
+    def _orm_timings(self, size, latitudes, longitudes, centers, radius, k):
+        from core.models import CustomUser
+        from vendors.models import VendorProfile
+
+        timings = {}
+        try:
+            with transaction.atomic():
+                run_id = uuid.uuid4().hex[:8]
+                batch = 5000
+                for offset in range(0, size, batch):
+                    users = CustomUser.objects.bulk_create([
+                        CustomUser(
+                            username=f'bench-{run_id}-{i}', email=f'bench-{run_id}-{i}@example.com',
+                            password='!', role='vendor', is_verified=True, is_active=True,
+                        )
+                        for i in range(offset, min(offset + batch, size))
+                    ])
+                    VendorProfile.objects.bulk_create([
+                        VendorProfile(
+                            user=user, slug=f'bench-{run_id}-{i}', business_type='esnaf',
+                            company_title='Bench', tax_office='-', tax_no='-', display_name='Bench',
+                            business_phone='-', address='-', city='-', district='-', subdistrict='-',
+                            manager_birthdate=date(1990, 1, 1), manager_tc='00000000000',
+                            latitude=latitudes[i], longitude=longitudes[i],
+                            grid_cell=grid_cell_for(latitudes[i], longitudes[i]),
+                        )
+                        for i, user in zip(range(offset, offset + len(users)), users)
+                    ])
+
+                def query(lat, lng, limit=None, prefilter=True):
+                    vendors = VendorProfile.objects.filter(
+                        user__is_verified=True, user__is_active=True,
+                        latitude__isnull=False, longitude__isnull=False,
+                    )
+                    if prefilter:
+                        vendors = within_radius_prefilter(vendors, lat, lng, radius)
+                    vendors = vendors.annotate(
+                        distance=haversine_distance_km(lat, lng)
+                    ).filter(distance__lte=radius).order_by('distance').values_list('id', 'distance')
+                    return list(vendors[:limit] if limit else vendors)
+
+                timings['radius'] = self._time(query, centers)
+                timings['knn'] = self._time(lambda lat, lng: query(lat, lng, k), centers)
+                # Taban: grid hücre ön filtresinden önceki sorgu (her satır için haversine)
+                timings['full_radius'] = self._time(lambda lat, lng: query(lat, lng, prefilter=False), centers)
+                timings['full_knn'] = self._time(lambda lat, lng: query(lat, lng, k, prefilter=False), centers)
+                raise _Rollback()
+        except _Rollback:
+            pass
+        return timings
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from vendors.geo import rebuild_grid_cells
+
+
+class Command(BaseCommand):
+    help = 'Tüm esnafların konum hücresini (grid_cell) koordinatlardan yeniden hesaplar'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Tek seferde güncellenecek kayıt sayısı (varsayılan: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        updated = rebuild_grid_cells(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'{updated} adet konum hücresi güncellendi')
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from vendors.ratings import rebuild_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Esnafların puan ortalaması, yorum sayısı ve aylık yorum sayısını Review tablosundan yeniden hesaplar'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--vendor',
+            type=int,
+            action='append',
+            dest='vendor_ids',
+            help='Sadece verilen esnaf ID\'lerini yeniden hesapla (birden fazla verilebilir)'
+        )
+
+    def handle(self, *args, **options):
+        updated = rebuild_rating_aggregates(options.get('vendor_ids'))
+        self.stdout.write(
+            self.style.SUCCESS(f'{updated} adet esnafın puan istatistikleri yeniden hesaplandı')
+        )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from vendors.search import rebuild_search_documents
+
+
+class Command(BaseCommand):
+    help = 'Tüm esnafların Türkçe normalize edilmiş arama dokümanlarını yeniden oluşturur'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Tek seferde güncellenecek kayıt sayısı (varsayılan: 500)'
+        )
+
+    def handle(self, *args, **options):
+        updated = rebuild_search_documents(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'{updated} adet arama dokümanı güncellendi')
+        )
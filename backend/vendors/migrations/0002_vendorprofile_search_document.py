@@ -0,0 +1,69 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:43
+
+import re
+
+from django.db import migrations, models
+
+# vendors.search'teki katlama ve doküman kuralının bu migration anındaki kopyası; canlı modül
+# değişse de geçmiş migration aynı dokümanı üretir (güncel kural için rebuild_search_documents)
+FOLD_TABLE = str.maketrans({
+    'ç': 'c', 'ğ': 'g', 'ı': 'i', 'ö': 'o', 'ş': 's', 'ü': 'u', 'â': 'a', 'î': 'i', 'û': 'u', '\u0307': None,
+})
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def compose_search_document(parts):
+    tokens = []
+    for part in parts:
+        if part:
+            text = str(part).replace('İ', 'i').replace('I', 'i').lower().translate(FOLD_TABLE)
+            tokens.extend(TOKEN_RE.findall(text))
+    return ' '.join(tokens)
+
+
+def backfill_search_documents(apps, schema_editor):
+    VendorProfile = apps.get_model('vendors', 'VendorProfile')
+    queryset = VendorProfile.objects.prefetch_related('service_areas', 'categories', 'car_brands')
+    for vendor in queryset.iterator(chunk_size=500):
+        parts = [
+            vendor.display_name, vendor.company_title, vendor.about, vendor.business_type,
+            vendor.city, vendor.district,
+        ]
+        parts.extend(area.name for area in vendor.service_areas.all())
+        parts.extend(category.name for category in vendor.categories.all())
+        parts.extend(brand.name for brand in vendor.car_brands.all())
+        VendorProfile.objects.filter(pk=vendor.pk).update(search_document=compose_search_document(parts))
+
+
+def create_trigram_index(apps, schema_editor):
+    # pg_trgm GIN indeksi yalnızca PostgreSQL'de; SQLite process içi indeksi kullanır
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS "vendorprofile_search_doc_trgm" '
+        'ON "VendorProfile" USING gin ("search_document" gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS "vendorprofile_search_doc_trgm"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendorprofile',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:45
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    VendorProfile = apps.get_model('vendors', 'VendorProfile')
+    Review = apps.get_model('vendors', 'Review')
+    now = timezone.now()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    rows = Review.objects.order_by().values('vendor_id').annotate(
+        count=Count('id'),
+        total=Sum('rating'),
+        avg=Avg('rating'),
+        monthly=Count('id', filter=Q(created_at__gte=month_start, created_at__lt=next_month)),
+    )
+    for row in rows:
+        VendorProfile.objects.filter(pk=row['vendor_id']).update(
+            review_count=row['count'],
+            rating_sum=row['total'] or 0,
+            avg_rating=float(row['avg'] or 0),
+            monthly_review_count=row['monthly'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0002_vendorprofile_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendorprofile',
+            name='avg_rating',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vendorprofile',
+            name='monthly_review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vendorprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vendorprofile',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='vendorprofile',
+            index=models.Index(fields=['-monthly_review_count', '-avg_rating', '-review_count', '-id'], name='vendor_rank_idx'),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:56
+
+from django.db import migrations, models
+
+from vendors.geo import grid_cell_for
+
+
+def backfill_grid_cells(apps, schema_editor):
+    VendorProfile = apps.get_model('vendors', 'VendorProfile')
+    vendors = VendorProfile.objects.filter(latitude__isnull=False, longitude__isnull=False).only('id', 'latitude', 'longitude')
+    for vendor in vendors.iterator():
+        VendorProfile.objects.filter(pk=vendor.pk).update(grid_cell=grid_cell_for(vendor.latitude, vendor.longitude))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0003_vendorprofile_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendorprofile',
+            name='grid_cell',
+            field=models.BigIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_grid_cells, migrations.RunPython.noop),
+    ]
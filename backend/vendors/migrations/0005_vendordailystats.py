@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0004_vendorprofile_grid_cell'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Yerel saatle (Europe/Istanbul) gün')),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('calls', models.PositiveIntegerField(default=0)),
+                ('messages', models.PositiveIntegerField(default=0)),
+                ('appointments', models.PositiveIntegerField(default=0)),
+                ('favorites', models.PositiveIntegerField(default=0)),
+                ('reviews', models.PositiveIntegerField(default=0)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='vendors.vendorprofile')),
+            ],
+            options={
+                'db_table': 'VendorDailyStats',
+                'constraints': [models.UniqueConstraint(fields=('vendor', 'day'), name='uniq_vendor_daily_stats')],
+            },
+        ),
+    ]
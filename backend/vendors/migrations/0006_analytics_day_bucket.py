@@ -0,0 +1,128 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:08
+
+from datetime import date
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+BATCH_SIZE = 2000
+
+
+def _bucket_day(month_bucket, created_at):
+    """'YYYY-MM-DD' kovası doğrudan gündür; eski 'YYYY-MM' kayıtlarında oluşturulma günü kullanılır"""
+    try:
+        return date.fromisoformat(month_bucket)
+    except (TypeError, ValueError):
+        return django.utils.timezone.localdate(created_at)
+
+
+def _backfill(model, unique_fields):
+    pending = []
+    for row in model.objects.only('id', 'month_bucket', 'created_at').order_by('id').iterator(chunk_size=BATCH_SIZE):
+        row.day = _bucket_day(row.month_bucket, row.created_at)
+        pending.append(row)
+        if len(pending) >= BATCH_SIZE:
+            model.objects.bulk_update(pending, ['day'])
+            pending = []
+    if pending:
+        model.objects.bulk_update(pending, ['day'])
+
+    # Eski ay kovasından güne çevrilen kayıt aynı günün kaydıyla çakışabilir; ilkini tut
+    duplicates = (
+        model.objects.order_by().values(*unique_fields)
+        .annotate(rows=Count('id'), first_id=Min('id'))
+        .filter(rows__gt=1)
+    )
+    for group in duplicates.iterator():
+        first_id = group.pop('first_id')
+        group.pop('rows')
+        model.objects.filter(**group).exclude(id=first_id).delete()
+
+
+def backfill_days(apps, schema_editor):
+    _backfill(apps.get_model('vendors', 'VendorView'), ('vendor', 'ip_hash', 'ua_hash', 'day'))
+    _backfill(apps.get_model('vendors', 'VendorCall'), ('vendor', 'ip_hash', 'day'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0005_vendordailystats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vendorcall',
+            name='month_bucket',
+            field=models.CharField(help_text='YYYY-MM-DD (günlük bazlı kayıt)', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='vendorview',
+            name='month_bucket',
+            field=models.CharField(help_text='YYYY-MM-DD (günlük bazlı kayıt)', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='vendorcall',
+            name='day',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='vendorview',
+            name='day',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(backfill_days, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='vendorcall',
+            name='day',
+            field=models.DateField(default=django.utils.timezone.localdate, help_text='Yerel saatle (Europe/Istanbul) arama günü'),
+        ),
+        migrations.AlterField(
+            model_name='vendorview',
+            name='day',
+            field=models.DateField(default=django.utils.timezone.localdate, help_text='Yerel saatle (Europe/Istanbul) görüntüleme günü'),
+        ),
+        migrations.RemoveConstraint(
+            model_name='vendorcall',
+            name='uniq_call_vendor_ip_month',
+        ),
+        migrations.RemoveConstraint(
+            model_name='vendorview',
+            name='uniq_view_vendor_ip_ua_month',
+        ),
+        migrations.RemoveIndex(
+            model_name='vendorcall',
+            name='VendorCall_vendor__0d50f8_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='vendorview',
+            name='VendorView_vendor__37e556_idx',
+        ),
+        migrations.RemoveField(
+            model_name='vendorcall',
+            name='month_bucket',
+        ),
+        migrations.RemoveField(
+            model_name='vendorview',
+            name='month_bucket',
+        ),
+        migrations.AddIndex(
+            model_name='vendorcall',
+            index=models.Index(fields=['vendor', 'day'], name='VendorCall_vendor__ad8ea0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendorview',
+            index=models.Index(fields=['vendor', 'day'], name='VendorView_vendor__592251_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='vendorcall',
+            constraint=models.UniqueConstraint(fields=('vendor', 'ip_hash', 'day'), name='uniq_call_vendor_ip_day'),
+        ),
+        migrations.AddConstraint(
+            model_name='vendorview',
+            constraint=models.UniqueConstraint(fields=('vendor', 'ip_hash', 'ua_hash', 'day'), name='uniq_view_vendor_ip_ua_day'),
+        ),
+    ]
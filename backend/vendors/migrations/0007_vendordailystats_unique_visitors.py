@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0006_analytics_day_bucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendordailystats',
+            name='unique_visitors',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0007_vendordailystats_unique_visitors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendordailystats',
+            name='gallery_opens',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vendordailystats',
+            name='shares',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
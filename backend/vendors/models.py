@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from core.models import CustomUser
 from core.models import ServiceArea, Category, CarBrand
@@ -43,6 +43,8 @@ class VendorProfile(models.Model):
 	# Konum bilgileri (harita için)
 	latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, help_text="Enlem")
 	longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, help_text="Boylam")
+	# Yakındaki vendor sorguları için konum hücresi (vendors.geo.grid_cell_for, save() içinde güncellenir)
+	grid_cell = models.BigIntegerField(null=True, blank=True, db_index=True, editable=False)
 	# Sosyal medya
 	social_media = models.JSONField(default=dict, blank=True)
 	# Çalışma saatleri
@@ -53,6 +55,13 @@ class VendorProfile(models.Model):
 	manager_birthdate = models.DateField()
 	manager_tc = models.CharField(max_length=11)
 	# manager_phone kaldırıldı - CustomUser'dan alınacak
+	# Türkçe katlanmış arama dokümanı (vendors.search tarafından sinyallerle güncellenir)
+	search_document = models.TextField(blank=True, default='', editable=False)
+	# Denormalize değerlendirme istatistikleri (vendors.ratings tarafından Review sinyalleriyle güncellenir)
+	review_count = models.PositiveIntegerField(default=0, editable=False)
+	rating_sum = models.PositiveIntegerField(default=0, editable=False)
+	avg_rating = models.FloatField(default=0.0, editable=False)
+	monthly_review_count = models.PositiveIntegerField(default=0, editable=False)
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
 
@@ -78,6 +87,10 @@ class VendorProfile(models.Model):
 
 	class Meta:
 		db_table = 'VendorProfile'
+		indexes = [
+			# Arama sıralaması: bu ayın yorumları, ortalama puan, toplam yorum, en yeni
+			models.Index(fields=['-monthly_review_count', '-avg_rating', '-review_count', '-id'], name='vendor_rank_idx'),
+		]
 	
 	def save(self, *args, **kwargs):
 		if not self.slug:
@@ -89,6 +102,12 @@ class VendorProfile(models.Model):
 			import re
 			base_slug = re.sub(r'[^a-z0-9-]', '', base_slug)
 			self.slug = base_slug
+		# Konum hücresini koordinatlarla senkron tut
+		from .geo import grid_cell_for
+		self.grid_cell = grid_cell_for(self.latitude, self.longitude)
+		update_fields = kwargs.get('update_fields')
+		if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+			kwargs['update_fields'] = set(update_fields) | {'grid_cell'}
 		super().save(*args, **kwargs)
 
 
@@ -220,6 +239,15 @@ class Review(models.Model):
 	def __str__(self):
 		return f"{self.user.full_name} -> {self.vendor.display_name} ({self.rating}★)"
 
+	def save(self, *args, **kwargs):
+		# Vendor puan istatistikleri post_save sinyalinde aynı transaction içinde güncellenir
+		with transaction.atomic():
+			super().save(*args, **kwargs)
+
+	def delete(self, *args, **kwargs):
+		with transaction.atomic():
+			return super().delete(*args, **kwargs)
+
 
 class ServiceRequest(models.Model):
 	"""Müşterilerin esnaflardan teklif/talep oluşturduğu kayıt"""
@@ -265,17 +293,18 @@ class VendorView(models.Model):
     viewer = models.ForeignKey(get_user_model(), on_delete=models.SET_NULL, null=True, blank=True, related_name='vendor_views')
     ip_hash = models.CharField(max_length=64, blank=True)
     ua_hash = models.CharField(max_length=64, blank=True)
-    month_bucket = models.CharField(max_length=10, help_text="YYYY-MM-DD (günlük bazlı kayıt)")
+    day = models.DateField(default=timezone.localdate, help_text="Yerel saatle (Europe/Istanbul) görüntüleme günü")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'VendorView'
         indexes = [
-            models.Index(fields=['vendor', 'month_bucket']),
+            # Ay/hafta/özel aralık sayımları bu indekste aralık taramasıdır
+            models.Index(fields=['vendor', 'day']),
             models.Index(fields=['vendor', 'created_at']),
         ]
         constraints = [
-            models.UniqueConstraint(fields=['vendor', 'ip_hash', 'ua_hash', 'month_bucket'], name='uniq_view_vendor_ip_ua_month')
+            models.UniqueConstraint(fields=['vendor', 'ip_hash', 'ua_hash', 'day'], name='uniq_view_vendor_ip_ua_day')
         ]
 
 
@@ -285,17 +314,45 @@ class VendorCall(models.Model):
     viewer = models.ForeignKey(get_user_model(), on_delete=models.SET_NULL, null=True, blank=True, related_name='vendor_calls')
     phone = models.CharField(max_length=32, blank=True)
     ip_hash = models.CharField(max_length=64, blank=True)
-    month_bucket = models.CharField(max_length=10, help_text="YYYY-MM-DD (günlük bazlı kayıt)")
+    day = models.DateField(default=timezone.localdate, help_text="Yerel saatle (Europe/Istanbul) arama günü")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'VendorCall'
         indexes = [
-            models.Index(fields=['vendor', 'month_bucket']),
+            models.Index(fields=['vendor', 'day']),
             models.Index(fields=['vendor', 'created_at']),
         ]
         constraints = [
-            models.UniqueConstraint(fields=['vendor', 'ip_hash', 'month_bucket'], name='uniq_call_vendor_ip_month')
+            models.UniqueConstraint(fields=['vendor', 'ip_hash', 'day'], name='uniq_call_vendor_ip_day')
         ]
 
- 
\ No newline at end of file
+ 
+
+class VendorDailyStats(models.Model):
+    """
+    Vendor başına günlük analitik özeti (dashboard bu tablodan okunur).
+    Görüntüleme/arama/randevu/favori/yorum sinyallerle, mesajlar Celery beat ile artımlı güncellenir;
+    vendors.stats.rebuild_daily_stats kaynak tablolardan yeniden hesaplar.
+    """
+    vendor = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField(help_text="Yerel saatle (Europe/Istanbul) gün")
+    views = models.PositiveIntegerField(default=0)
+    calls = models.PositiveIntegerField(default=0)
+    messages = models.PositiveIntegerField(default=0)
+    # Randevular oluşturulma değil randevu tarihine göre sayılır
+    appointments = models.PositiveIntegerField(default=0)
+    favorites = models.PositiveIntegerField(default=0)
+    reviews = models.PositiveIntegerField(default=0)
+    # Ham kaydı olmayan istemci olayları (vendors.events); kaynaktan yeniden hesaplanamaz
+    gallery_opens = models.PositiveIntegerField(default=0)
+    shares = models.PositiveIntegerField(default=0)
+    # Yaklaşık tekil ziyaretçi (HyperLogLog); gece vendors.uniques.persist_day ile yazılır
+    unique_visitors = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'VendorDailyStats'
+        constraints = [
+            # (vendor, day) benzersiz indeksi dashboard'un aralık sorgusuna da hizmet eder
+            models.UniqueConstraint(fields=['vendor', 'day'], name='uniq_vendor_daily_stats')
+        ]
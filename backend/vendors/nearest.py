@@ -0,0 +1,259 @@
+"""
+En yakın vendor araması için process içi vektörel motor (NumPy)
+Listelenen ve koordinatı olan vendor'ların konumları bitişik float dizilerde (radyan) tutulur;
+mesafeler tek seferde vektörel haversine ile hesaplanır, k en yakın argpartition ile seçilir.
+Kategori ve araba markası filtreleri vendor başına uint64 bit kümeleriyle uygulanır.
+Snapshot vendors.changelog versiyonunu izler ve sadece değişen vendor'ları günceller.
+NumPy yüklü değilse motor devre dışıdır ve NearbyVendorsView ORM sorgusuna döner.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - opsiyonel bağımlılık
+    np = None
+
+from . import changelog
+from .geo import EARTH_RADIUS_KM
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+INITIAL_CAPACITY = 1024
+BITSET_WORD_BITS = 64
+
+
+def is_available() -> bool:
+    return np is not None
+
+
+class _BitsetColumn:
+    """İlişki ID'lerini bit pozisyonlarına eşleyen vendor x kelime uint64 matrisi"""
+
+    def __init__(self, related_ids: Iterable[int], capacity: int):
+        self.positions = {related_id: position for position, related_id in enumerate(sorted(set(related_ids)))}
+        self.words = max(1, -(-len(self.positions) // BITSET_WORD_BITS))
+        self.bits = np.zeros((capacity, self.words), dtype=np.uint64)
+
+    def grow(self, capacity: int):
+        grown = np.zeros((capacity, self.words), dtype=np.uint64)
+        grown[:len(self.bits)] = self.bits
+        self.bits = grown
+
+    def knows(self, related_ids: Iterable[int]) -> bool:
+        return all(related_id in self.positions for related_id in related_ids)
+
+    def set_row(self, slot: int, related_ids: Iterable[int]):
+        row = np.zeros(self.words, dtype=np.uint64)
+        for related_id in related_ids:
+            position = self.positions[related_id]
+            row[position // BITSET_WORD_BITS] |= np.uint64(1) << np.uint64(position % BITSET_WORD_BITS)
+        self.bits[slot] = row
+
+    def mask_any(self, related_ids: Sequence[int], size: int):
+        """Verilen ilişkilerden en az birine sahip slotlar (bilinmeyen ID hiçbir şeyle eşleşmez)"""
+        query = np.zeros(self.words, dtype=np.uint64)
+        for related_id in related_ids:
+            position = self.positions.get(related_id)
+            if position is not None:
+                query[position // BITSET_WORD_BITS] |= np.uint64(1) << np.uint64(position % BITSET_WORD_BITS)
+        return (self.bits[:size] & query).any(axis=1)
+
+
+class NearestVendorEngine:
+    """
+    Slot tabanlı snapshot: her vendor bir dizi indeksine (slot) yerleşir.
+    Silinen/listeden çıkan vendor'ın slotu pasif işaretlenir ve yeniden kullanılır.
+    """
+
+    RELATIONS = {
+        # filtre adı: (M2M alanı, through tablosundaki hedef kolon)
+        'category': ('categories', 'category_id'),
+        'carBrand': ('car_brands', 'carbrand_id'),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built = False
+        self._version = None
+
+    # --- Yükleme ---
+    def _load(self, vendor_ids: Optional[Iterable[int]] = None):
+        """(vendor_id, lat, lng) satırları ve ilişki eşlemeleri"""
+        from .models import VendorProfile
+
+        queryset = VendorProfile.objects.filter(
+            user__is_verified=True,
+            user__is_active=True,
+            latitude__isnull=False,
+            longitude__isnull=False,
+        )
+        if vendor_ids is not None:
+            queryset = queryset.filter(pk__in=list(vendor_ids))
+        rows = list(queryset.order_by().values_list('id', 'latitude', 'longitude'))
+        relations = {}
+        for name, (field, column) in self.RELATIONS.items():
+            through = getattr(VendorProfile, field).through
+            mapping: Dict[int, List[int]] = {}
+            for vendor_id, related_id in through.objects.filter(vendorprofile__in=queryset).values_list('vendorprofile_id', column).iterator():
+                mapping.setdefault(vendor_id, []).append(related_id)
+            relations[name] = mapping
+        return rows, relations
+
+    def _allocate(self, capacity: int, relation_ids: Dict[str, Iterable[int]]):
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._lat = np.zeros(capacity, dtype=np.float64)
+        self._lng = np.zeros(capacity, dtype=np.float64)
+        self._cos_lat = np.zeros(capacity, dtype=np.float64)
+        self._active = np.zeros(capacity, dtype=bool)
+        self._bitsets = {name: _BitsetColumn(relation_ids[name], capacity) for name in self.RELATIONS}
+        self._slots: Dict[int, int] = {}
+        self._free: List[int] = []
+        self._size = 0
+
+    def _grow(self):
+        capacity = max(INITIAL_CAPACITY, len(self._ids) * 2)
+        for attr in ('_ids', '_lat', '_lng', '_cos_lat', '_active'):
+            old = getattr(self, attr)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, attr, grown)
+        for bitset in self._bitsets.values():
+            bitset.grow(capacity)
+
+    def _put(self, vendor_id: int, latitude, longitude, relations: Dict[str, List[int]]):
+        slot = self._slots.get(vendor_id)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                if self._size >= len(self._ids):
+                    self._grow()
+                slot = self._size
+                self._size += 1
+            self._slots[vendor_id] = slot
+        lat = np.radians(float(latitude))
+        self._ids[slot] = vendor_id
+        self._lat[slot] = lat
+        self._lng[slot] = np.radians(float(longitude))
+        self._cos_lat[slot] = np.cos(lat)
+        self._active[slot] = True
+        for name, bitset in self._bitsets.items():
+            bitset.set_row(slot, relations[name].get(vendor_id, ()))
+
+    def _drop(self, vendor_id: int):
+        slot = self._slots.pop(vendor_id, None)
+        if slot is not None:
+            self._active[slot] = False
+            self._free.append(slot)
+
+    def load_snapshot(self, ids, latitudes, longitudes, relations, relation_ids, version=None):
+        """
+        Snapshot'ı dizilerden tek seferde kur (koordinatlar derece cinsinden)
+        relations: filtre adı -> {vendor_id: [ilişki ID'leri]}, relation_ids: filtre adı -> tüm ilişki ID'leri
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        count = len(ids)
+        self._allocate(max(INITIAL_CAPACITY, count), relation_ids)
+        self._ids[:count] = ids
+        self._lat[:count] = np.radians(np.asarray(latitudes, dtype=np.float64))
+        self._lng[:count] = np.radians(np.asarray(longitudes, dtype=np.float64))
+        self._cos_lat[:count] = np.cos(self._lat[:count])
+        self._active[:count] = True
+        self._size = count
+        self._slots = {vendor_id: slot for slot, vendor_id in enumerate(ids.tolist())}
+        for name, bitset in self._bitsets.items():
+            for vendor_id, related_ids in relations.get(name, {}).items():
+                slot = self._slots.get(vendor_id)
+                if slot is not None:
+                    bitset.set_row(slot, related_ids)
+        self._version = version
+        self._built = True
+
+    def _build(self, version):
+        from core.models import Category, CarBrand
+
+        rows, relations = self._load()
+        relation_ids = {
+            'category': Category.objects.values_list('id', flat=True),
+            'carBrand': CarBrand.objects.values_list('id', flat=True),
+        }
+        self.load_snapshot(
+            [row[0] for row in rows],
+            [float(row[1]) for row in rows],
+            [float(row[2]) for row in rows],
+            relations, relation_ids, version,
+        )
+
+    def _apply_changes(self, vendor_ids, version) -> bool:
+        """Değişen vendor'ları güncelle; yeni kategori/marka gibi bit kümesine sığmayan durumda False"""
+        rows, relations = self._load(vendor_ids)
+        for name, mapping in relations.items():
+            if not all(self._bitsets[name].knows(related) for related in mapping.values()):
+                return False
+        for vendor_id in vendor_ids:
+            self._drop(vendor_id)
+        for vendor_id, latitude, longitude in rows:
+            self._put(vendor_id, latitude, longitude, relations)
+        self._version = version
+        return True
+
+    def _ensure_fresh(self):
+        current = changelog.current_version()
+        if self._built and (current is None or current == self._version):
+            return
+        pending = changelog.changes_since(self._version, current) if self._built else None
+        if pending is None or not self._apply_changes(pending, current):
+            self._build(current)
+
+    # --- Sorgu ---
+    def _distances_km(self, latitude: float, longitude: float, slots):
+        lat0 = np.radians(latitude)
+        dlat = self._lat[slots] - lat0
+        dlng = self._lng[slots] - np.radians(longitude)
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat0) * self._cos_lat[slots] * np.sin(dlng / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: Optional[float] = None,
+        k: Optional[int] = None,
+        category_ids: Sequence[int] = (),
+        car_brand_ids: Sequence[int] = (),
+    ) -> List[Tuple[int, float]]:
+        """
+        Yakından uzağa (vendor_id, mesafe_km) listesi
+        radius_km ve k birlikte verilebilir; kategori/marka listelerinde herhangi biri yeterlidir.
+        """
+        with self._lock:
+            self._ensure_fresh()
+            size = self._size
+            mask = self._active[:size].copy()
+            if radius_km is not None:
+                # Trigonometriden önce ucuz enlem bandı filtresi: |Δenlem| <= yarıçap açısı
+                mask &= np.abs(self._lat[:size] - np.radians(latitude)) <= radius_km / EARTH_RADIUS_KM
+            if category_ids:
+                mask &= self._bitsets['category'].mask_any(category_ids, size)
+            if car_brand_ids:
+                mask &= self._bitsets['carBrand'].mask_any(car_brand_ids, size)
+            slots = np.flatnonzero(mask)
+            if not len(slots):
+                return []
+
+            distances = self._distances_km(latitude, longitude, slots)
+            if radius_km is not None:
+                within = distances <= radius_km
+                slots, distances = slots[within], distances[within]
+            if k is not None and 0 < k < len(slots):
+                nearest_k = np.argpartition(distances, k - 1)[:k]
+                slots, distances = slots[nearest_k], distances[nearest_k]
+            order = np.argsort(distances, kind='stable')
+            ids = self._ids[slots[order]]
+            return list(zip(ids.tolist(), distances[order].tolist()))
+
+
+nearest_engine = NearestVendorEngine()
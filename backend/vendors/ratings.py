@@ -0,0 +1,127 @@
+"""
+VendorProfile üzerindeki denormalize değerlendirme istatistikleri
+(review_count, rating_sum, avg_rating, monthly_review_count)
+Review oluşturma/düzenleme/silme işlemlerinde tek bir atomik UPDATE ile artımlı güncellenir;
+arama sıralaması ve serializer'lar ek sorgu yapmadan bu kolonları okur.
+"""
+from datetime import timedelta
+
+from django.db.models import Avg, Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest
+from django.utils import timezone
+
+from .search_cache import clear_search_cache
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def current_month_window(now=None):
+    """Bu ayın [başlangıç, sonraki ay başlangıcı) aralığını döndür"""
+    now = now or timezone.now()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    return month_start, next_month
+
+
+def is_in_current_month(moment) -> bool:
+    if moment is None:
+        return False
+    month_start, next_month = current_month_window()
+    return month_start <= moment < next_month
+
+
+def apply_review_delta(vendor_id, count_delta: int, rating_delta: int, monthly_delta: int = 0) -> None:
+    """
+    Vendor istatistiklerine artımlı değişikliği tek UPDATE ile uygula.
+    UPDATE ifadesinin sağ tarafı satırın eski değerlerini okuduğundan eşzamanlı yazmalarda da tutarlıdır.
+    """
+    from .models import VendorProfile
+
+    new_count = F('review_count') + count_delta
+    new_sum = F('rating_sum') + rating_delta
+    VendorProfile.objects.filter(pk=vendor_id).update(
+        review_count=Greatest(new_count, 0),
+        rating_sum=Greatest(new_sum, 0),
+        monthly_review_count=Greatest(F('monthly_review_count') + monthly_delta, 0),
+        avg_rating=Case(
+            When(
+                review_count__gt=-count_delta,
+                then=Cast(new_sum, FloatField()) / Cast(new_count, FloatField()),
+            ),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+    )
+
+
+def review_created(review) -> None:
+    apply_review_delta(
+        review.vendor_id,
+        count_delta=1,
+        rating_delta=review.rating,
+        monthly_delta=1 if is_in_current_month(review.created_at) else 0,
+    )
+
+
+def review_deleted(review) -> None:
+    apply_review_delta(
+        review.vendor_id,
+        count_delta=-1,
+        rating_delta=-review.rating,
+        monthly_delta=-1 if is_in_current_month(review.created_at) else 0,
+    )
+
+
+def review_updated(review, old_vendor_id, old_rating) -> None:
+    """Düzenlenen yorum: puan veya vendor değiştiyse farkı uygula"""
+    if old_vendor_id != review.vendor_id:
+        monthly = 1 if is_in_current_month(review.created_at) else 0
+        apply_review_delta(old_vendor_id, -1, -old_rating, -monthly)
+        apply_review_delta(review.vendor_id, 1, review.rating, monthly)
+    elif old_rating != review.rating:
+        apply_review_delta(review.vendor_id, 0, review.rating - old_rating, 0)
+
+
+def _monthly_count_subquery(month_start, next_month):
+    from .models import Review
+
+    return Subquery(
+        Review.objects.filter(
+            vendor=OuterRef('pk'),
+            created_at__gte=month_start,
+            created_at__lt=next_month,
+        ).order_by().values('vendor').annotate(c=Count('id')).values('c')[:1]
+    )
+
+
+def roll_monthly_review_counts() -> int:
+    """Aylık pencereyi yeni aya taşı: monthly_review_count'u bu ayın yorumlarından yeniden hesapla"""
+    from .models import VendorProfile
+
+    month_start, next_month = current_month_window()
+    updated = VendorProfile.objects.update(
+        monthly_review_count=Coalesce(_monthly_count_subquery(month_start, next_month), 0)
+    )
+    clear_search_cache()  # sıralama tüm sonuçlarda değişir
+    return updated
+
+
+def rebuild_rating_aggregates(vendor_ids=None) -> int:
+    """Tüm (veya verilen) vendor'ların istatistiklerini Review tablosundan sıfırdan hesapla"""
+    from .models import VendorProfile, Review
+
+    month_start, next_month = current_month_window()
+    stats = Review.objects.filter(vendor=OuterRef('pk')).order_by().values('vendor')
+    queryset = VendorProfile.objects.all()
+    if vendor_ids is not None:
+        queryset = queryset.filter(pk__in=vendor_ids)
+    updated = queryset.update(
+        review_count=Coalesce(Subquery(stats.annotate(c=Count('id')).values('c')[:1]), 0),
+        rating_sum=Coalesce(Subquery(stats.annotate(s=Sum('rating')).values('s')[:1]), 0),
+        avg_rating=Coalesce(Subquery(stats.annotate(a=Avg('rating')).values('a')[:1], output_field=FloatField()), 0.0),
+        monthly_review_count=Coalesce(_monthly_count_subquery(month_start, next_month), 0),
+    )
+    clear_search_cache()
+    return updated
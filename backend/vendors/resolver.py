@@ -0,0 +1,158 @@
+"""
+Public endpoint'ler için slug -> vendor çözümleyici
+Slug'ı (vendor_id, user_id, is_active, is_listed) bilgisine çevirir; böylece slug ile gelen
+isteklerde kullanıcı tablosuyla join'li VendorProfile sorgusu yapılmaz.
+
+L1: process içi LRU (RESOLVER_L1_SIZE kayıt). L2: cache (Redis). Profil veya kullanıcının
+doğrulama/aktiflik durumu değişince L2 kaydı commit sonrası silinir; diğer worker'lar
+vendors.changelog versiyonunu en fazla VERSION_CHECK_INTERVAL saniyede bir okuyup değişen
+vendor'ları L1'den atar (günlük eksikse L1 tamamen boşaltılır). Bulunamayan slug'lar cache'lenmez.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+
+from . import changelog
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+KEY = 'vendor_slug:{slug}'
+# Kaçırılan bir geçersiz kılma (örn. queryset.update) için üst sınır
+L2_TTL = 60 * 10
+RESOLVER_L1_SIZE = 5000
+VERSION_CHECK_INTERVAL = 1.0
+
+
+class VendorRef(NamedTuple):
+    vendor_id: int
+    user_id: int
+    # Kullanıcı aktif (analytics olayları kabul edilir)
+    is_active: bool
+    # Kullanıcı doğrulanmış ve aktif (profil herkese açık)
+    is_listed: bool
+
+
+class SlugResolver:
+
+    def __init__(self, size: int = RESOLVER_L1_SIZE):
+        self._lock = threading.Lock()
+        self._size = size
+        self._entries: 'OrderedDict[str, VendorRef]' = OrderedDict()
+        # vendor_id -> slug (changelog vendor ID yayınlar; slug değişse de eski kayıt bulunur)
+        self._slugs: Dict[int, str] = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    # --- L1 ---
+    def _clear(self):
+        self._entries.clear()
+        self._slugs.clear()
+
+    def _evict(self, vendor_ids: Iterable[int]):
+        for vendor_id in vendor_ids:
+            slug = self._slugs.pop(vendor_id, None)
+            if slug is not None:
+                self._entries.pop(slug, None)
+
+    def _sync(self):
+        """Diğer worker'lardaki değişiklikleri changelog üzerinden uygula"""
+        now = time.monotonic()
+        if now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        current = changelog.current_version()
+        if current is None or current == self._version:
+            return
+        changed = changelog.changes_since(self._version, current)
+        if changed is None:
+            self._clear()
+        else:
+            self._evict(changed)
+        self._version = current
+
+    def _remember(self, slug: str, ref: VendorRef):
+        with self._lock:
+            previous = self._slugs.get(ref.vendor_id)
+            if previous is not None and previous != slug:
+                self._entries.pop(previous, None)
+            self._entries[slug] = ref
+            self._entries.move_to_end(slug)
+            self._slugs[ref.vendor_id] = slug
+            while len(self._entries) > self._size:
+                _, evicted = self._entries.popitem(last=False)
+                self._slugs.pop(evicted.vendor_id, None)
+
+    # --- Çözümleme ---
+    def _load(self, slug: str) -> Optional[VendorRef]:
+        from .models import VendorProfile
+
+        row = VendorProfile.objects.filter(slug=slug).values_list(
+            'id', 'user_id', 'user__is_active', 'user__is_verified'
+        ).first()
+        if row is None:
+            return None
+        vendor_id, user_id, is_active, is_verified = row
+        return VendorRef(vendor_id, user_id, is_active, is_active and is_verified)
+
+    def resolve(self, slug) -> Optional[VendorRef]:
+        if not slug or not isinstance(slug, str):
+            return None
+        with self._lock:
+            self._sync()
+            ref = self._entries.get(slug)
+            if ref is not None:
+                self._entries.move_to_end(slug)
+                return ref
+
+        key = KEY.format(slug=slug)
+        try:
+            cached = cache.get(key)
+        except Exception as e:
+            logger.warning(f"Vendor slug cache read failed: {e}")
+            cached = None
+        if cached is not None:
+            ref = VendorRef(*cached)
+        else:
+            ref = self._load(slug)
+            if ref is None:
+                return None
+            try:
+                cache.set(key, tuple(ref), timeout=L2_TTL)
+            except Exception as e:
+                logger.warning(f"Vendor slug cache write failed: {e}")
+        self._remember(slug, ref)
+        return ref
+
+    def forget(self, vendor_id: int, slugs: Iterable[str] = ()):
+        """Bu worker'ın L1'inden ve L2'den sil (diğer worker'lar changelog ile temizler)"""
+        with self._lock:
+            slug = self._slugs.get(vendor_id)
+            self._evict([vendor_id])
+        keys = {KEY.format(slug=value) for value in (slug, *slugs) if value}
+        if keys:
+            try:
+                cache.delete_many(list(keys))
+            except Exception as e:
+                logger.warning(f"Vendor slug cache invalidation failed: {e}")
+
+
+slug_resolver = SlugResolver()
+
+
+def resolve(slug) -> Optional[VendorRef]:
+    return slug_resolver.resolve(slug)
+
+
+def invalidate(vendor_id: int, slugs: Iterable[str] = ()) -> None:
+    """
+    Vendor'ın slug kaydını geçersiz kıl (commit sonrası; aksi halde eşzamanlı bir okuma
+    eski satırı tekrar cache'e yazabilir). Değişen slug'ların eski ve yeni değerleri verilmeli.
+    """
+    slugs = [slug for slug in slugs if slug]
+    transaction.on_commit(lambda: slug_resolver.forget(vendor_id, slugs))
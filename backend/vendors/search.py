@@ -0,0 +1,265 @@
+"""
+Vendor metin araması için Türkçe normalize edilmiş arama dokümanı ve indeks
+Her VendorProfile için display_name, company_title, about, şehir/ilçe ve
+hizmet alanı/kategori/araba markası adları tek bir katlanmış (folded) metinde tutulur.
+PostgreSQL'de bu kolon üzerinde pg_trgm GIN indeksi kullanılır,
+diğer veritabanlarında (SQLite) process içi inverted index devreye girer.
+"""
+import re
+import threading
+from typing import Iterable, List, Optional, Set
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Türkçe karakterleri ASCII karşılıklarına katla (aramada ı/i, ş/s farkı olmasın)
+TURKISH_FOLD_TABLE = str.maketrans({
+    'ç': 'c',
+    'ğ': 'g',
+    'ı': 'i',
+    'ö': 'o',
+    'ş': 's',
+    'ü': 'u',
+    'â': 'a',
+    'î': 'i',
+    'û': 'u',
+    '\u0307': None,  # 'İ'.lower() sonrası kalan birleştirici nokta
+})
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# SQLite fallback indeksinin geçerliliği için cache version anahtarı
+SEARCH_INDEX_VERSION_KEY = 'vendor_search:index_version'
+# SQLite'a gönderilen id__in listesinin üst sınırı; üstünde LIKE filtresine dönülür
+MAX_ID_FILTER_SIZE = 500
+
+
+def turkish_fold(value) -> str:
+    """Metni Türkçe kurallarıyla küçült ve aksanlı harfleri ASCII'ye katla"""
+    if not value:
+        return ''
+    text = str(value).replace('İ', 'i').replace('I', 'i').lower()
+    return text.translate(TURKISH_FOLD_TABLE)
+
+
+def tokenize(value) -> List[str]:
+    """Katlanmış metni alfanumerik token'lara ayır"""
+    return TOKEN_RE.findall(turkish_fold(value))
+
+
+def compose_search_document(parts: Iterable) -> str:
+    """Alan değerlerinden tek satırlık arama dokümanı oluştur"""
+    tokens = []
+    for part in parts:
+        tokens.extend(tokenize(part))
+    return ' '.join(tokens)
+
+
+def build_search_document(vendor) -> str:
+    """VendorProfile için arama dokümanını oluştur (M2M ilişkiler prefetch edilmiş olmalı)"""
+    parts = [
+        vendor.display_name,
+        vendor.company_title,
+        vendor.about,
+        vendor.business_type,
+        vendor.city,
+        vendor.district,
+    ]
+    parts.extend(area.name for area in vendor.service_areas.all())
+    parts.extend(category.name for category in vendor.categories.all())
+    parts.extend(brand.name for brand in vendor.car_brands.all())
+    return compose_search_document(parts)
+
+
+def refresh_search_document(vendor_id) -> Optional[str]:
+    """Tek bir vendor'ın arama dokümanını yeniden hesapla ve değiştiyse kaydet"""
+    from .models import VendorProfile
+
+    vendor = VendorProfile.objects.filter(pk=vendor_id).prefetch_related(
+        'service_areas', 'categories', 'car_brands'
+    ).first()
+    if vendor is None:
+        return None
+
+    document = build_search_document(vendor)
+    if document != vendor.search_document:
+        # update() kullanılır; post_save sinyali tekrar tetiklenmesin
+        VendorProfile.objects.filter(pk=vendor_id).update(search_document=document)
+        mark_search_index_stale()
+    return document
+
+
+def rebuild_search_documents(batch_size: int = 500) -> int:
+    """Tüm vendor'ların arama dokümanlarını baştan oluştur, güncellenen kayıt sayısını döndür"""
+    from .models import VendorProfile
+
+    updated = 0
+    queryset = VendorProfile.objects.prefetch_related(
+        'service_areas', 'categories', 'car_brands'
+    ).order_by('id')
+    pending = []
+    for vendor in queryset.iterator(chunk_size=batch_size):
+        document = build_search_document(vendor)
+        if document != vendor.search_document:
+            vendor.search_document = document
+            pending.append(vendor)
+        if len(pending) >= batch_size:
+            VendorProfile.objects.bulk_update(pending, ['search_document'])
+            updated += len(pending)
+            pending = []
+    if pending:
+        VendorProfile.objects.bulk_update(pending, ['search_document'])
+        updated += len(pending)
+    mark_search_index_stale()
+    if updated:
+        from .search_cache import clear_search_cache
+        clear_search_cache()
+    return updated
+
+
+def mark_search_index_stale() -> None:
+    """Diğer worker'lardaki process içi indeksleri commit sonrasında geçersiz kıl (commit öncesi satırlardan kurulan indeks yeni versiyonla saklanmasın)"""
+    def _bump():
+        try:
+            cache.incr(SEARCH_INDEX_VERSION_KEY)
+        except ValueError:
+            cache.set(SEARCH_INDEX_VERSION_KEY, 1, timeout=None)
+        except Exception as e:
+            logger.warning(f"Search index version bump failed: {e}")
+
+    transaction.on_commit(_bump)
+
+
+def _current_index_version():
+    try:
+        return cache.get(SEARCH_INDEX_VERSION_KEY, 0)
+    except Exception:
+        return None
+
+
+class InvertedSearchIndex:
+    """
+    Arama dokümanları üzerinde process içi inverted index (PostgreSQL olmayan ortamlar için)
+    Token -> vendor ID kümesi eşlemesi tutar; cache version değişince tembel olarak yeniden kurulur.
+    Alt dize araması sözlüğü taramaz: SHORT_GRAM'a kadar uzunluktaki her alt dize doğrudan
+    vendor ID'lerine, her trigram da onu içeren token'lara eşlenir. Uzun sorgu token'ı için
+    trigramlarının token kümeleri kesiştirilir ve kalan az sayıda aday doğrulanır.
+    """
+
+    SHORT_GRAM = 3
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._short = {}
+        self._trigrams = {}
+        self._version = None
+        self._built = False
+
+    @classmethod
+    def _grams(cls, token: str, size: int) -> Set[str]:
+        return {token[i:i + size] for i in range(len(token) - size + 1)}
+
+    def _build(self):
+        from .models import VendorProfile
+
+        postings, short, trigrams = {}, {}, {}
+        rows = VendorProfile.objects.exclude(search_document='').values_list('id', 'search_document')
+        for vendor_id, document in rows.iterator():
+            for token in set(document.split()):
+                postings.setdefault(token, set()).add(vendor_id)
+        for token, ids in postings.items():
+            for size in range(1, self.SHORT_GRAM + 1):
+                for gram in self._grams(token, size):
+                    short.setdefault(gram, set()).update(ids)
+            for gram in self._grams(token, 3):
+                trigrams.setdefault(gram, set()).add(token)
+        return postings, short, trigrams
+
+    def _is_fresh(self, version) -> bool:
+        # Cache erişilemiyorsa (version None) mevcut indeks kullanılmaya devam eder
+        return self._built and (version is None or version == self._version)
+
+    def _ensure_fresh(self):
+        version = _current_index_version()
+        if self._is_fresh(version):
+            return
+        with self._lock:
+            if self._is_fresh(version):
+                return
+            self._postings, self._short, self._trigrams = self._build()
+            self._version = version
+            self._built = True
+
+    def _matches(self, token: str) -> Set[int]:
+        if len(token) <= self.SHORT_GRAM:
+            return self._short.get(token, set())
+        candidates = None
+        for gram in sorted(self._grams(token, 3), key=lambda gram: len(self._trigrams.get(gram, ()))):
+            tokens = self._trigrams.get(gram)
+            if not tokens:
+                return set()
+            candidates = set(tokens) if candidates is None else candidates & tokens
+            if not candidates:
+                return set()
+        matches = set()
+        for candidate in candidates:
+            # Trigramların hepsini içermek sıralı alt dize olmayı garanti etmez
+            if token in candidate:
+                matches |= self._postings[candidate]
+        return matches
+
+    def search(self, tokens: Iterable[str]) -> Set[int]:
+        """Tüm token'ları (alt dize olarak) içeren vendor ID'lerini döndür"""
+        self._ensure_fresh()
+        result = None
+        for token in tokens:
+            matches = self._matches(token)
+            result = set(matches) if result is None else (result & matches)
+            if not result:
+                return set()
+        return result or set()
+
+
+search_index = InvertedSearchIndex()
+
+
+def apply_location_filter(queryset, field: str, value: str):
+    """
+    Şehir/ilçe filtresini Türkçe katlanmış karşılaştırmayla uygula
+    icontains veritabanına göre 'İ'/'ı' harflerini farklı eşler (SQLite hiç eşlemez);
+    bunun yerine alandaki farklı değerler katlanıp eşleşenler __in ile filtrelenir.
+    """
+    from .models import VendorProfile
+
+    needle = ' '.join(turkish_fold(value).split())
+    if not needle:
+        return queryset
+    candidates = VendorProfile.objects.order_by().values_list(field, flat=True).distinct()
+    matches = [candidate for candidate in candidates if candidate and needle in turkish_fold(candidate)]
+    return queryset.filter(**{f'{field}__in': matches})
+
+
+def apply_text_search(queryset, query: str):
+    """VendorProfile queryset'ine katlanmış arama dokümanı üzerinden metin filtresi uygula"""
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        # search_document üzerindeki gin_trgm_ops indeksi LIKE '%token%' sorgularını karşılar
+        for token in tokens:
+            queryset = queryset.filter(search_document__contains=token)
+        return queryset
+
+    matches = search_index.search(tokens)
+    if len(matches) > MAX_ID_FILTER_SIZE:
+        # Seçici olmayan sorgu: sınırsız IN listesi yerine doküman üzerinde LIKE filtresi
+        for token in tokens:
+            queryset = queryset.filter(search_document__contains=token)
+        return queryset
+    return queryset.filter(id__in=matches)
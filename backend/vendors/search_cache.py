@@ -0,0 +1,290 @@
+"""
+Vendor arama sonuçları için tag tabanlı cache
+Anahtar normalize edilmiş filtrelerden (Türkçe katlanmış şehir/ilçe, sıralı parametreler) üretilir.
+Her kayıt dokunduğu tag'lerin (vendor ID, şehir, kategori) o anki versiyonlarıyla saklanır;
+ilgili veri değişince tag versiyonu değiştirilir ve kayıt okunurken bayat sayılır.
+Süresi dolan popüler bir anahtar için tek bir istek yeniden hesaplar (stampede koruması),
+diğerleri varsa bayat sonucu döner ya da kısa süre hesaplanan sonucu bekler.
+"""
+import hashlib
+import json
+import time
+import uuid
+from typing import Dict, Iterable, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+from .search import tokenize, turkish_fold
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'vendor_search'
+
+# Tag versiyonları değişmediği sürece kayıt geçerli; bu süre sadece üst sınır
+RESULT_TTL = 60 * 15
+LOCK_TTL = 10
+# Kilidi alamayan ve bayat sonucu da olmayan istekler bu kadar bekler, sonra kendisi hesaplar
+LOCK_WAIT_SECONDS = 1.5
+LOCK_POLL_INTERVAL = 0.05
+
+DEFAULT_PAGE_SIZE = 15
+MAX_PAGE_SIZE = 50
+
+# Tüm kayıtlarda bulunan tag; değiştirilince tüm arama cache'i geçersiz olur
+GLOBAL_TAG = 'global'
+# Kategori filtresi olmayan aramaların kapsamı (her vendor değişikliğinde değişir)
+ALL_TAG = 'all'
+
+
+def city_tag(city) -> str:
+    return f'city:{normalize_text(city)}'
+
+
+def category_tag(category_id) -> str:
+    return f'category:{category_id}'
+
+
+def vendor_tag(vendor_id) -> str:
+    return f'vendor:{vendor_id}'
+
+
+def normalize_text(value) -> str:
+    """Türkçe katlanmış, boşlukları sadeleştirilmiş değer"""
+    return ' '.join(turkish_fold(value).split())
+
+
+def _normalize_page_size(value) -> int:
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    if size < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(size, MAX_PAGE_SIZE)
+
+
+def normalize_search_params(query_params) -> Dict[str, str]:
+    """
+    Sonucu etkileyen parametreleri tek biçime getir
+    Sonucu değiştirmeyen parametreler (örn. utm_*, ordering) anahtara girmez.
+    """
+    params = {
+        'city': normalize_text(query_params.get('city', '')),
+        'district': normalize_text(query_params.get('district', '')),
+        'q': ' '.join(tokenize(query_params.get('q', ''))),
+        'service': query_params.get('service', '').strip(),
+        'category': query_params.get('category', '').strip(),
+        'carBrand': query_params.get('carBrand', '').strip(),
+        'page': query_params.get('page', '1').strip() or '1',
+        'page_size': str(_normalize_page_size(query_params.get('page_size'))),
+        # Cursor modu (bkz. VendorSearchCursorPagination)
+        'pagination': query_params.get('pagination', '').strip(),
+        'cursor': query_params.get('cursor', '').strip(),
+        'count': query_params.get('count', '').strip(),
+    }
+    return {key: value for key, value in sorted(params.items()) if value}
+
+
+# Sonuç kümesini değil sadece sayfayı/sunumu belirleyen parametreler
+PAGE_PARAMS = ('page', 'page_size', 'pagination', 'cursor', 'count')
+
+
+def scope_tag(params: Dict[str, str]) -> str:
+    """
+    Sonuç kümesinin üyeliğini belirleyen en dar filtre
+    Şehir filtresi alt dize eşleşmesidir ('stanb' -> İstanbul); tek bir şehir tag'i kümeyi kapsamaz,
+    bu yüzden şehir filtreli aramalar kategori yoksa ALL kapsamındadır.
+    """
+    if params.get('category'):
+        return category_tag(params['category'])
+    return ALL_TAG
+
+
+def make_cache_key(params: Dict[str, str], host: str = '') -> str:
+    # Sayfalama linkleri mutlak URL olduğundan host da anahtara dahil
+    raw = json.dumps([host, params], sort_keys=True, separators=(',', ':'))
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'{KEY_PREFIX}:result:{digest}'
+
+
+def _tag_key(tag: str) -> str:
+    return f'{KEY_PREFIX}:tag:{tag}'
+
+
+def get_tag_versions(tags: Iterable[str]) -> Dict[str, Optional[str]]:
+    """Tag'lerin güncel versiyonları (hiç değişmemiş tag için None)"""
+    tags = list(set(tags))
+    found = cache.get_many([_tag_key(tag) for tag in tags])
+    return {tag: found.get(_tag_key(tag)) for tag in tags}
+
+
+def bump_tags(tags: Iterable[str]) -> None:
+    """Tag'lere yeni versiyon ver; bu tag'leri taşıyan tüm kayıtlar bayatlar"""
+    tags = set(tags)
+    if not tags:
+        return
+    version = uuid.uuid4().hex
+    try:
+        cache.set_many({_tag_key(tag): version for tag in tags}, timeout=None)
+    except Exception as e:
+        logger.warning(f"Search cache tag bump failed: {e}")
+
+
+def bump_tags_on_commit(tags: Iterable[str]) -> None:
+    """
+    Versiyonu commit sonrasında değiştir
+    Aksi halde eşzamanlı bir istek commit öncesi veriyi yeni versiyonla cache'leyebilir.
+    """
+    tags = set(tags)
+    transaction.on_commit(lambda: bump_tags(tags))
+
+
+def invalidate_vendor(vendor_id, cities: Iterable = (), category_ids: Iterable = ()) -> None:
+    """
+    Vendor'ın görünürlüğü, sırası veya kart içeriği değişti
+    Vendor'ın kendisi, şehri/kategorileri ve filtresiz aramalar geçersiz olur.
+    cities / category_ids eski değerleri (taşınan vendor, çıkarılan kategori) eklemek içindir.
+    """
+    from .models import VendorProfile
+
+    def _bump():
+        tags = {vendor_tag(vendor_id), ALL_TAG}
+        tags.update(city_tag(city) for city in cities if city)
+        tags.update(category_tag(category_id) for category_id in category_ids)
+        try:
+            current_city = VendorProfile.objects.filter(pk=vendor_id).values_list('city', flat=True).first()
+            if current_city:
+                tags.add(city_tag(current_city))
+            tags.update(
+                category_tag(category_id)
+                for category_id in VendorProfile.categories.through.objects.filter(
+                    vendorprofile_id=vendor_id
+                ).values_list('category_id', flat=True)
+            )
+        except Exception as e:
+            logger.warning(f"Search cache tag lookup failed for vendor {vendor_id}: {e}")
+        bump_tags(tags)
+
+    transaction.on_commit(_bump)
+
+
+def clear_search_cache() -> None:
+    """Tüm arama sonuçlarını geçersiz kıl (örn. kategori/hizmet alanı adı değişti)"""
+    bump_tags_on_commit([GLOBAL_TAG])
+
+
+def _is_fresh(entry) -> bool:
+    stored = entry.get('tags') or {}
+    return get_tag_versions(stored.keys()) == stored
+
+
+def _result_tags(data) -> set:
+    """Sayfadaki vendor'ların ID ve şehir tag'leri"""
+    tags = set()
+    results = data.get('results', []) if isinstance(data, dict) else []
+    for item in results:
+        if item.get('id') is not None:
+            tags.add(vendor_tag(item['id']))
+        if item.get('city'):
+            tags.add(city_tag(item['city']))
+    return tags
+
+
+def _cached_response(entry, status_label: str) -> Response:
+    response = Response(entry['data'])
+    response['X-Search-Cache'] = status_label
+    return response
+
+
+def _store(key: str, data, versions: Dict[str, Optional[str]]) -> None:
+    versions = dict(versions)
+    # Sayfa tag'leri hesaplama sonrası okunur; kapsam tag'leri hesaplama öncesi alınmış olmalı
+    versions.update(get_tag_versions(_result_tags(data) - versions.keys()))
+    cache.set(key, {'data': data, 'tags': versions}, timeout=RESULT_TTL)
+
+
+def cached_count(request, compute) -> int:
+    """
+    Filtre kümesinin toplam sonuç sayısı, sayfadan bağımsız olarak cache'lenir
+    Sonuç cache'iyle aynı kapsam tag'leriyle geçersiz olur; cursor sayfaları her istekte COUNT çalıştırmaz.
+    """
+    params = {
+        key: value for key, value in normalize_search_params(request.query_params).items()
+        if key not in PAGE_PARAMS
+    }
+    raw = json.dumps(params, sort_keys=True, separators=(',', ':'))
+    key = f'{KEY_PREFIX}:count:{hashlib.md5(raw.encode("utf-8")).hexdigest()}'
+    try:
+        entry = cache.get(key)
+        if entry is not None and _is_fresh(entry):
+            return entry['count']
+        versions = get_tag_versions([GLOBAL_TAG, scope_tag(params)])
+    except Exception as e:
+        logger.warning(f"Search count cache unavailable: {e}")
+        return compute()
+
+    count = compute()
+    try:
+        cache.set(key, {'count': count, 'tags': versions}, timeout=RESULT_TTL)
+    except Exception as e:
+        logger.warning(f"Search count cache store failed: {e}")
+    return count
+
+
+def _wait_for_fresh(key: str):
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and _is_fresh(entry):
+            return entry
+    return None
+
+
+def cached_search_response(request, compute):
+    """
+    Arama cevabını cache'ten döndür, yoksa compute() ile üretip cache'le
+    compute DRF Response döndürmeli; sadece 200 cevaplar saklanır.
+    """
+    params = normalize_search_params(request.query_params)
+    key = make_cache_key(params, request.get_host())
+    lock_key = f'{key}:lock'
+
+    try:
+        entry = cache.get(key)
+        if entry is not None and _is_fresh(entry):
+            return _cached_response(entry, 'HIT')
+
+        if not cache.add(lock_key, 1, timeout=LOCK_TTL):
+            # Başka bir istek yeniden hesaplıyor: bayat sonuç varsa onu ver, yoksa kısa süre bekle
+            if entry is not None:
+                return _cached_response(entry, 'STALE')
+            fresh = _wait_for_fresh(key)
+            if fresh is not None:
+                return _cached_response(fresh, 'HIT')
+            return compute()
+
+        versions = get_tag_versions([GLOBAL_TAG, scope_tag(params)])
+    except Exception as e:
+        # Cache erişilemiyorsa arama cache'siz çalışmaya devam eder
+        logger.warning(f"Search cache unavailable: {e}")
+        return compute()
+
+    try:
+        response = compute()
+        if response.status_code == 200:
+            try:
+                _store(key, response.data, versions)
+            except Exception as e:
+                logger.warning(f"Search cache store failed: {e}")
+        response['X-Search-Cache'] = 'MISS'
+        return response
+    finally:
+        try:
+            cache.delete(lock_key)
+        except Exception:
+            pass
@@ -323,23 +323,16 @@ class VendorProfileSerializer(serializers.ModelSerializer):
         return data
     
     def get_rating(self, obj):
-        """Vendor'ın ortalama puanını hesapla"""
-        from django.db.models import Avg
-        avg_rating = obj.reviews.aggregate(avg_rating=Avg('rating'))['avg_rating']
-        return round(avg_rating, 1) if avg_rating else 0.0
+        """Vendor'ın ortalama puanı (denormalize kolon)"""
+        return round(obj.avg_rating, 1) if obj.avg_rating else 0.0
     
     def get_review_count(self, obj):
-        """Vendor'ın toplam değerlendirme sayısını döndür"""
-        return obj.reviews.count()
+        """Vendor'ın toplam değerlendirme sayısı (denormalize kolon)"""
+        return obj.review_count
     
     def get_monthly_review_count(self, obj):
-        """Vendor'ın bu ayki değerlendirme sayısını döndür"""
-        from django.utils import timezone
-        from datetime import timedelta
-        now = timezone.now()
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        next_month = (month_start + timedelta(days=32)).replace(day=1)
-        return obj.reviews.filter(created_at__gte=month_start, created_at__lt=next_month).count()
+        """Vendor'ın bu ayki değerlendirme sayısı (denormalize kolon)"""
+        return obj.monthly_review_count
 
     def validate_business_type(self, value):
         # Business type whitelist kontrolü
@@ -393,6 +386,73 @@ class VendorProfileSerializer(serializers.ModelSerializer):
         return instance 
 
 
+class NamedRelationSerializer(serializers.Serializer):
+    """Liste kartlarında kullanılan hafif {id, name} gösterimi"""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+
+
+class VendorSearchCardSerializer(serializers.ModelSerializer):
+    """
+    Arama sonuç kartı için hafif serializer.
+    Sadece listede gösterilen alanları döner; galeri, vergi/TC bilgisi ve satır başına sorgu yoktur.
+    Queryset'in shape_queryset() ile hazırlanmış olması gerekir.
+    """
+    ABOUT_MAX_LENGTH = 200
+    # Sayfa başına sorgu üst sınırı: paginator COUNT + sayfa sorgusu + service_areas + categories prefetch
+    QUERIES_PER_PAGE = 4
+
+    about = serializers.CharField(source='about_excerpt', read_only=True)
+    avatar = serializers.SerializerMethodField()
+    user = serializers.SerializerMethodField()
+    service_areas = NamedRelationSerializer(many=True, read_only=True)
+    categories = NamedRelationSerializer(many=True, read_only=True)
+    rating = serializers.SerializerMethodField()
+
+    class Meta:
+        model = VendorProfile
+        fields = (
+            'id', 'slug', 'display_name', 'company_title', 'business_type', 'about',
+            'city', 'district', 'subdistrict', 'avatar', 'user', 'service_areas', 'categories',
+            'rating', 'review_count', 'monthly_review_count'
+        )
+        read_only_fields = fields
+
+    @classmethod
+    def shape_queryset(cls, queryset):
+        """Sadece kartta kullanılan kolonları çeken queryset şekli"""
+        from django.db.models import Prefetch
+        from django.db.models.functions import Substr
+
+        return queryset.select_related('user').only(
+            'id', 'slug', 'display_name', 'company_title', 'business_type',
+            'city', 'district', 'subdistrict',
+            'avg_rating', 'review_count', 'monthly_review_count',
+            'user__id', 'user__avatar', 'user__is_verified',
+        ).annotate(
+            about_excerpt=Substr('about', 1, cls.ABOUT_MAX_LENGTH),
+        ).prefetch_related(
+            Prefetch('service_areas', queryset=ServiceArea.objects.only('id', 'name')),
+            Prefetch('categories', queryset=Category.objects.only('id', 'name')),
+        )
+
+    def _avatar_url(self, obj):
+        return obj.user.avatar.url if obj.user.avatar else None
+
+    def get_avatar(self, obj):
+        return self._avatar_url(obj)
+
+    def get_user(self, obj):
+        return {
+            'id': obj.user.id,
+            'is_verified': obj.user.is_verified,
+            'avatar': self._avatar_url(obj),
+        }
+
+    def get_rating(self, obj):
+        return round(obj.avg_rating, 1) if obj.avg_rating else 0.0
+
+
 class AppointmentSerializer(serializers.ModelSerializer):
     vendor_display_name = serializers.CharField(source='vendor.display_name', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
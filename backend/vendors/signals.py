@@ -0,0 +1,248 @@
+"""
+Vendor sinyalleri
+Profil ve M2M ilişkileri değiştiğinde türetilmiş verileri (arama dokümanı, arama cache'i vb.) güncel tutar
+"""
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from core.models import CustomUser, ServiceArea, Category, CarBrand, Favorite
+
+from .models import VendorProfile, Review, Appointment, VendorView, VendorCall
+from .search import refresh_search_document, mark_search_index_stale
+from . import changelog, ratings, resolver, search_cache, stats
+from .autocomplete import mark_autocomplete_stale
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _safe_refresh(vendor_ids):
+    """Arama dokümanı güncellemesi best-effort; hata asıl kaydı etkilememeli"""
+    for vendor_id in vendor_ids:
+        try:
+            refresh_search_document(vendor_id)
+        except Exception as e:
+            logger.error(f"Search document refresh failed for vendor {vendor_id}: {e}")
+
+
+@receiver(pre_save, sender=VendorProfile)
+def vendor_profile_pre_save(sender, instance: VendorProfile, **kwargs):
+    """Şehir değişirse eski şehrin arama cache'i, ad değişirse öneri indeksi de güncellenmeli"""
+    instance._previous_state = None
+    if instance.pk:
+        instance._previous_state = VendorProfile.objects.filter(pk=instance.pk).values(
+            'city', 'district', 'display_name', 'slug'
+        ).first()
+
+
+@receiver(post_save, sender=VendorProfile)
+def vendor_profile_saved(sender, instance: VendorProfile, created: bool, **kwargs):
+    previous = getattr(instance, '_previous_state', None) or {}
+    _safe_refresh([instance.pk])
+    search_cache.invalidate_vendor(instance.pk, cities=[previous.get('city')])
+    changelog.publish_vendor_change(instance.pk)
+    resolver.invalidate(instance.pk, [previous.get('slug'), instance.slug])
+    if created or any(previous.get(field) != getattr(instance, field) for field in ('city', 'district', 'display_name', 'slug')):
+        mark_autocomplete_stale()
+
+
+@receiver(pre_delete, sender=VendorProfile)
+def vendor_profile_pre_delete(sender, instance: VendorProfile, **kwargs):
+    # M2M satırları vendor'dan önce silinir; kategorileri şimdiden sakla
+    instance._search_category_ids = list(instance.categories.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=VendorProfile)
+def vendor_profile_deleted(sender, instance: VendorProfile, **kwargs):
+    mark_search_index_stale()
+    search_cache.invalidate_vendor(
+        instance.pk,
+        cities=[instance.city],
+        category_ids=getattr(instance, '_search_category_ids', ()),
+    )
+    changelog.publish_vendor_change(instance.pk)
+    resolver.invalidate(instance.pk, [instance.slug])
+    mark_autocomplete_stale()
+
+
+@receiver(post_save, sender=CustomUser)
+def vendor_user_saved(sender, instance: CustomUser, **kwargs):
+    """Doğrulama/aktiflik aramada görünürlüğü, avatar ise kartı değiştirir"""
+    if instance.role != 'vendor':
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not {'is_verified', 'is_active', 'avatar'} & set(update_fields):
+        return  # örn. last_login güncellemesi
+    vendor = VendorProfile.objects.filter(user_id=instance.pk).values_list('id', 'slug').first()
+    if vendor:
+        vendor_id, slug = vendor
+        search_cache.invalidate_vendor(vendor_id)
+        changelog.publish_vendor_change(vendor_id)
+        if update_fields is None or {'is_verified', 'is_active'} & set(update_fields):
+            resolver.invalidate(vendor_id, [slug])
+            mark_autocomplete_stale()
+
+
+def vendor_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """service_areas / categories / car_brands M2M değişikliklerinde dokümanı yenile"""
+    if reverse and action == 'pre_clear':
+        # post_clear'da pk_set gelmez; ters yönde etkilenen vendor'ları önceden sakla
+        instance._search_cleared_vendor_ids = list(
+            sender.objects.filter(**{f'{instance._meta.model_name}_id': instance.pk}).values_list('vendorprofile_id', flat=True)
+        )
+        return
+    if not reverse and action == 'pre_clear' and sender is VendorProfile.categories.through:
+        instance._search_cleared_category_ids = list(instance.categories.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    is_category = sender is VendorProfile.categories.through
+    if not reverse:
+        _safe_refresh([instance.pk])
+        if is_category:
+            category_ids = getattr(instance, '_search_cleared_category_ids', ()) if action == 'post_clear' else (pk_set or ())
+        else:
+            category_ids = ()
+        search_cache.invalidate_vendor(instance.pk, category_ids=category_ids)
+        changelog.publish_vendor_change(instance.pk)
+        return
+    # Ters yön (örn. category.vendorprofile_set.add(...)): pk_set vendor ID'lerini içerir
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_search_cleared_vendor_ids', None)
+    if pk_set:
+        _safe_refresh(pk_set)
+        for vendor_id in pk_set:
+            search_cache.invalidate_vendor(vendor_id, category_ids=[instance.pk] if is_category else ())
+            changelog.publish_vendor_change(vendor_id)
+
+
+for through in (
+    VendorProfile.service_areas.through,
+    VendorProfile.categories.through,
+    VendorProfile.car_brands.through,
+):
+    m2m_changed.connect(vendor_relations_changed, sender=through, dispatch_uid=f'vendor_search_{through.__name__}')
+
+
+@receiver(post_save, sender=ServiceArea)
+def service_area_saved(sender, instance: ServiceArea, created: bool, **kwargs):
+    mark_autocomplete_stale()
+    if not created:
+        _safe_refresh(VendorProfile.objects.filter(service_areas=instance).values_list('id', flat=True))
+        search_cache.clear_search_cache()  # kartlardaki ad değişmiş olabilir
+        changelog.publish_vendor_change()
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance: Category, created: bool, **kwargs):
+    mark_autocomplete_stale()
+    if not created:
+        _safe_refresh(VendorProfile.objects.filter(categories=instance).values_list('id', flat=True))
+        search_cache.clear_search_cache()
+        changelog.publish_vendor_change()
+
+
+@receiver(post_save, sender=CarBrand)
+def car_brand_saved(sender, instance: CarBrand, created: bool, **kwargs):
+    mark_autocomplete_stale()
+    if not created:
+        _safe_refresh(VendorProfile.objects.filter(car_brands=instance).values_list('id', flat=True))
+        search_cache.clear_search_cache()
+        changelog.publish_vendor_change()
+
+
+@receiver(post_delete, sender=ServiceArea)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=CarBrand)
+def vendor_relation_deleted(sender, instance, **kwargs):
+    """Silinen ilişkinin M2M satırları sinyalsiz silinir; arama cache'i ve process içi indeksler baştan kurulmalı"""
+    search_cache.clear_search_cache()
+    changelog.publish_vendor_change()
+    mark_autocomplete_stale()
+
+
+# --- Değerlendirme istatistikleri ---
+@receiver(pre_save, sender=Review)
+def review_pre_save(sender, instance: Review, **kwargs):
+    """Düzenlemede eski vendor/puan değerlerini farkı hesaplamak için sakla"""
+    instance._previous_rating_state = None
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not {'rating', 'vendor'} & set(update_fields):
+        return  # örn. is_read güncellemesi; istatistik değişmez
+    if instance.pk:
+        instance._previous_rating_state = Review.objects.filter(pk=instance.pk).values('vendor_id', 'rating').first()
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance: Review, created: bool, **kwargs):
+    if created:
+        ratings.review_created(instance)
+        stats.apply_created(instance.vendor_id, instance.created_at, 'reviews')
+        search_cache.invalidate_vendor(instance.vendor_id)
+        return
+    previous = getattr(instance, '_previous_rating_state', None)
+    if previous:
+        ratings.review_updated(instance, previous['vendor_id'], previous['rating'])
+        # Puan değişimi sıralamayı değiştirir
+        search_cache.invalidate_vendor(instance.vendor_id)
+        if previous['vendor_id'] != instance.vendor_id:
+            stats.apply_deleted(previous['vendor_id'], instance.created_at, 'reviews')
+            stats.apply_created(instance.vendor_id, instance.created_at, 'reviews')
+            search_cache.invalidate_vendor(previous['vendor_id'])
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance: Review, **kwargs):
+    ratings.review_deleted(instance)
+    stats.apply_deleted(instance.vendor_id, instance.created_at, 'reviews')
+    search_cache.invalidate_vendor(instance.vendor_id)
+
+
+# --- Günlük dashboard özetleri ---
+@receiver(post_save, sender=VendorView)
+@receiver(post_save, sender=VendorCall)
+def vendor_event_saved(sender, instance, created: bool, **kwargs):
+    # Ham kayıtların silinmesi (saklama süresi) özetten düşülmez
+    if created:
+        stats.apply_daily_delta(instance.vendor_id, instance.day, 'views' if sender is VendorView else 'calls', 1)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_saved(sender, instance: Favorite, created: bool, **kwargs):
+    if created:
+        stats.apply_created(instance.vendor_id, instance.created_at, 'favorites')
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance: Favorite, **kwargs):
+    stats.apply_deleted(instance.vendor_id, instance.created_at, 'favorites')
+
+
+@receiver(pre_save, sender=Appointment)
+def appointment_pre_save(sender, instance: Appointment, **kwargs):
+    """Randevular randevu gününe sayılır; tarih veya vendor değişirse eski günden düşülmeli"""
+    instance._previous_stats_state = None
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not {'appointment_date', 'vendor'} & set(update_fields):
+        return  # örn. durum güncellemesi
+    if instance.pk:
+        instance._previous_stats_state = Appointment.objects.filter(pk=instance.pk).values(
+            'vendor_id', 'appointment_date'
+        ).first()
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance: Appointment, created: bool, **kwargs):
+    if created:
+        stats.apply_daily_delta(instance.vendor_id, instance.appointment_date, 'appointments', 1)
+        return
+    previous = getattr(instance, '_previous_stats_state', None)
+    if previous and (previous['vendor_id'], previous['appointment_date']) != (instance.vendor_id, instance.appointment_date):
+        stats.apply_daily_delta(previous['vendor_id'], previous['appointment_date'], 'appointments', -1)
+        stats.apply_daily_delta(instance.vendor_id, instance.appointment_date, 'appointments', 1)
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted(sender, instance: Appointment, **kwargs):
+    stats.apply_daily_delta(instance.vendor_id, instance.appointment_date, 'appointments', -1)
@@ -0,0 +1,387 @@
+"""
+Vendor dashboard'u için günlük özet tablosu (VendorDailyStats)
+Görüntüleme, arama, randevu, favori ve yorum sayıları ilgili kayıt oluştuğunda/silindiğinde
+sinyallerden tek bir atomik UPDATE ile artırılır. Mesajlar yoğun yazma yolunu yavaşlatmamak için
+Celery beat ile mesaj ID su seviyesinden (watermark) itibaren toplu işlenir.
+Tamamlanmış günler her gece kaynak tablolardan yeniden hesaplanır (uzlaştırma).
+
+Görüntüleme ve arama ham kayıtları saklama süresi dolunca silinir (bkz. vendors/compaction.py);
+bu yüzden silinmeleri özet tabloyu azaltmaz (özet kalıcı kayıttır) ve saklama süresinden eski
+günlerin görüntüleme/arama sayıları yeniden hesaplamada korunur.
+"""
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+from . import uniques
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('views', 'calls', 'messages', 'appointments', 'favorites', 'reviews')
+# Sadece vendors.events tarafından artırılan, kaynak tablosu olmayan sayaçlar (yeniden hesaplanmaz)
+EVENT_COUNTERS = ('gallery_opens', 'shares')
+DASHBOARD_METRICS = METRICS + EVENT_COUNTERS
+# Günü doğrudan bir tarih kolonunda tutan kaynaklar
+DAY_FIELDS = {'views': 'day', 'calls': 'day', 'appointments': 'appointment_date'}
+# Ham kayıtları saklama süresi dolunca silinen kaynaklar
+RAW_METRICS = ('views', 'calls')
+# Saklama süresi bundan kısa olamaz (gece uzlaştırması ve HLL kalıcılaştırması son günleri okur)
+MIN_RETENTION_DAYS = 7
+MESSAGE_WATERMARK_KEY = 'vendor_daily_stats:message_watermark'
+MESSAGE_ROLL_LOCK_KEY = 'vendor_daily_stats:message_roll_lock'
+MESSAGE_ROLL_LOCK_TIMEOUT = 600
+# Tek çalıştırmada işlenecek en fazla mesaj (kalan bir sonraki çalıştırmaya kalır)
+MESSAGE_BATCH_SIZE = 20000
+WRITE_BATCH_SIZE = 1000
+
+
+def raw_retention_start():
+    """
+    Ham görüntüleme/arama kayıtlarının saklandığı ilk gün; saklama kapalıysa None.
+    Bu günden eski özetler kalıcıdır, ham tablodan yeniden hesaplanmaz.
+    """
+    days = getattr(settings, 'VENDOR_EVENT_RETENTION_DAYS', 0)
+    if not days:
+        return None
+    return timezone.localdate() - timedelta(days=max(days, MIN_RETENTION_DAYS))
+
+
+def local_day(moment):
+    return timezone.localdate(moment) if moment is not None else None
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+# --- Artımlı güncelleme ---
+def apply_daily_delta(vendor_id, day, metric: str, delta: int = 1) -> None:
+    """
+    (vendor, gün) satırındaki sayaca delta ekle; satır yoksa oluştur.
+    UPDATE sağ tarafı satırın güncel değerini okuduğundan eşzamanlı yazmalarda da tutarlıdır.
+    """
+    from .models import VendorDailyStats
+
+    if not vendor_id or day is None or not delta:
+        return
+    queryset = VendorDailyStats.objects.filter(vendor_id=vendor_id, day=day)
+    change = {metric: Greatest(F(metric) + delta, 0)}
+    if queryset.update(**change) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            VendorDailyStats.objects.create(vendor_id=vendor_id, day=day, **{metric: delta})
+    except IntegrityError:
+        # Aynı anda başka bir istek satırı oluşturdu
+        queryset.update(**change)
+
+
+def apply_created(vendor_id, moment, metric: str) -> None:
+    apply_daily_delta(vendor_id, local_day(moment), metric, 1)
+
+
+def apply_deleted(vendor_id, moment, metric: str) -> None:
+    apply_daily_delta(vendor_id, local_day(moment), metric, -1)
+
+
+# --- Kaynak tablolardan sayım ---
+def _grouped(queryset, vendor_field: str = 'vendor_id', date_field: str = 'created_at', truncate: bool = True):
+    """(vendor_id, gün) -> sayı"""
+    day = TruncDate(date_field) if truncate else F(date_field)
+    rows = (
+        queryset.order_by()
+        .annotate(stat_vendor=F(vendor_field), stat_day=day)
+        .values('stat_vendor', 'stat_day')
+        .annotate(total=Count('pk'))
+        .values_list('stat_vendor', 'stat_day', 'total')
+    )
+    return {(vendor_id, day): total for vendor_id, day, total in rows.iterator() if vendor_id is not None}
+
+
+def _message_counts(queryset, vendor_ids=None) -> Dict[Tuple[int, object], int]:
+    """Mesajlar konuşmanın vendor olan her iki tarafına da sayılır"""
+    counts = defaultdict(int)
+    for side in ('user1', 'user2'):
+        vendor_field = f'conversation__{side}__vendor_profile__id'
+        if vendor_ids is None:
+            side_qs = queryset.filter(**{f'{vendor_field}__isnull': False})
+        else:
+            side_qs = queryset.filter(**{f'{vendor_field}__in': vendor_ids})
+        for key, total in _grouped(side_qs, vendor_field).items():
+            counts[key] += total
+    return counts
+
+
+def _window(queryset, field: str, start, end):
+    if start is not None:
+        queryset = queryset.filter(**{f'{field}__gte': start})
+    if end is not None:
+        queryset = queryset.filter(**{f'{field}__lt': end})
+    return queryset
+
+
+def count_metric(metric: str, start_day, end_day, vendor_ids, message_upper_id=None):
+    """
+    Kaynak tablodan {(vendor_id, gün): sayı}; [start_day, end_day) aralığı, vendor_ids None ise tümü.
+    Mesajlarda message_upper_id verilirse bu ID'ye kadar olanlar sayılır.
+    """
+    from core.models import Favorite
+    from chat.models import Message
+    from .models import VendorView, VendorCall, Appointment, Review
+
+    start = _day_start(start_day) if start_day else None
+    end = _day_start(end_day) if end_day else None
+    if metric == 'messages':
+        queryset = _window(Message.objects.all(), 'created_at', start, end)
+        if message_upper_id is not None:
+            queryset = queryset.filter(id__lte=message_upper_id)
+        return _message_counts(queryset, vendor_ids)
+    if metric in DAY_FIELDS:
+        # Gün kolonu olan tablolar: (vendor, gün) indeksinde aralık taraması
+        model, date_field = {'views': VendorView, 'calls': VendorCall, 'appointments': Appointment}[metric], DAY_FIELDS[metric]
+        queryset = _window(model.objects.all(), date_field, start_day, end_day)
+        truncate = False
+    else:
+        model = {'favorites': Favorite, 'reviews': Review}[metric]
+        queryset = _window(model.objects.all(), 'created_at', start, end)
+        truncate = True
+        date_field = 'created_at'
+    if vendor_ids is not None:
+        queryset = queryset.filter(vendor_id__in=vendor_ids)
+    return _grouped(queryset, date_field=date_field, truncate=truncate)
+
+
+def _write(metrics, counts: Dict[str, Dict], start_day, end_day, vendor_ids) -> int:
+    """Penceredeki satırları hesaplanan değerlerle yaz; kaynağı kalmamış satırlar sıfırlanır"""
+    from .models import VendorDailyStats
+
+    existing = VendorDailyStats.objects.all()
+    if start_day is not None:
+        existing = existing.filter(day__gte=start_day)
+    if end_day is not None:
+        existing = existing.filter(day__lt=end_day)
+    if vendor_ids is not None:
+        existing = existing.filter(vendor_id__in=vendor_ids)
+    keys = set(existing.values_list('vendor_id', 'day').iterator())
+    for metric_counts in counts.values():
+        keys.update(metric_counts)
+    rows = [
+        VendorDailyStats(
+            vendor_id=vendor_id,
+            day=day,
+            **{metric: counts[metric].get((vendor_id, day), 0) for metric in metrics},
+        )
+        for vendor_id, day in keys
+    ]
+    VendorDailyStats.objects.bulk_create(
+        rows,
+        batch_size=WRITE_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['vendor', 'day'],
+        update_fields=list(metrics),
+    )
+    return len(rows)
+
+
+def rebuild_daily_stats(start_day=None, end_day=None, vendor_ids: Optional[Iterable[int]] = None, metrics=METRICS) -> int:
+    """
+    [start_day, end_day) aralığındaki günlük özetleri kaynak tablolardan yeniden hesapla
+    (None sınırsız demektir). Bugünü kapsayan mesaj sayımı su seviyesiyle hizalanır ki
+    beat görevi aynı mesajları ikinci kez saymasın. Görüntüleme/arama sayıları saklama
+    süresi içindeki günlerle sınırlanır; ham kaydı silinmiş günler sıfırlanmaz.
+    """
+    metrics = tuple(metrics)
+    boundary = raw_retention_start()
+    raw = tuple(metric for metric in metrics if metric in RAW_METRICS)
+    if boundary is None or not raw or (start_day is not None and start_day >= boundary):
+        return _rebuild(start_day, end_day, vendor_ids, metrics)
+    written = 0
+    others = tuple(metric for metric in metrics if metric not in RAW_METRICS)
+    if others:
+        written += _rebuild(start_day, end_day, vendor_ids, others)
+    if end_day is None or end_day > boundary:
+        written += _rebuild(boundary, end_day, vendor_ids, raw)
+    return written
+
+
+def _rebuild(start_day, end_day, vendor_ids, metrics) -> int:
+    from chat.models import Message
+
+    if not uniques.view_rows_stored():
+        # Görüntüleme satırı saklanmıyor; sayı HLL'den gelir, ham tablodan sıfırlanmamalı
+        metrics = tuple(metric for metric in metrics if metric != 'views')
+    if not metrics:
+        return 0
+    if vendor_ids is not None:
+        vendor_ids = set(vendor_ids)
+    today = timezone.localdate()
+    covers_today = end_day is None or end_day > today
+    message_upper_id = None
+    if 'messages' in metrics and covers_today:
+        watermark = cache.get(MESSAGE_WATERMARK_KEY)
+        if vendor_ids is None or watermark is None:
+            message_upper_id = Message.objects.aggregate(latest=Max('id'))['latest'] or 0
+        else:
+            message_upper_id = watermark
+
+    with transaction.atomic():
+        counts = {
+            metric: count_metric(metric, start_day, end_day, vendor_ids, message_upper_id)
+            for metric in metrics
+        }
+        written = _write(metrics, counts, start_day, end_day, vendor_ids)
+
+    if message_upper_id is not None and vendor_ids is None:
+        cache.set(MESSAGE_WATERMARK_KEY, message_upper_id, timeout=None)
+    return written
+
+
+def earliest_source_day():
+    """Kaynak tablolardaki en eski gün (geri doldurma başlangıcı); kayıt yoksa None"""
+    from core.models import Favorite
+    from chat.models import Message
+    from .models import VendorView, VendorCall, Appointment, Review
+
+    days = [
+        local_day(model.objects.aggregate(first=Min('created_at'))['first'])
+        for model in (Message, Favorite, Review)
+    ]
+    for model, field in ((VendorView, 'day'), (VendorCall, 'day'), (Appointment, 'appointment_date')):
+        days.append(model.objects.aggregate(first=Min(field))['first'])
+    days = [day for day in days if day is not None]
+    return min(days) if days else None
+
+
+# --- Periyodik görevler ---
+def roll_message_stats() -> dict:
+    """
+    Su seviyesinden sonraki mesajların dokunduğu (vendor, gün) sayılarını yeniden hesapla
+    Aynı anda tek çalıştırma olur (beat tekrarı / yavaş çalıştırma). Sayılar delta olarak
+    eklenmez, su seviyesine kadar kaynaktan yeniden sayılır: su seviyesi yazılmadan ölen
+    bir çalıştırmanın tekrarı aynı mesajları ikinci kez eklemez.
+    """
+    token = uuid.uuid4().hex
+    if not cache.add(MESSAGE_ROLL_LOCK_KEY, token, timeout=MESSAGE_ROLL_LOCK_TIMEOUT):
+        return {'skipped': 'locked'}
+    try:
+        return _roll_messages()
+    finally:
+        # Süresi dolup başka çalıştırmaya geçmiş kilit silinmez
+        if cache.get(MESSAGE_ROLL_LOCK_KEY) == token:
+            cache.delete(MESSAGE_ROLL_LOCK_KEY)
+
+
+def _roll_messages() -> dict:
+    from chat.models import Message
+    from .models import VendorDailyStats
+
+    watermark = cache.get(MESSAGE_WATERMARK_KEY)
+    if watermark is None:
+        # Su seviyesi kayıp (ilk çalıştırma / cache temizlendi): bugünü baştan hesapla
+        today = timezone.localdate()
+        rebuild_daily_stats(today, today + timedelta(days=1), metrics=('messages',))
+        return {'processed': 0, 'rebuilt_today': True}
+
+    latest = Message.objects.aggregate(latest=Max('id'))['latest'] or 0
+    if latest <= watermark:
+        return {'processed': 0, 'watermark': watermark}
+    upper = min(latest, watermark + MESSAGE_BATCH_SIZE)
+    vendors_by_day = defaultdict(set)
+    for vendor_id, day in _message_counts(Message.objects.filter(id__gt=watermark, id__lte=upper)):
+        vendors_by_day[day].add(vendor_id)
+    rows = []
+    with transaction.atomic():
+        for day, vendor_ids in vendors_by_day.items():
+            totals = count_metric('messages', day, day + timedelta(days=1), vendor_ids, upper)
+            rows.extend(
+                VendorDailyStats(vendor_id=vendor_id, day=day, messages=totals.get((vendor_id, day), 0))
+                for vendor_id in vendor_ids
+            )
+        VendorDailyStats.objects.bulk_create(
+            rows,
+            batch_size=WRITE_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['vendor', 'day'],
+            update_fields=['messages'],
+        )
+    cache.set(MESSAGE_WATERMARK_KEY, upper, timeout=None)
+    return {'processed': upper - watermark, 'watermark': upper, 'recounted': len(rows)}
+
+
+def reconcile_recent_days(days: int = 2) -> int:
+    """
+    Tamamlanmış son günleri kaynak tablolardan düzelt (toplu silme, update() gibi sinyalsiz
+    değişiklikler ve silinen konuşmalar). Bugün hariçtir; yeni kayıtlar geçmiş güne düşmez.
+    """
+    today = timezone.localdate()
+    return rebuild_daily_stats(today - timedelta(days=days), today)
+
+
+# --- Dashboard ---
+def month_range(day) -> Tuple[date, date]:
+    """Günün ayı için [başlangıç, sonraki ay başlangıcı)"""
+    start = day.replace(day=1)
+    return start, (start + timedelta(days=32)).replace(day=1)
+
+
+def month_starts(today, months: int):
+    """Son `months` ayın başlangıç günleri (eskiden yeniye) ve bir sonraki ay başlangıcı"""
+    starts = []
+    year, month = today.year, today.month
+    for _ in range(months):
+        starts.append(today.replace(year=year, month=month, day=1))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    starts.reverse()
+    return starts, month_range(today)[1]
+
+
+def dashboard_summary(vendor, months: int = 12) -> dict:
+    """
+    Dashboard sayıları tek aralık sorgusuyla (en fazla ~366 satır) ve tüm zamanlar toplamı
+    için tek aggregate sorgusuyla hesaplanır; tekil ziyaretçiler Redis HLL'lerinden okunur.
+    """
+    from .models import VendorDailyStats
+
+    today = timezone.localdate()
+    starts, next_start = month_starts(today, months)
+    rows = VendorDailyStats.objects.filter(
+        vendor=vendor, day__gte=starts[0], day__lt=next_start
+    ).values_list('day', 'unique_visitors', *DASHBOARD_METRICS)
+
+    month_index = {(start.year, start.month): i for i, start in enumerate(starts)}
+    series = {metric: [0] * months for metric in DASHBOARD_METRICS}
+    persisted_uniques = [0] * months
+    today_row = dict.fromkeys(DASHBOARD_METRICS, 0)
+    for day, unique_visitors, *values in rows:
+        i = month_index[(day.year, day.month)]
+        persisted_uniques[i] += unique_visitors
+        for metric, value in zip(DASHBOARD_METRICS, values):
+            series[metric][i] += value
+        if day == today:
+            today_row = dict(zip(DASHBOARD_METRICS, values))
+
+    # Aylık tekiller ay HLL'lerinden; Redis'te olmayan aylar için günlük değerlerin toplamı (üst sınır)
+    live_uniques = uniques.count_months(vendor.pk, starts) or [0] * months
+    series['unique_visitors'] = [live or persisted for live, persisted in zip(live_uniques, persisted_uniques)]
+    week_uniques = uniques.count_range(vendor.pk, today - timedelta(days=6), today + timedelta(days=1))
+
+    totals = VendorDailyStats.objects.filter(vendor=vendor).aggregate(
+        messages=Sum('messages'), favorites=Sum('favorites')
+    )
+    return {
+        'series': series,
+        'month': {metric: values[-1] for metric, values in series.items()},
+        'today': today_row,
+        'week': {'unique_visitors': week_uniques or 0},
+        'totals': {metric: total or 0 for metric, total in totals.items()},
+    }
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from celery import shared_task
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='vendors.roll_monthly_review_counts')
+def roll_monthly_review_counts() -> dict:
+    """Recompute VendorProfile.monthly_review_count for the new month window.
+
+    Runs daily via Celery Beat. Review signals keep the counter current during
+    the month; this job moves the window on the first run of a new month and
+    otherwise corrects any drift, so a missed run costs at most one day.
+    """
+    from .ratings import roll_monthly_review_counts as roll
+
+    updated = roll()
+    summary = {'updated': updated}
+    logger.info("[vendors] monthly review window rolled: %s", summary)
+    return summary
+
+
+@shared_task(name='vendors.roll_message_stats')
+def roll_message_stats() -> dict:
+    """Recount VendorDailyStats messages for days touched since the last run.
+
+    Runs every minute via Celery Beat. Messages are counted from an ID
+    watermark instead of a signal so the chat write path stays a single INSERT.
+    Overlapping runs are skipped and replays are idempotent.
+    """
+    from .stats import roll_message_stats as roll
+
+    summary = roll()
+    logger.debug("[vendors] message stats rolled: %s", summary)
+    return summary
+
+
+@shared_task(name='vendors.reconcile_daily_stats')
+def reconcile_daily_stats(days: int = 2) -> dict:
+    """Recompute the last completed days of VendorDailyStats from source tables.
+
+    Repairs drift from changes that bypass signals (bulk deletes, queryset
+    updates, deleted conversations).
+    """
+    from .stats import reconcile_recent_days
+
+    summary = {'rows': reconcile_recent_days(days)}
+    logger.info("[vendors] daily stats reconciled: %s", summary)
+    return summary
+
+
+@shared_task(name='vendors.drain_vendor_events')
+def drain_vendor_events() -> dict:
+    """Write buffered profile view / call events from Redis to the database.
+
+    Scheduled every few seconds via Celery Beat and also triggered by the
+    request path when the queue grows past DRAIN_TRIGGER_LENGTH.
+    """
+    from .events import drain
+
+    summary = drain()
+    if summary.get('events'):
+        logger.info("[vendors] analytics events drained: %s", summary)
+    return summary
+
+
+@shared_task(name='vendors.persist_unique_visitors')
+def persist_unique_visitors(days: int = 2) -> dict:
+    """Persist per-vendor daily HyperLogLog cardinalities to VendorDailyStats.
+
+    Runs nightly via Celery Beat for the last completed days; rerunning is
+    harmless because the values are overwritten.
+    """
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from .uniques import persist_day
+
+    today = timezone.localdate()
+    summary = {
+        str(day): persist_day(day)
+        for day in (today - timedelta(days=offset) for offset in range(1, days + 1))
+    }
+    logger.info("[vendors] unique visitors persisted: %s", summary)
+    return summary
+
+
+@shared_task(name='vendors.compact_vendor_events')
+def compact_vendor_events() -> dict:
+    """Fold raw VendorView/VendorCall rows past the retention window into VendorDailyStats and delete them.
+
+    Runs nightly via Celery Beat; does nothing unless VENDOR_EVENT_RETENTION_DAYS is set.
+    Deletes happen in primary-key range chunks and resume on the next run if capped.
+    """
+    from .compaction import compact
+
+    summary = compact()
+    logger.info("[vendors] raw analytics rows compacted: %s", summary)
+    return summary
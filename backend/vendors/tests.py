@@ -1,3 +1,476 @@
-from django.test import TestCase
+import base64
+import datetime
+import json
+import math
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from core.models import Category, CustomUser, ServiceArea
+from core.testing import RedisTestMixin
+
+from . import events, nearest
+from .geo import EARTH_RADIUS_KM, bounding_box, haversine_distance_km, within_radius_prefilter
+from .models import Review, VendorCall, VendorDailyStats, VendorProfile, VendorView
+from .ratings import current_month_window, rebuild_rating_aggregates, roll_monthly_review_counts
+from .search import InvertedSearchIndex, compose_search_document, tokenize, turkish_fold
+from .serializers import VendorSearchCardSerializer
+from .stats import apply_daily_delta, dashboard_summary, month_range, month_starts, rebuild_daily_stats
+from .views import VENDOR_SEARCH_ORDERING
+
+
+def make_vendor(index, **fields):
+    user = CustomUser.objects.create_user(
+        username=f'vendor-{index}@example.com', email=f'vendor-{index}@example.com', password='x',
+        role='vendor', is_verified=True, is_active=True,
+    )
+    defaults = dict(
+        business_type='esnaf', company_title=f'Şirket {index}', tax_office='t', tax_no='1',
+        display_name=f'Usta {index}', about='Oto tamir ve bakım', business_phone='1', address='a',
+        city='İstanbul', district='Kadıköy', subdistrict='s',
+        manager_birthdate=datetime.date(1990, 1, 1), manager_tc='12345678901',
+    )
+    defaults.update(fields)
+    return VendorProfile.objects.create(user=user, **defaults)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class VendorSearchQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        service_area = ServiceArea.objects.create(name='Mekanik')
+        category = Category.objects.create(name='Egzoz Tamiri', service_area=service_area)
+        for i in range(12):
+            vendor = make_vendor(i)
+            vendor.service_areas.set([service_area])
+            vendor.categories.set([category])
+
+    def setUp(self):
+        cache.clear()
+
+    def _assert_page_queries(self, expected, **params):
+        # Sayfa boyutundan bağımsız: satır başına sorgu yok
+        for page_size in (3, 12):
+            with self.subTest(page_size=page_size, **params):
+                cache.clear()
+                with self.assertNumQueries(expected):
+                    response = self.client.get('/api/v1/vendors/search/', {'page_size': page_size, **params})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['results']), page_size)
+
+    def test_search_page_query_count_is_constant(self):
+        self._assert_page_queries(VendorSearchCardSerializer.QUERIES_PER_PAGE)
+
+    def test_filtered_search_adds_one_lookup_query(self):
+        # Hizmet alanı filtresi önce ServiceArea'yı tek sorguyla çözer
+        self._assert_page_queries(VendorSearchCardSerializer.QUERIES_PER_PAGE + 1, service='Mekanik')
+
+
+class NearbyVendorsValidationTests(TestCase):
+    def test_non_finite_or_negative_radius_is_rejected(self):
+        for radius in ('inf', '-inf', 'nan', '-5'):
+            with self.subTest(radius=radius):
+                response = self.client.get(
+                    '/api/v1/vendors/nearby/', {'latitude': 41.0, 'longitude': 29.0, 'radius': radius}
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_non_finite_coordinates_are_rejected(self):
+        response = self.client.get('/api/v1/vendors/nearby/', {'latitude': 'nan', 'longitude': 29.0})
+        self.assertEqual(response.status_code, 400)
+
+
+class RadiusPrefilterBoundaryTests(TestCase):
+    CENTER = (41.0, 29.0)
+    RADIUS_KM = 50.0
+    DISTANCE_KM = 49.97
+
+    def _inside_points(self):
+        lat0, lng0 = self.CENTER
+        angular = self.DISTANCE_KM / EARTH_RADIUS_KM
+        north = (lat0 + math.degrees(angular), lng0)
+        # Boylam açıklığının en büyük olduğu teğet nokta (dairenin doğu ucu)
+        east = (
+            math.degrees(math.asin(math.sin(math.radians(lat0)) / math.cos(angular))),
+            lng0 + math.degrees(math.asin(math.sin(angular) / math.cos(math.radians(lat0)))),
+        )
+        return {'north': north, 'east': east}
+
+    def test_box_contains_points_just_inside_radius(self):
+        min_lat, max_lat, min_lng, max_lng = bounding_box(*self.CENTER, self.RADIUS_KM)
+        for name, (lat, lng) in self._inside_points().items():
+            with self.subTest(name):
+                self.assertTrue(min_lat <= lat <= max_lat and min_lng <= lng <= max_lng)
+
+    def test_prefilter_keeps_vendors_just_inside_radius(self):
+        points = self._inside_points()
+        for index, (lat, lng) in enumerate(points.values()):
+            make_vendor(index, latitude=Decimal(f'{lat:.6f}'), longitude=Decimal(f'{lng:.6f}'))
+        queryset = within_radius_prefilter(VendorProfile.objects.all(), *self.CENTER, self.RADIUS_KM)
+        within = queryset.annotate(distance=haversine_distance_km(*self.CENTER)).filter(distance__lte=self.RADIUS_KM)
+        self.assertEqual(within.count(), len(points))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class RatingAggregateDeltaTests(TestCase):
+    def setUp(self):
+        self.vendor, self.other = make_vendor(0), make_vendor(1)
+        self.client_user = CustomUser.objects.create_user(
+            username='client@example.com', email='client@example.com', password='x', role='client',
+        )
+
+    def _review(self, vendor, rating):
+        return Review.objects.create(
+            vendor=vendor, user=self.client_user, rating=rating, comment='c', service_date=datetime.date(2024, 1, 1),
+        )
+
+    def _stats(self, vendor):
+        return VendorProfile.objects.filter(pk=vendor.pk).values_list(
+            'review_count', 'rating_sum', 'avg_rating', 'monthly_review_count'
+        ).get()
+
+    def _assert_matches_rebuild(self):
+        incremental = {vendor.pk: self._stats(vendor) for vendor in (self.vendor, self.other)}
+        rebuild_rating_aggregates()
+        self.assertEqual(incremental, {vendor.pk: self._stats(vendor) for vendor in (self.vendor, self.other)})
+
+    def test_create_edit_move_and_delete(self):
+        first, second = self._review(self.vendor, 4), self._review(self.vendor, 2)
+        self.assertEqual(self._stats(self.vendor), (2, 6, 3.0, 2))
+        self._assert_matches_rebuild()
+
+        first.rating = 5
+        first.save()
+        self.assertEqual(self._stats(self.vendor), (2, 7, 3.5, 2))
+        self._assert_matches_rebuild()
+
+        second.vendor = self.other
+        second.save()
+        self.assertEqual(self._stats(self.vendor), (1, 5, 5.0, 1))
+        self.assertEqual(self._stats(self.other), (1, 2, 2.0, 1))
+        self._assert_matches_rebuild()
+
+        first.delete()
+        self.assertEqual(self._stats(self.vendor), (0, 0, 0.0, 0))
+        self._assert_matches_rebuild()
+
+    def test_roll_drops_reviews_from_previous_month(self):
+        review = self._review(self.vendor, 3)
+        month_start, _ = current_month_window()
+        Review.objects.filter(pk=review.pk).update(created_at=month_start - datetime.timedelta(days=1))
+        self.assertEqual(self._stats(self.vendor)[3], 1)
+        roll_monthly_review_counts()
+        self.assertEqual(self._stats(self.vendor), (1, 3, 3.0, 0))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SearchCacheInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.vendor = make_vendor(0)
+
+    def _search(self, **params):
+        response = self.client.get('/api/v1/vendors/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_partial_city_search_sees_vendor_moving_in(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vendor.city = 'Ankara'
+            self.vendor.save()
+        self.assertEqual(self._search(city='stanb').json()['results'], [])
+        self.assertEqual(self._search(city='stanb')['X-Search-Cache'], 'HIT')
+
+        # Önbellekteki boş sayfada İstanbul tag'i yok; kapsam tag'i geçersiz kılmalı
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vendor.city = 'İstanbul'
+            self.vendor.save()
+
+        response = self._search(city='stanb')
+        self.assertEqual(response['X-Search-Cache'], 'MISS')
+        self.assertEqual([item['id'] for item in response.json()['results']], [self.vendor.id])
+
+
+def encode_cursor_token(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class VendorSearchCursorPaginationTests(TestCase):
+    # (monthly_review_count, avg_rating, review_count): avg_rating ve review_count'ta bol eşitlik
+    STATS = [(0, 4.5, 2), (1, 4.5, 2), (0, 4.5, 2), (0, 4.5, 3), (1, 3.0, 2),
+             (0, 0.0, 0), (0, 4.5, 2), (1, 4.5, 2), (0, 0.0, 0), (2, 5.0, 1), (0, 4.5, 3)]
+
+    @classmethod
+    def setUpTestData(cls):
+        for index, (monthly, rating, reviews) in enumerate(cls.STATS):
+            vendor = make_vendor(index)
+            VendorProfile.objects.filter(pk=vendor.pk).update(
+                monthly_review_count=monthly, avg_rating=rating, review_count=reviews, rating_sum=int(rating * reviews),
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def _get(self, **params):
+        return self.client.get('/api/v1/vendors/search/', params)
+
+    def test_walks_all_pages_without_duplicates_or_gaps(self):
+        expected = list(VendorProfile.objects.order_by(*VENDOR_SEARCH_ORDERING).values_list('id', flat=True))
+        seen = []
+        params = {'pagination': 'cursor', 'page_size': 3}
+        for _ in range(len(expected)):
+            body = self._get(**params).json()
+            seen.extend(item['id'] for item in body['results'])
+            if body['next_cursor'] is None:
+                break
+            params = {'cursor': body['next_cursor'], 'page_size': 3}
+        self.assertEqual(seen, expected)
+
+    def test_malformed_cursor_returns_404(self):
+        for token in ('!!!', 'e30', encode_cursor_token([1, 2, 3]), encode_cursor_token('1234'),
+                      encode_cursor_token({'1': 0, '2': 0, '3': 0, '4': 0}), encode_cursor_token([1, 'x', 2, 3])):
+            with self.subTest(token=token):
+                self.assertEqual(self._get(cursor=token).status_code, 404)
+
+    def test_count_only_when_requested(self):
+        self.assertNotIn('count', self._get(pagination='cursor').json())
+        self.assertEqual(self._get(pagination='cursor', count=1).json()['count'], len(self.STATS))
+
+
+class TurkishFoldTests(SimpleTestCase):
+    def test_fold_maps_turkish_letters(self):
+        cases = {
+            'İSTANBUL': 'istanbul', 'IĞDIR': 'igdir', 'Şişli': 'sisli', 'Ağrı': 'agri',
+            'Çeşme Gölü': 'cesme golu', 'Üsküdar': 'uskudar', 'i̇zmir': 'izmir', '': '', None: '',
+        }
+        for value, expected in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(turkish_fold(value), expected)
+
+    def test_tokenize_splits_folded_text(self):
+        self.assertEqual(tokenize('Oto-Tamir İŞ 24/7, ılık'), ['oto', 'tamir', 'is', '24', '7', 'ilik'])
+        self.assertEqual(compose_search_document(['Usta İbrahim', None, 'Kadıköy']), 'usta ibrahim kadikoy')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class InvertedSearchIndexTests(TestCase):
+    DOCUMENTS = ['istanbul kadikoy egzoz', 'ankara cankaya fren', 'abcdbcab istanbul', 'izmir egzoz fren balata']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ids = []
+        for index, document in enumerate(cls.DOCUMENTS):
+            vendor = make_vendor(index)
+            VendorProfile.objects.filter(pk=vendor.pk).update(search_document=document)
+            cls.ids.append(vendor.pk)
+
+    def setUp(self):
+        cache.clear()
+        self.index = InvertedSearchIndex()
+
+    def _expected(self, tokens):
+        return {
+            vendor_id for vendor_id, document in zip(self.ids, self.DOCUMENTS)
+            if all(any(token in word for word in document.split()) for token in tokens)
+        }
+
+    def test_short_grams(self):
+        for token in ('e', 'eg', 'ank', 'zz', 'q'):
+            with self.subTest(token=token):
+                self.assertEqual(self.index.search([token]), self._expected([token]))
+
+    def test_trigram_candidates_are_verified(self):
+        # abc, bca ve cab trigramlarının hepsi abcdbcab'da var ama abcab alt dize değil
+        self.assertEqual(self.index.search(['abcab']), set())
+        self.assertEqual(self.index.search(['dbcab']), {self.ids[2]})
+        self.assertEqual(self.index.search(['tanbu']), {self.ids[0], self.ids[2]})
+        # Token sınırı aşılmaz
+        self.assertEqual(self.index.search(['bulkad']), set())
+
+    def test_all_tokens_must_match(self):
+        self.assertEqual(self.index.search(['egz', 'fren']), {self.ids[3]})
+        self.assertEqual(self.index.search(['istanbul', 'fren']), set())
+
+    def test_matches_brute_force(self):
+        words = {word for document in self.DOCUMENTS for word in document.split()}
+        queries = {word[i:j] for word in words for i in range(len(word)) for j in range(i + 1, len(word) + 1)}
+        for token in sorted(queries):
+            self.assertEqual(self.index.search([token]), self._expected([token]), token)
+
+
+@mock.patch('vendors.uniques.record_visits')
+class AnalyticsBeaconTests(TestCase):
+    url = '/api/v1/vendors/analytics/events/'
+
+    def setUp(self):
+        self.vendor = make_vendor(0)
+
+    def _post(self, body, content_type='application/json'):
+        return self.client.post(self.url, body, content_type=content_type)
+
+    def test_malformed_body_is_rejected(self, _record):
+        for body in ('{"events": [', '"events"', '{"events": {"type": "view"}}', '42'):
+            with self.subTest(body=body):
+                self.assertEqual(self._post(body).status_code, 400)
+        self.assertFalse(VendorView.objects.exists())
+
+    def test_unknown_and_invalid_events_are_rejected(self, _record):
+        slug = self.vendor.slug
+        response = self._post(json.dumps({'events': [
+            {'type': 'view', 'slug': slug},
+            {'type': 'gallery_open', 'slug': slug},
+            {'type': 'purchase', 'slug': slug},
+            {'type': 'view'},
+            {'type': 'view', 'slug': 42},
+            'view',
+            {'type': 'share', 'slug': 'no-such-vendor'},
+        ]}))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'accepted': 3, 'rejected': 4})
+        stats = VendorDailyStats.objects.get(vendor=self.vendor)
+        self.assertEqual((stats.views, stats.gallery_opens, stats.shares), (1, 1, 0))
+
+    def test_plain_text_beacon_body_is_accepted(self, _record):
+        # navigator.sendBeacon dizeyi text/plain olarak gönderir
+        response = self._post(json.dumps([{'type': 'share', 'slug': self.vendor.slug}]), 'text/plain')
+        self.assertEqual(response.json(), {'accepted': 1, 'rejected': 0})
+
+
+@override_settings(
+    VENDOR_EVENTS_BUFFERED=True,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class VendorEventQueueTests(RedisTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.vendor = make_vendor(0)
+        slug = self.vendor.slug
+        self.payloads = [
+            events.build_event(events.EVENT_VIEW, slug, ip='a', ua='b'),
+            events.build_event(events.EVENT_VIEW, slug, ip='a', ua='b'),
+            events.build_event(events.EVENT_GALLERY_OPEN, slug),
+            events.build_event(events.EVENT_SHARE, slug),
+            events.build_event(events.EVENT_CALL, slug, ip='a', phone='555'),
+        ]
+
+    def _stats(self):
+        stats = VendorDailyStats.objects.filter(vendor=self.vendor).first()
+        if stats is None:
+            return None
+        return stats.views, stats.calls, stats.gallery_opens, stats.shares
+
+    def test_drain_writes_rows_and_counts_invalid_events(self):
+        events.enqueue_many(self.payloads)
+        self.redis.rpush(events.QUEUE_KEY, b'not json', json.dumps({'type': 'purchase', 'slug': 'x', 'day': '2024-01-01'}))
+        summary = events.drain(batch_size=3)
+        self.assertEqual((summary['events'], summary['remaining']), (7, 0))
+        self.assertEqual(self._stats(), (1, 1, 1, 1))
+        self.assertEqual(VendorView.objects.count(), 1)
+        self.assertEqual(events.queue_stats()['invalid'], '2')
+
+    def test_batch_failing_partway_is_retried_once(self):
+        events.enqueue_many(self.payloads)
+        calls = []
+
+        def fail_on_second(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError('db down')
+            return apply_daily_delta(*args, **kwargs)
+
+        with mock.patch('vendors.stats.apply_daily_delta', side_effect=fail_on_second):
+            with self.assertRaises(RuntimeError):
+                events.drain()
+        # Parti geri alındı: yarım yazılmış sayaç veya satır yok, olaylar işleme listesinde
+        self.assertIsNone(self._stats())
+        self.assertFalse(VendorView.objects.exists())
+        self.assertEqual(self.redis.llen(events.QUEUE_KEY), 0)
+        (processing_key,) = self.redis.hkeys(events.PROCESSING_REGISTRY_KEY)
+        self.assertEqual(self.redis.llen(processing_key), len(self.payloads))
+
+        # Sahibi ölmüş sayılacak kadar eski işleme listesi sonraki çalıştırmada geri konur
+        self.redis.hset(events.PROCESSING_REGISTRY_KEY, processing_key, 0)
+        summary = events.drain()
+        self.assertEqual((summary['requeued'], summary['events']), (len(self.payloads), len(self.payloads)))
+        self.assertEqual(self._stats(), (1, 1, 1, 1))
+        self.assertEqual(self.redis.hlen(events.PROCESSING_REGISTRY_KEY), 0)
+        self.assertFalse(self.redis.exists(processing_key))
+
+        # Kuyruk boş; tekrar boşaltma hiçbir şeyi iki kez saymaz
+        self.assertEqual(events.drain()['events'], 0)
+        self.assertEqual(self._stats(), (1, 1, 1, 1))
+
+    def test_drain_is_skipped_while_locked(self):
+        events.enqueue_many(self.payloads)
+        self.redis.set(events.DRAIN_LOCK_KEY, 'other')
+        self.assertEqual(events.drain(), {'skipped': 'locked'})
+        self.assertEqual(self.redis.llen(events.QUEUE_KEY), len(self.payloads))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+@mock.patch('vendors.uniques.count_range', return_value=None)
+@mock.patch('vendors.uniques.count_months', return_value=None)
+class DashboardRollupTests(TestCase):
+    def setUp(self):
+        self.vendor, self.other = make_vendor(0), make_vendor(1)
+        today = timezone.localdate()
+        self.days = [today, today, today - datetime.timedelta(days=40), today - datetime.timedelta(days=400)]
+        # bulk_create sinyal göndermez; özet yalnızca yeniden hesaplamadan gelir
+        VendorView.objects.bulk_create(
+            [VendorView(vendor=self.vendor, ip_hash=str(i), day=day) for i, day in enumerate(self.days)]
+            + [VendorView(vendor=self.other, ip_hash='x', day=today)]
+        )
+        VendorCall.objects.bulk_create(
+            [VendorCall(vendor=self.vendor, ip_hash=str(i), day=day) for i, day in enumerate(self.days[1:])]
+        )
+        # Bayat özet satırı yeniden hesaplamada düzelmeli
+        VendorDailyStats.objects.create(vendor=self.vendor, day=today, views=99, calls=99)
+
+    def _raw(self, model, **filters):
+        return model.objects.filter(vendor=self.vendor, **filters).count()
+
+    def test_dashboard_matches_raw_counts_after_rebuild(self, *_mocks):
+        rebuild_daily_stats()
+        summary = dashboard_summary(self.vendor)
+        today = timezone.localdate()
+        month_start, next_month = month_range(today)
+        window_start = month_starts(today, 12)[0][0]
+        for metric, model in (('views', VendorView), ('calls', VendorCall)):
+            with self.subTest(metric):
+                self.assertEqual(summary['today'][metric], self._raw(model, day=today))
+                self.assertEqual(summary['month'][metric], self._raw(model, day__gte=month_start, day__lt=next_month))
+                self.assertEqual(sum(summary['series'][metric]), self._raw(model, day__gte=window_start))
+
+
+@override_settings(
+    NEARBY_VENDORS_BACKEND='numpy',
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+@skipUnless(nearest.is_available(), 'NumPy yüklü değil')
+class NearbyEngineVisibilityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.vendors = [
+            make_vendor(index, latitude=Decimal('41.000000'), longitude=Decimal(f'29.00{index}000'))
+            for index in range(2)
+        ]
+        engine = nearest.NearestVendorEngine()
+        patcher = mock.patch.object(nearest, 'nearest_engine', engine)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _slugs(self):
+        response = self.client.get('/api/v1/vendors/nearby/', {'latitude': 41.0, 'longitude': 29.0, 'radius': 5})
+        self.assertEqual(response.status_code, 200)
+        return [vendor['slug'] for vendor in response.json()['vendors']]
+
+    def test_vendor_deactivated_after_build_is_not_returned(self):
+        self.assertEqual(self._slugs(), [vendor.slug for vendor in self.vendors])
+        # update() sinyal göndermez; motorun snapshot'ı bayat kalır
+        CustomUser.objects.filter(pk=self.vendors[0].user_id).update(is_active=False)
+        self.assertEqual(self._slugs(), [self.vendors[1].slug])
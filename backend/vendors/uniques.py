@@ -0,0 +1,156 @@
+"""
+Vendor başına yaklaşık tekil ziyaretçi sayıları (Redis HyperLogLog)
+Her profil görüntüleme ziyaretçi kimliğini (ip/ua hash) vendor'ın gün ve ay HLL'lerine PFADD eder.
+Hafta, ay veya özel aralık tekilleri PFCOUNT ile birden fazla anahtarın birleşimi olarak sabit
+bellek ve sürede okunur (~%0.8 standart hata). Tam aylar ay anahtarıyla, kenar günler gün
+anahtarlarıyla birleştirilir.
+
+Günlük kardinaliteler her gece VendorDailyStats.unique_visitors'a yazılır; Redis'te süresi dolmuş
+aylar için bu değerlerin toplamı (üst sınır) kullanılır. VENDOR_VIEW_ROWS_STORED kapatılırsa
+ziyaretçi başına VendorView satırı yazılmaz ve günlük görüntüleme sayısı da HLL'den alınır.
+"""
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from core.utils.redis_client import get_redis
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+DAY_KEY = 'vendor_uniques:{vendor_id}:d:{day:%Y%m%d}'
+MONTH_KEY = 'vendor_uniques:{vendor_id}:m:{day:%Y%m}'
+# O gün ziyaret alan vendor'lar (gece kalıcılaştırma için SCAN gerekmesin)
+ACTIVE_VENDORS_KEY = 'vendor_uniques:vendors:{day:%Y%m%d}'
+DAY_TTL = 60 * 60 * 24 * 40
+MONTH_TTL = 60 * 60 * 24 * 400
+
+
+def view_rows_stored() -> bool:
+    return getattr(settings, 'VENDOR_VIEW_ROWS_STORED', True)
+
+
+def visitor_id(ip_hash: str, ua_hash: str) -> str:
+    return f'{ip_hash}:{ua_hash}'
+
+
+def record_visits(visits: Iterable[Tuple[int, date, str]]) -> None:
+    """(vendor_id, gün, ziyaretçi) üçlülerini tek pipeline ile HLL'lere ekle"""
+    by_key: Dict[str, set] = {}
+    active: Dict[date, set] = {}
+    for vendor_id, day, visitor in visits:
+        by_key.setdefault(DAY_KEY.format(vendor_id=vendor_id, day=day), set()).add(visitor)
+        by_key.setdefault(MONTH_KEY.format(vendor_id=vendor_id, day=day), set()).add(visitor)
+        active.setdefault(day, set()).add(vendor_id)
+    if not by_key:
+        return
+    pipe = get_redis().pipeline(transaction=False)
+    for key, visitors in by_key.items():
+        pipe.pfadd(key, *visitors)
+        pipe.expire(key, MONTH_TTL if ':m:' in key else DAY_TTL)
+    for day, vendor_ids in active.items():
+        key = ACTIVE_VENDORS_KEY.format(day=day)
+        pipe.sadd(key, *vendor_ids)
+        pipe.expire(key, DAY_TTL)
+    pipe.execute()
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def range_keys(vendor_id: int, start: date, end: date) -> List[str]:
+    """[start, end) aralığını kapsayan anahtarlar: tam aylar için ay, kenarlar için gün anahtarı"""
+    keys = []
+    day = start
+    while day < end:
+        if day.day == 1 and _next_month(day) <= end:
+            keys.append(MONTH_KEY.format(vendor_id=vendor_id, day=day))
+            day = _next_month(day)
+        else:
+            keys.append(DAY_KEY.format(vendor_id=vendor_id, day=day))
+            day += timedelta(days=1)
+    return keys
+
+
+def count_range(vendor_id: int, start: date, end: date) -> Optional[int]:
+    """[start, end) aralığındaki yaklaşık tekil ziyaretçi; Redis erişilemezse None"""
+    keys = range_keys(vendor_id, start, end)
+    if not keys:
+        return 0
+    try:
+        return get_redis().pfcount(*keys)
+    except Exception as e:
+        logger.warning(f"Unique visitor count failed for vendor {vendor_id}: {e}")
+        return None
+
+
+def count_months(vendor_id: int, month_starts: List[date]) -> Optional[List[int]]:
+    """Her ayın tekil ziyaretçisi (tek round-trip); Redis erişilemezse None"""
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for start in month_starts:
+            pipe.pfcount(MONTH_KEY.format(vendor_id=vendor_id, day=start))
+        return pipe.execute()
+    except Exception as e:
+        logger.warning(f"Monthly unique visitor count failed for vendor {vendor_id}: {e}")
+        return None
+
+
+def persist_day(day: date) -> int:
+    """
+    Günün kardinalitelerini VendorDailyStats.unique_visitors'a yaz
+    (satır saklanmıyorsa görüntüleme sayısı da tekil ziyaretçi olarak yazılır).
+    """
+    from .models import VendorDailyStats, VendorProfile
+
+    redis = get_redis()
+    vendor_ids = [int(vendor_id) for vendor_id in redis.smembers(ACTIVE_VENDORS_KEY.format(day=day))]
+    if not vendor_ids:
+        return 0
+    # Silinmiş vendor'ların anahtarları atlanır
+    vendor_ids = list(VendorProfile.objects.filter(pk__in=vendor_ids).values_list('id', flat=True))
+    pipe = redis.pipeline(transaction=False)
+    for vendor_id in vendor_ids:
+        pipe.pfcount(DAY_KEY.format(vendor_id=vendor_id, day=day))
+    counts = pipe.execute()
+
+    rows_stored = view_rows_stored()
+    fields = ['unique_visitors'] if rows_stored else ['unique_visitors', 'views']
+    rows = [
+        VendorDailyStats(vendor_id=vendor_id, day=day, unique_visitors=count, views=0 if rows_stored else count)
+        for vendor_id, count in zip(vendor_ids, counts)
+    ]
+    VendorDailyStats.objects.bulk_create(
+        rows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['vendor', 'day'],
+        update_fields=fields,
+    )
+    return len(rows)
+
+
+def refresh_views_from_uniques(pairs: Iterable[Tuple[int, date]]) -> None:
+    """Satır saklanmadığında (vendor, gün) görüntüleme sayısını gün HLL'inden güncelle"""
+    from .models import VendorDailyStats
+
+    pairs = list(pairs)
+    if not pairs:
+        return
+    pipe = get_redis().pipeline(transaction=False)
+    for vendor_id, day in pairs:
+        pipe.pfcount(DAY_KEY.format(vendor_id=vendor_id, day=day))
+    counts = pipe.execute()
+    VendorDailyStats.objects.bulk_create(
+        [
+            VendorDailyStats(vendor_id=vendor_id, day=day, views=count)
+            for (vendor_id, day), count in zip(pairs, counts)
+        ],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['vendor', 'day'],
+        update_fields=['views'],
+    )
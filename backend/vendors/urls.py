@@ -15,6 +15,8 @@ urlpatterns = [
     path('client-upgrade/', ClientToVendorUpgradeView.as_view(), name='client-to-vendor-upgrade'),
     path('set-password/', SetVendorPasswordView.as_view(), name='vendor-set-password'),
     path('search/', VendorSearchView.as_view(), name='vendor-search'),
+    path('search/facets/', VendorSearchFacetsView.as_view(), name='vendor-search-facets'),
+    path('search/autocomplete/', VendorAutocompleteView.as_view(), name='vendor-search-autocomplete'),
     path('car-brands/', CarBrandListView.as_view(), name='car-brands'),
     path('', include(router.urls)),
     # Collection endpoints must come BEFORE slug routes
@@ -32,6 +34,9 @@ urlpatterns = [
     # Location endpoints
     path('location/update/', VendorLocationUpdateView.as_view(), name='vendor-location-update'),
     path('nearby/', NearbyVendorsView.as_view(), name='nearby-vendors'),
+    path('map/clusters/', VendorMapClustersView.as_view(), name='vendor-map-clusters'),
+    # Batch analytics beacon (navigator.sendBeacon)
+    path('analytics/events/', VendorAnalyticsBeaconView.as_view(), name='vendor-analytics-events'),
     # Slug-scoped endpoints
     path('<str:slug>/service-requests/', ServiceRequestCreateView.as_view(), name='service-request-create'),
     path('<str:slug>/appointments/', ClientAppointmentView.as_view(), name='client-appointment'),
@@ -1,3 +1,5 @@
+import math
+
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -6,8 +8,15 @@ from django.db.models import Q
 from .serializers import *
 from core.models import CustomUser
 from .models import VendorProfile, Appointment, Review, ServiceRequest, VendorView, VendorCall, VendorImage
-from chat.models import Conversation, Message
+from .search import apply_text_search, apply_location_filter
+from .geo import haversine_distance_km, within_radius_prefilter
+from . import nearest
+from .clustering import cluster_index
+from . import events, resolver, search_cache, stats, uniques
+from .facets import facet_index
+from .autocomplete import autocomplete_index, DEFAULT_LIMIT as AUTOCOMPLETE_DEFAULT_LIMIT
 from core.utils.password_validator import validate_strong_password_simple
+import base64
 import hashlib
 import os
 from core.models import ServiceArea, CarBrand
@@ -20,12 +29,15 @@ from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import viewsets
 from django.http import Http404
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.parsers import JSONParser
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.authentication import SessionAuthentication
+from django.conf import settings
 from django.core.cache import cache
-from django.views.decorators.cache import cache_page
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from channels.layers import get_channel_layer
@@ -55,27 +67,141 @@ class IsVendor(permissions.BasePermission):
         
         return is_vendor
 
+# Arama sıralaması (vendor_rank_idx indeksiyle aynı); cursor sayfalama da bu tuple üzerinden çalışır
+VENDOR_SEARCH_ORDERING = ('-monthly_review_count', '-avg_rating', '-review_count', '-id')
+
 # Pagination sınıfı
 class VendorSearchPagination(PageNumberPagination):
     page_size = 15  # Sayfa başına 15 sonuç
     page_size_query_param = 'page_size'
     max_page_size = 50  # Maksimum sayfa boyutu
 
+class VendorSearchCursorPagination(BasePagination):
+    """
+    Arama için keyset (cursor) sayfalama - ?pagination=cursor veya ?cursor=<token> ile seçilir
+    Sonraki sayfa sıralama tuple'ından (monthly_review_count, avg_rating, review_count, id)
+    büyük/küçük karşılaştırmasıyla alınır; OFFSET ve her istekte COUNT yoktur.
+    Toplam sayı sadece ?count=1 ile, filtre bazında cache'ten döner.
+    """
+    page_size = VendorSearchPagination.page_size
+    page_size_query_param = 'page_size'
+    max_page_size = VendorSearchPagination.max_page_size
+    cursor_query_param = 'cursor'
+    ordering_fields = tuple(field.lstrip('-') for field in VENDOR_SEARCH_ORDERING)
+    invalid_cursor_message = 'Geçersiz cursor'
+
+    @classmethod
+    def is_requested(cls, request):
+        params = request.query_params
+        return params.get('pagination') == 'cursor' or bool(params.get(cls.cursor_query_param))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        if size < 1:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def encode_cursor(self, obj):
+        position = [getattr(obj, field) for field in self.ordering_fields]
+        raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param, '').strip()
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            position = json.loads(raw)
+            # Dize veya sözlük de dört öğeye açılabilir; sadece liste kabul edilir
+            if not isinstance(position, list):
+                raise ValueError(token)
+            monthly, rating, reviews, pk = position
+            rating = float(rating)
+            if not math.isfinite(rating):
+                raise ValueError(token)
+            return int(monthly), rating, int(reviews), int(pk)
+        except (TypeError, ValueError):
+            from rest_framework.exceptions import NotFound
+            raise NotFound(self.invalid_cursor_message)
+
+    def filter_after(self, queryset, position):
+        """Tüm alanlar azalan sıralı: (a, b, c, d) < (A, B, C, D) koşulunu açık OR zinciriyle yaz"""
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering_fields, position):
+            condition |= Q(**equal, **{f'{field}__lt': value})
+            equal[field] = value
+        return queryset.filter(condition)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        self.count = None
+        if request.query_params.get('count') in ('1', 'true'):
+            # Cursor filtresi uygulanmadan önceki küme sayılır; cache'te varsa COUNT çalışmaz
+            self.count = search_cache.cached_count(request, queryset.count)
+
+        if position is not None:
+            queryset = self.filter_after(queryset, position)
+
+        # Bir fazla satır çek: sonraki sayfa olup olmadığı COUNT olmadan anlaşılır
+        rows = list(queryset[:self.page_size_value + 1])
+        self.has_next = len(rows) > self.page_size_value
+        self.page = rows[:self.page_size_value]
+        return self.page
+
+    def get_next_cursor(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_paginated_response(self, data):
+        next_cursor = self.get_next_cursor()
+        next_url = None
+        if next_cursor:
+            url = self.request.build_absolute_uri()
+            next_url = replace_query_param(url, self.cursor_query_param, next_cursor)
+            next_url = remove_query_param(next_url, 'pagination')
+        payload = {'next': next_url, 'next_cursor': next_cursor}
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['results'] = data
+        return Response(payload)
+
 class VendorSearchView(generics.ListAPIView):
-    serializer_class = VendorProfileSerializer
+    serializer_class = VendorSearchCardSerializer
     permission_classes = [AllowAny]
     pagination_class = VendorSearchPagination
     
-    # Yüksek trafik için caching - 5 dakika
-    @method_decorator(cache_page(300))
+    @property
+    def paginator(self):
+        # Cursor modu opt-in; varsayılan sayfa numaralı cevap biçimi değişmez
+        if not hasattr(self, '_paginator'):
+            if VendorSearchCursorPagination.is_requested(self.request):
+                self._paginator = VendorSearchCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+    
+    # Yüksek trafik için caching - normalize filtre anahtarlı, vendor/şehir/kategori tag'leriyle geçersiz kılınır
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        return search_cache.cached_search_response(
+            request, lambda: super(VendorSearchView, self).get(request, *args, **kwargs)
+        )
     
     def get_queryset(self):
         queryset = VendorProfile.objects.filter(
             user__is_verified=True,  # Sadece doğrulanmış kullanıcılar
             user__is_active=True     # Sadece aktif kullanıcılar
-        ).select_related('user').prefetch_related('service_areas', 'categories', 'car_brands', 'reviews')
+        )
+        # Kart için sadece gerekli kolonlar + sabit sayıda prefetch (N+1 yok)
+        queryset = VendorSearchCardSerializer.shape_queryset(queryset)
         
         # Filtreleme parametreleri
         city = self.request.query_params.get('city', '')
@@ -85,55 +211,18 @@ class VendorSearchView(generics.ListAPIView):
         car_brand = self.request.query_params.get('carBrand', '')
         search_query = self.request.query_params.get('q', '')  # Text search parametresi
         
-        # Text search - esnaf adı, hizmet, açıklama gibi alanlarda arama (case-insensitive)
+        # Text search - Türkçe katlanmış arama dokümanı üzerinden tek indeksli sorgu
+        # (esnaf adı, şirket adı, açıklama, şehir/ilçe, hizmet alanı, kategori, araba markası)
         if search_query:
-            # Case-insensitive arama için search_query'yi normalize et
-            normalized_query = search_query.lower().strip()
-            
-            # Türkçe karakter alternatifleri oluştur
-            turkish_alternatives = [
-                normalized_query,
-                normalized_query.replace('i', 'ı'),
-                normalized_query.replace('ı', 'i'),
-                normalized_query.replace('o', 'ö'),
-                normalized_query.replace('ö', 'o'),
-                normalized_query.replace('u', 'ü'),
-                normalized_query.replace('ü', 'u'),
-                normalized_query.replace('s', 'ş'),
-                normalized_query.replace('ş', 's'),
-                normalized_query.replace('c', 'ç'),
-                normalized_query.replace('ç', 'c'),
-                normalized_query.replace('g', 'ğ'),
-                normalized_query.replace('ğ', 'g')
-            ]
-            
-            # Gelişmiş arama için birden fazla yaklaşım kullan
-            from django.db.models import Q
-            search_queries = Q()
-            
-            for alt_query in turkish_alternatives:
-                search_queries |= (
-                    Q(display_name__icontains=alt_query) |  # Esnaf adı
-                    Q(company_title__icontains=alt_query) |  # Şirket adı
-                    Q(about__icontains=alt_query) |  # Açıklama
-                    Q(business_type__icontains=alt_query) |  # İşletme türü
-                    Q(service_areas__name__icontains=alt_query) |  # Hizmet alanı adı
-                    Q(categories__name__icontains=alt_query) |  # Kategori adı
-                    Q(car_brands__name__icontains=alt_query) |  # Araba markası adı
-                    # Şehir ve ilçe araması da ekle
-                    Q(city__icontains=alt_query) |  # Şehir
-                    Q(district__icontains=alt_query)  # İlçe
-                )
-            
-            queryset = queryset.filter(search_queries).distinct()  # Duplicate sonuçları önle
+            queryset = apply_text_search(queryset, search_query)
         
-        # Şehir filtresi
+        # Şehir filtresi (Türkçe büyük/küçük harf duyarsız; cache anahtarı da katlanmış değeri kullanır)
         if city:
-            queryset = queryset.filter(city__icontains=city)
+            queryset = apply_location_filter(queryset, 'city', city)
         
         # İlçe filtresi
         if district:
-            queryset = queryset.filter(district__icontains=district)
+            queryset = apply_location_filter(queryset, 'district', district)
         
         # Hizmet alanı filtresi
         if service:
@@ -170,21 +259,34 @@ class VendorSearchView(generics.ListAPIView):
             except Category.DoesNotExist:
                 pass
         
-        # Rating'e göre sırala (yüksek rating önce), sonra en yeni
-        from django.db.models import Avg, Count, Q
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        # Bu ayın başlangıcı ve bitişi
-        now = timezone.now()
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        next_month = (month_start + timedelta(days=32)).replace(day=1)
-        
-        return queryset.annotate(
-            avg_rating=Avg('reviews__rating'),
-            review_count=Count('reviews'),
-            monthly_review_count=Count('reviews', filter=Q(reviews__created_at__gte=month_start, reviews__created_at__lt=next_month))
-        ).order_by('-monthly_review_count', '-avg_rating', '-review_count', '-id')
+        # Denormalize puan kolonlarına göre sırala (bu ayın yorumları, yüksek rating, toplam yorum, en yeni)
+        # Kolonlar Review sinyalleriyle güncel tutulur; yorum tablosuna join yapılmaz
+        return queryset.order_by(*VENDOR_SEARCH_ORDERING)
+
+class VendorSearchFacetsView(APIView):
+    """Arama sayfası facet sayıları - VendorSearchView ile aynı filtreler, process içi indeksten"""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        filters = {
+            'city': request.query_params.get('city', ''),
+            'district': request.query_params.get('district', ''),
+            'service': request.query_params.get('service', ''),
+            'category': request.query_params.get('category', ''),
+            'carBrand': request.query_params.get('carBrand', ''),
+        }
+        return Response(facet_index.counts(filters, request.query_params.get('q', '')))
+
+class VendorAutocompleteView(APIView):
+    """Arama kutusu önerileri - vendor, kategori, hizmet alanı ve araba markası adlarında önek araması"""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT))
+        except (TypeError, ValueError):
+            limit = AUTOCOMPLETE_DEFAULT_LIMIT
+        return Response(autocomplete_index.suggest(request.query_params.get('q', ''), limit))
 
 class VendorDetailView(generics.RetrieveAPIView):
     serializer_class = VendorProfileSerializer
@@ -193,15 +295,13 @@ class VendorDetailView(generics.RetrieveAPIView):
     lookup_field = 'slug'
     
     def get_object(self):
-        slug = self.kwargs.get('slug')
+        from rest_framework.exceptions import NotFound
+        ref = resolver.resolve(self.kwargs.get('slug'))
+        if ref is None or not ref.is_listed:
+            raise NotFound("Vendor bulunamadı")
         try:
-            return VendorProfile.objects.prefetch_related('gallery_images').get(
-                slug=slug,
-                user__is_verified=True,
-                user__is_active=True
-            )
+            return VendorProfile.objects.prefetch_related('gallery_images').get(pk=ref.vendor_id)
         except VendorProfile.DoesNotExist:
-            from rest_framework.exceptions import NotFound
             raise NotFound("Vendor bulunamadı")
     
     def get_serializer_context(self):
@@ -217,123 +317,67 @@ class VendorDashboardSummaryView(APIView):
         if not hasattr(request.user, 'vendor_profile'):
             return Response({"detail": "Vendor bulunamadı"}, status=status.HTTP_404_NOT_FOUND)
         vendor = request.user.vendor_profile
-        now = timezone.now()
-        month_bucket = now.strftime('%Y-%m')
-        # Month window [start, next_start)
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        next_month = (month_start + timedelta(days=32)).replace(day=1)
-
-        profile_views_month = VendorView.objects.filter(vendor=vendor, month_bucket=month_bucket).count()
-        calls_month = VendorCall.objects.filter(vendor=vendor, month_bucket=month_bucket).count()
-
-        # messages: vendor kullanıcısının dahil olduğu konuşmalardaki mesaj sayıları
-        user_obj = vendor.user
-        conv_ids = Conversation.objects.filter(Q(user1=user_obj) | Q(user2=user_obj)).values_list('id', flat=True)
-        # Monthly
-        messages_month = Message.objects.filter(
-            conversation_id__in=conv_ids,
-            created_at__gte=month_start,
-            created_at__lt=next_month
-        ).count()
-        # All-time
-        messages_total_all_time = Message.objects.filter(
-            conversation_id__in=conv_ids
-        ).count()
-
-        # Reviews - monthly
-        reviews_qs = vendor.reviews.all()
-        reviews_month = reviews_qs.filter(
-            created_at__gte=month_start,
-            created_at__lt=next_month
-        ).count()
-        from django.db.models import Avg
-        average_rating = reviews_qs.aggregate(avg=Avg('rating'))['avg'] or 0
-
-        # Appointments - for this month by scheduled date
-        appointments_month = vendor.appointments.filter(
-            appointment_date__gte=month_start.date(),
-            appointment_date__lt=next_month.date()
-        ).count()
-
-        # Favorites - monthly
-        from core.models import Favorite
-        favorites_qs = Favorite.objects.filter(vendor=vendor)
-        favorites_month = favorites_qs.filter(
-            created_at__gte=month_start,
-            created_at__lt=next_month
-        ).count()
-        favorites_total_all_time = favorites_qs.count()
-
-        # Build last 12 months series (oldest -> newest)
-        def month_series_counts():
-            series = {
-                'profile_views': [],
-                'calls': [],
-                'messages': [],
-                'appointments': [],
-                'favorites': [],
-            }
-            # Walk 11 months ago .. this month
-            for i in range(11, -1, -1):
-                ref = (month_start - timedelta(days=30*i))
-                start = ref.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                nxt = (start + timedelta(days=32)).replace(day=1)
-
-                # month_bucket string for models that store it
-                mb = start.strftime('%Y-%m')
-
-                # Views & calls via bucket field
-                pv = VendorView.objects.filter(vendor=vendor, month_bucket=mb).count()
-                cl = VendorCall.objects.filter(vendor=vendor, month_bucket=mb).count()
-
-                # messages in month
-                msg = Message.objects.filter(
-                    conversation_id__in=conv_ids,
-                    created_at__gte=start,
-                    created_at__lt=nxt
-                ).count()
-
-                # appointments scheduled in month
-                appt = vendor.appointments.filter(
-                    appointment_date__gte=start.date(),
-                    appointment_date__lt=nxt.date()
-                ).count()
-
-                # favorites created in month
-                fav = Favorite.objects.filter(
-                    vendor=vendor,
-                    created_at__gte=start,
-                    created_at__lt=nxt
-                ).count()
-
-                series['profile_views'].append(pv)
-                series['calls'].append(cl)
-                series['messages'].append(msg)
-                series['appointments'].append(appt)
-                series['favorites'].append(fav)
-            return series
-
-        monthly_series = month_series_counts()
+        # Tüm sayılar günlük özet tablosundan: 12 aylık aralık sorgusu + tüm zamanlar toplamı
+        summary = stats.dashboard_summary(vendor, months=12)
+        month = summary['month']
+        average_rating = vendor.avg_rating or 0
 
         data = {
-            "profile_views_month": profile_views_month,
-            "calls_month": calls_month,
+            "profile_views_month": month['views'],
+            "calls_month": month['calls'],
             # Backward-compat field names but monthly values
             # Provide both monthly and all-time for messages
-            "messages_month": messages_month,
-            "messages_total": messages_total_all_time,
-            "appointments_total": appointments_month,
-            "appointments_today": vendor.appointments.filter(appointment_date=now.date()).count(),
+            "messages_month": month['messages'],
+            "messages_total": summary['totals']['messages'],
+            "appointments_total": month['appointments'],
+            "appointments_today": summary['today']['appointments'],
             # Provide both monthly and all-time for favorites
-            "favorites_month": favorites_month,
-            "favorites_total": favorites_total_all_time,
-            "reviews_total": reviews_month,
+            "favorites_month": month['favorites'],
+            "favorites_total": summary['totals']['favorites'],
+            "reviews_total": month['reviews'],
             "average_rating": round(float(average_rating), 1),
-            "monthly": monthly_series,
+            "gallery_opens_month": month['gallery_opens'],
+            "shares_month": month['shares'],
+            "unique_visitors_month": month['unique_visitors'],
+            "unique_visitors_week": summary['week']['unique_visitors'],
+            "monthly": {
+                'profile_views': summary['series']['views'],
+                'unique_visitors': summary['series']['unique_visitors'],
+                'calls': summary['series']['calls'],
+                'messages': summary['series']['messages'],
+                'appointments': summary['series']['appointments'],
+                'favorites': summary['series']['favorites'],
+                'gallery_opens': summary['series']['gallery_opens'],
+                'shares': summary['series']['shares'],
+            },
         }
         return Response(data)
 
 
+def _hash_or_empty(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest() if value else ''
+
+
+def _buffer_analytics_event(request, event_type, slug, **fields):
+    """
+    Olayı Redis kuyruğuna ekleyip 202 döndür (DB sorgusu yok; vendor ve kullanıcı boşaltmada çözülür).
+    Redis erişilemezse None döner ve çağıran senkron yazmaya devam eder.
+    """
+    user_id = request.session.get('_auth_user_id')
+    try:
+        queued = events.enqueue(
+            event_type,
+            slug,
+            ip=_hash_or_empty(request.META.get('REMOTE_ADDR', '')),
+            viewer=int(user_id) if user_id else None,
+            **fields,
+        )
+    except Exception as e:
+        logger.warning(f"Analytics event buffer unavailable, writing synchronously: {e}")
+        return None
+    return Response({"status": "queued" if queued else "dropped"}, status=status.HTTP_202_ACCEPTED)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class VendorAnalyticsViewEvent(APIView):
     """Vendor profil görüntüleme analytics - Public endpoint, CSRF exempt"""
@@ -359,9 +403,14 @@ class VendorAnalyticsViewEvent(APIView):
         return None
 
     def post(self, request, slug):
-        try:
-            vendor = VendorProfile.objects.get(slug=slug, user__is_active=True)
-        except VendorProfile.DoesNotExist:
+        if events.is_enabled():
+            ua = request.META.get('HTTP_USER_AGENT', '')
+            buffered = _buffer_analytics_event(request, events.EVENT_VIEW, slug, ua=_hash_or_empty(ua))
+            if buffered is not None:
+                return buffered
+
+        vendor = resolver.resolve(slug)
+        if vendor is None or not vendor.is_active:
             return Response({"detail": "Vendor bulunamadı"}, status=status.HTTP_404_NOT_FOUND)
         
         # Session'dan user'ı manuel olarak al (authentication_classes = [] olduğu için)
@@ -370,20 +419,29 @@ class VendorAnalyticsViewEvent(APIView):
         # Debug log
         logger.debug(f"Analytics view event - slug: {slug}, viewer: {viewer.email if viewer else None}, session_key: {request.session.session_key}")
         
-        if viewer and viewer == vendor.user:
+        if viewer and viewer.id == vendor.user_id:
             return Response({"status": "ignored"})
         ip = request.META.get('REMOTE_ADDR', '')
         ua = request.META.get('HTTP_USER_AGENT', '')
         ip_hash = hashlib.sha256(ip.encode()).hexdigest() if ip else ''
         ua_hash = hashlib.sha256(ua.encode()).hexdigest() if ua else ''
-        # Günlük bazlı kayıt (ay bazlı yerine) - her gün için ayrı kayıt
-        day_bucket = timezone.now().strftime('%Y-%m-%d')
+        day = timezone.localdate()
+        try:
+            uniques.record_visits([(vendor.vendor_id, day, uniques.visitor_id(ip_hash, ua_hash))])
+            if not uniques.view_rows_stored():
+                # Ziyaretçi satırı saklanmıyor; günlük görüntüleme sayısı HLL'den
+                uniques.refresh_views_from_uniques([(vendor.vendor_id, day)])
+                return Response({"status": "ok", "viewer_id": viewer.id if viewer else None})
+        except Exception as e:
+            logger.warning(f"Unique visitor record failed: {e}")
+
+        # Günlük bazlı kayıt - her gün için ayrı kayıt (yerel gün, özet tablosuyla aynı)
         # get_or_create kullanarak aynı gün içinde duplicate kayıtları önle
         view_obj, created = VendorView.objects.get_or_create(
-            vendor=vendor,
+            vendor_id=vendor.vendor_id,
             ip_hash=ip_hash,
             ua_hash=ua_hash,
-            month_bucket=day_bucket,  # month_bucket field'ını günlük format için kullanıyoruz
+            day=day,
             defaults={'viewer': viewer}
         )
 
@@ -421,9 +479,14 @@ class VendorAnalyticsCallEvent(APIView):
         return None
 
     def post(self, request, slug):
-        try:
-            vendor = VendorProfile.objects.get(slug=slug, user__is_active=True)
-        except VendorProfile.DoesNotExist:
+        if events.is_enabled():
+            phone = str(request.data.get('phone', ''))[:32]
+            buffered = _buffer_analytics_event(request, events.EVENT_CALL, slug, phone=phone)
+            if buffered is not None:
+                return buffered
+
+        vendor = resolver.resolve(slug)
+        if vendor is None or not vendor.is_active:
             return Response({"detail": "Vendor bulunamadı"}, status=status.HTTP_404_NOT_FOUND)
         
         # Session'dan user'ı manuel olarak al (authentication_classes = [] olduğu için)
@@ -431,13 +494,12 @@ class VendorAnalyticsCallEvent(APIView):
         ip = request.META.get('REMOTE_ADDR', '')
         phone = request.data.get('phone', '')
         ip_hash = hashlib.sha256(ip.encode()).hexdigest() if ip else ''
-        # Günlük bazlı kayıt (ay bazlı yerine) - her gün için ayrı kayıt
-        day_bucket = timezone.now().strftime('%Y-%m-%d')
+        # Günlük bazlı kayıt - her gün için ayrı kayıt (yerel gün, özet tablosuyla aynı)
         # get_or_create kullanarak aynı gün içinde duplicate kayıtları önle
         call_obj, created = VendorCall.objects.get_or_create(
-            vendor=vendor,
+            vendor_id=vendor.vendor_id,
             ip_hash=ip_hash,
-            month_bucket=day_bucket,  # month_bucket field'ını günlük format için kullanıyoruz
+            day=timezone.localdate(),
             defaults={'viewer': viewer, 'phone': phone}
         )
         
@@ -449,6 +511,69 @@ class VendorAnalyticsCallEvent(APIView):
         
         return Response({"status": "ok", "viewer_id": viewer.id if viewer else None})
 
+class PlainTextJSONParser(JSONParser):
+    """navigator.sendBeacon string gövdeyi text/plain olarak gönderir (CORS preflight'sız)"""
+    media_type = 'text/plain'
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class VendorAnalyticsBeaconView(APIView):
+    """
+    İstemci analytics olaylarını tek istekte toplu alır - navigator.sendBeacon uyumlu, public
+    Gövde: {"events": [{"type": "view", "slug": "..."}, {"type": "call", "slug": "...", "phone": "..."},
+    {"type": "gallery_open", "slug": "..."}, {"type": "share", "slug": "..."}]} veya doğrudan olay dizisi.
+    Olaylar tekil görüntüleme/arama uçlarıyla aynı kuyruğa yazılır; kuyruk kapalıysa aynı parti
+    işleyicisi senkron çalışır (slug'lar tek sorguda çözülür).
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []  # CSRF exemption için authentication'ı devre dışı bırak
+    parser_classes = [JSONParser, PlainTextJSONParser]
+    MAX_EVENTS = 50
+
+    def post(self, request):
+        try:
+            data = request.data
+        except ParseError:
+            return Response({"detail": "Geçersiz JSON"}, status=status.HTTP_400_BAD_REQUEST)
+        items = data.get('events') if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            return Response({"detail": "events listesi gerekli"}, status=status.HTTP_400_BAD_REQUEST)
+
+        user_id = request.session.get('_auth_user_id')
+        common = {
+            'ip': _hash_or_empty(request.META.get('REMOTE_ADDR', '')),
+            'viewer': int(user_id) if user_id else None,
+        }
+        ua_hash = _hash_or_empty(request.META.get('HTTP_USER_AGENT', ''))
+        payloads = []
+        for item in items[:self.MAX_EVENTS]:
+            if not isinstance(item, dict):
+                continue
+            event_type, slug = item.get('type'), item.get('slug')
+            if event_type not in events.EVENT_TYPES or not isinstance(slug, str) or not slug:
+                continue
+            fields = dict(common)
+            if event_type == events.EVENT_VIEW:
+                fields['ua'] = ua_hash
+            elif event_type == events.EVENT_CALL:
+                fields['phone'] = str(item.get('phone') or '')[:32]
+            payloads.append(events.build_event(event_type, slug[:255], **fields))
+
+        accepted = None
+        if payloads and events.is_enabled():
+            try:
+                accepted = events.enqueue_many(payloads)
+            except Exception as e:
+                logger.warning(f"Analytics event buffer unavailable, writing synchronously: {e}")
+        if payloads and accepted is None:
+            events.process_batch(payloads)
+            accepted = len(payloads)
+        return Response(
+            {"accepted": accepted or 0, "rejected": len(items) - len(payloads)},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
 class VendorProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = VendorProfileSerializer
     permission_classes = [IsVendor]
@@ -915,8 +1040,11 @@ class ClientAppointmentView(APIView):
     
     def post(self, request, slug):
         """Müşteri randevu talebi oluşturur"""
+        ref = resolver.resolve(slug)
+        if ref is None or not ref.is_listed:
+            return Response({"detail": "Esnaf bulunamadı"}, status=status.HTTP_404_NOT_FOUND)
         try:
-            vendor = VendorProfile.objects.get(slug=slug, user__is_verified=True, user__is_active=True)
+            vendor = VendorProfile.objects.get(pk=ref.vendor_id)
         except VendorProfile.DoesNotExist:
             return Response({"detail": "Esnaf bulunamadı"}, status=status.HTTP_404_NOT_FOUND)
         
@@ -1006,23 +1134,17 @@ class ReviewViewSet(viewsets.ModelViewSet):
     authentication_classes = [SessionAuthentication]  # Session Authentication aktif (review create için user bilgisi gerekli)
     
     def get_queryset(self):
-        vendor_slug = self.kwargs.get('vendor_slug')
-        if vendor_slug:
-            try:
-                vendor = VendorProfile.objects.get(slug=vendor_slug)
-                return Review.objects.filter(vendor=vendor)
-            except VendorProfile.DoesNotExist:
-                return Review.objects.none()
-        return Review.objects.none()
+        vendor = resolver.resolve(self.kwargs.get('vendor_slug'))
+        if vendor is None:
+            return Review.objects.none()
+        return Review.objects.filter(vendor_id=vendor.vendor_id)
     
     def perform_create(self, serializer):
         """Yeni değerlendirme oluştur"""
-        vendor_slug = self.kwargs.get('vendor_slug')
-        try:
-            vendor = VendorProfile.objects.get(slug=vendor_slug)
-            serializer.save(vendor=vendor)
-        except VendorProfile.DoesNotExist:
+        vendor = resolver.resolve(self.kwargs.get('vendor_slug'))
+        if vendor is None:
             raise Http404("Vendor bulunamadı")
+        serializer.save(vendor_id=vendor.vendor_id)
     
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None):
@@ -1032,7 +1154,7 @@ class ReviewViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Bu işlem için yetkiniz yok"}, status=status.HTTP_403_FORBIDDEN)
         
         review.is_read = True
-        review.save()
+        review.save(update_fields=['is_read'])
         return Response({"status": "success"})
     
     @action(detail=False, methods=['get'])
@@ -1054,20 +1176,19 @@ class ServiceRequestCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, slug):
-        try:
-            vendor = VendorProfile.objects.get(slug=slug, user__is_verified=True, user__is_active=True)
-        except VendorProfile.DoesNotExist:
+        vendor = resolver.resolve(slug)
+        if vendor is None or not vendor.is_listed:
             return Response({"detail": "Esnaf bulunamadı"}, status=status.HTTP_404_NOT_FOUND)
 
         serializer = ServiceRequestSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            service_request = serializer.save(vendor=vendor, status='pending')
+            service_request = serializer.save(vendor_id=vendor.vendor_id, status='pending')
             # Push to vendor
             try:
                 channel_layer = get_channel_layer()
                 if channel_layer is not None:
                     async_to_sync(channel_layer.group_send)(
-                        f"user_{vendor.user.id}",
+                        f"user_{vendor.user_id}",
                         {
                             'type': 'notification.new',
                             'payload': {
@@ -1325,7 +1446,8 @@ class VendorLocationUpdateView(APIView):
             except (ValueError, TypeError):
                 return Response({"detail": "Geçersiz boylam formatı"}, status=status.HTTP_400_BAD_REQUEST)
         
-        vendor.save()
+        # grid_cell model save() içinde koordinatlardan yeniden hesaplanır
+        vendor.save(update_fields=['latitude', 'longitude', 'updated_at'])
         
         return Response({
             "detail": "Konum bilgileri güncellendi",
@@ -1340,12 +1462,13 @@ class VendorLocationGetView(APIView):
 
     def get(self, request, slug):
         """Belirli bir vendor'ın konum bilgilerini getirir"""
+        ref = resolver.resolve(slug)
+        if ref is None or not ref.is_listed:
+            return Response({"detail": "Vendor bulunamadı"}, status=status.HTTP_404_NOT_FOUND)
         try:
-            vendor = VendorProfile.objects.get(
-                slug=slug,
-                user__is_verified=True,
-                user__is_active=True
-            )
+            vendor = VendorProfile.objects.only(
+                'slug', 'display_name', 'city', 'district', 'subdistrict', 'address', 'latitude', 'longitude'
+            ).get(pk=ref.vendor_id)
         except VendorProfile.DoesNotExist:
             return Response({"detail": "Vendor bulunamadı"}, status=status.HTTP_404_NOT_FOUND)
         
@@ -1381,39 +1504,26 @@ class NearbyVendorsView(APIView):
             radius_float = float(radius)
         except (ValueError, TypeError):
             return Response({"detail": "Geçersiz koordinat formatı"}, status=status.HTTP_400_BAD_REQUEST)
+        if not (math.isfinite(lat_float) and math.isfinite(lng_float)):
+            return Response({"detail": "Geçersiz koordinat formatı"}, status=status.HTTP_400_BAD_REQUEST)
+        # inf/nan yarıçap hücre kapsamasında taşar (OverflowError); negatif yarıçap anlamsız
+        if not math.isfinite(radius_float) or radius_float < 0:
+            return Response({"detail": "Geçersiz yarıçap"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Haversine formülü ile yakın vendor'ları bul
-        from django.db.models import F, FloatField
-        from django.db.models.functions import Radians, Sin, Cos, ATan2, Sqrt
+        # Opsiyonel filtreler: en fazla limit sonuç (k en yakın), kategori ve araba markası
+        try:
+            limit = int(request.query_params['limit']) if request.query_params.get('limit') else None
+            category_ids = [int(value) for value in request.query_params.getlist('category') if value]
+            car_brand_ids = [int(value) for value in request.query_params.getlist('carBrand') if value]
+        except (ValueError, TypeError):
+            return Response({"detail": "Geçersiz filtre parametresi"}, status=status.HTTP_400_BAD_REQUEST)
+        if limit is not None and limit < 1:
+            return Response({"detail": "Geçersiz limit değeri"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Haversine formülü için SQL sorgusu
-        vendors = VendorProfile.objects.filter(
-            user__is_verified=True,
-            user__is_active=True,
-            latitude__isnull=False,
-            longitude__isnull=False
-        ).annotate(
-            distance=(
-                6371 * ATan2(
-                    Sqrt(
-                        Sin(Radians(F('latitude') - lat_float)) / 2 * 
-                        Sin(Radians(F('latitude') - lat_float)) / 2 +
-                        Cos(Radians(lat_float)) * Cos(Radians(F('latitude'))) *
-                        Sin(Radians(F('longitude') - lng_float)) / 2 *
-                        Sin(Radians(F('longitude') - lng_float)) / 2
-                    ),
-                    Sqrt(
-                        1 - (
-                            Sin(Radians(F('latitude') - lat_float)) / 2 * 
-                            Sin(Radians(F('latitude') - lat_float)) / 2 +
-                            Cos(Radians(lat_float)) * Cos(Radians(F('latitude'))) *
-                            Sin(Radians(F('longitude') - lng_float)) / 2 *
-                            Sin(Radians(F('longitude') - lng_float)) / 2
-                        )
-                    )
-                )
-            )
-        ).filter(distance__lte=radius_float).order_by('distance')
+        if getattr(settings, 'NEARBY_VENDORS_BACKEND', 'orm') == 'numpy' and nearest.is_available():
+            vendors = self._nearest_from_engine(lat_float, lng_float, radius_float, limit, category_ids, car_brand_ids)
+        else:
+            vendors = self._nearest_from_orm(lat_float, lng_float, radius_float, limit, category_ids, car_brand_ids)
         
         # Sonuçları serialize et
         result = []
@@ -1442,6 +1552,67 @@ class NearbyVendorsView(APIView):
             "radius": radius_float
         }, status=status.HTTP_200_OK)
 
+    @staticmethod
+    def _visible_vendors():
+        """Yakındaki aramalarında listelenebilen vendor'lar (ORM ve motor yolu aynı filtreyi kullanır)"""
+        return VendorProfile.objects.filter(
+            user__is_verified=True,
+            user__is_active=True,
+            latitude__isnull=False,
+            longitude__isnull=False
+        ).select_related('user')
+
+    def _nearest_from_orm(self, lat_float, lng_float, radius_float, limit, category_ids, car_brand_ids):
+        # Önce yarıçapı kapsayan konum hücreleri ve sınır kutusuyla adayları daralt (indeksli),
+        # kesin haversine mesafesini sadece bu yerel satırlar için hesapla
+        vendors = self._visible_vendors()
+        if category_ids:
+            vendors = vendors.filter(categories__in=category_ids)
+        if car_brand_ids:
+            vendors = vendors.filter(car_brands__in=car_brand_ids)
+        if category_ids or car_brand_ids:
+            vendors = vendors.distinct()
+        vendors = within_radius_prefilter(vendors, lat_float, lng_float, radius_float)
+        vendors = vendors.annotate(
+            distance=haversine_distance_km(lat_float, lng_float)
+        ).filter(distance__lte=radius_float).order_by('distance')
+        return vendors[:limit] if limit else vendors
+
+    def _nearest_from_engine(self, lat_float, lng_float, radius_float, limit, category_ids, car_brand_ids):
+        # Mesafe ve sıralama process içi NumPy snapshot'ından; veritabanından sadece bulunan satırlar okunur
+        matches = nearest.nearest_engine.nearest(
+            lat_float, lng_float,
+            radius_km=radius_float, k=limit,
+            category_ids=category_ids, car_brand_ids=car_brand_ids,
+        )
+        # Snapshot yeniden kurulana kadar bayat olabilir; görünürlük veritabanından tekrar doğrulanır
+        profiles = self._visible_vendors().in_bulk([vendor_id for vendor_id, _ in matches])
+        vendors = []
+        for vendor_id, distance in matches:
+            vendor = profiles.get(vendor_id)
+            if vendor is not None:
+                vendor.distance = distance
+                vendors.append(vendor)
+        return vendors
+
+
+class VendorMapClustersView(APIView):
+    """Harita için kümelenmiş vendor marker'ları - bbox (batı,güney,doğu,kuzey) ve zoom ile"""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        bbox = request.query_params.get('bbox', '')
+        zoom = request.query_params.get('zoom')
+        try:
+            west, south, east, north = (float(value) for value in bbox.split(','))
+            zoom_int = int(zoom)
+        except (ValueError, TypeError):
+            return Response({"detail": "bbox (batı,güney,doğu,kuzey) ve zoom parametreleri gerekli"}, status=status.HTTP_400_BAD_REQUEST)
+        if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+            return Response({"detail": "Geçersiz bbox değeri"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(cluster_index.clusters((west, south, east, north), zoom_int), status=status.HTTP_200_OK)
+
 
 class VendorImageListView(generics.ListCreateAPIView):
     """Vendor görsellerini listele ve yeni görsel ekle"""